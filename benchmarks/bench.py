@@ -0,0 +1,565 @@
+"""
+End-to-End-Benchmarks gegen einen lokalen Fake-Ollama-Server.
+
+    python -m benchmarks.bench --out bench.json
+    python -m benchmarks.bench --quick --compare bench.json
+
+Misst TTFT, Gesamtlatenz, UI-Flushes pro Sekunde, CPU des App-Prozesses und
+RSS pro Session. Der Fake-Server läuft in einem eigenen Prozess, damit seine
+CPU-Zeit nicht in die Messung einfließt. Ergebnis ist JSON (stdout oder --out).
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from klugschAIsser.batch import BatchRunner, read_items
+from klugschAIsser.core.backend_pool import BackendPool
+from klugschAIsser.core.context_builder import ContextBuilder
+from klugschAIsser.core.documents import DocumentStore, context_messages
+from klugschAIsser.core.markdown_blocks import MarkdownBlockSplitter
+from klugschAIsser.core.metrics import GenerationStats
+from klugschAIsser.core.ollama_client import OllamaClient
+from klugschAIsser.core.residency import ModelResidency
+from klugschAIsser.core.scheduler import GenerationScheduler, GenerationTicket
+from klugschAIsser.core.session_manager import SessionManager
+from klugschAIsser.core.session_store import SessionStore
+from klugschAIsser.core.stream_buffer import StreamBuffer, pump_stream
+from klugschAIsser.core.types import BotProfile, ChatMessage
+
+MODEL = "gemma3:1b"
+
+# Größen der Szenarien: (normal, --quick)
+SIZES = {
+    "single_requests": (10, 3),
+    "history_messages": (5000, 500),
+    "sessions": (3000, 300),
+    "messages_per_session": (20, 5),
+    "clients": (32, 8),
+    "backend_requests": (24, 8),
+    "markdown_chars": (12000, 4000),
+    "batch_prompts": (64, 16),
+    "document_mb": (8, 2),
+}
+
+# Port ohne Server: simuliert einen ausgefallenen Ollama-Host
+DEAD_HOST = "http://127.0.0.1:9"
+
+# Residency-Szenario: Kaltstart eines Modells und wie lange der User "tippt"
+LOAD_LATENCY = 0.5
+TYPING_S = 1.0
+OTHER_MODEL = "llama3.2:1b"
+
+
+# --- Hilfsfunktionen ---
+
+def rss_bytes() -> int:
+    """Aktueller RSS (Linux: /proc, sonst Peak-RSS als Näherung)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    ordered = sorted(values)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {"mean": statistics.fmean(values), "p50": pick(0.5), "p95": pick(0.95), "max": ordered[-1]}
+
+
+@contextmanager
+def fake_server(tokens_per_sec: float, latency: float, response_tokens: int, *extra_args: str):
+    """Startet benchmarks.fake_ollama als Unterprozess und liefert dessen URL."""
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.fake_ollama", "--port", "0",
+         "--tokens-per-sec", str(tokens_per_sec), "--latency", str(latency),
+         "--response-tokens", str(response_tokens), "--models", MODEL, *extra_args],
+        stdout=subprocess.PIPE, text=True,
+    )
+    try:
+        port = int(proc.stdout.readline())
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+class CpuTimer:
+    """CPU-Zeit dieses Prozesses (App-Seite) relativ zur Wandzeit."""
+
+    def __enter__(self):
+        self.cpu = time.process_time()
+        self.wall = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.cpu = time.process_time() - self.cpu
+        self.wall = time.perf_counter() - self.wall
+
+    def to_dict(self) -> Dict[str, float]:
+        return {"wall_s": self.wall, "cpu_s": self.cpu, "cpu_percent": 100 * self.cpu / max(self.wall, 1e-9)}
+
+
+async def timed_stream(stream, flush_interval_ms: int = 50, flush_tokens: int = 32) -> Dict[str, float]:
+    """Liest einen Stream über denselben Pfad wie ChatWidget (StreamBuffer + pump_stream)."""
+    start = time.perf_counter()
+    first: List[float] = []
+    flushes: List[int] = []
+    buffer = StreamBuffer(flush_interval_ms, flush_tokens)
+
+    text = await pump_stream(
+        stream, buffer,
+        on_flush=lambda t: flushes.append(len(t)),
+        on_first_chunk=lambda: first.append(time.perf_counter() - start),
+    )
+    total = time.perf_counter() - start
+    return {
+        "ttft_s": first[0] if first else total,
+        "e2e_s": total,
+        "flushes": len(flushes),
+        "flushes_per_s": len(flushes) / max(total, 1e-9),
+        "chars": len(text),
+    }
+
+
+# --- Szenarien ---
+
+async def scenario_single_requests(url: str, n: int) -> Dict:
+    client = OllamaClient(MODEL, host=url)
+    results = []
+    stats = []
+    with CpuTimer() as cpu:
+        for _ in range(n):
+            stats.append(GenerationStats(MODEL))
+            results.append(await timed_stream(client.chat([{"role": "user", "content": "Hallo"}],
+                                                          stats=stats[-1])))
+    return {
+        "requests": n,
+        "ttft_s": summarize([r["ttft_s"] for r in results]),
+        "e2e_s": summarize([r["e2e_s"] for r in results]),
+        "flushes_per_s": summarize([r["flushes_per_s"] for r in results]),
+        "tokens_per_s": summarize([s.tokens_per_sec for s in stats if s.tokens_per_sec]),
+        "prompt_eval_count": stats[-1].prompt_tokens,
+        **cpu.to_dict(),
+    }
+
+
+async def scenario_long_history(url: str, workdir: Path, n_messages: int) -> Dict:
+    store = SessionStore(workdir / "long_history.db")
+    manager = SessionManager(store)
+    session = manager.create_new_session()
+    for i in range(n_messages):
+        role = "user" if i % 2 == 0 else "assistant"
+        manager.add_message(session, ChatMessage(role=role, content=f"Nachricht {i} " + "lorem ipsum " * 20))
+
+    t = time.perf_counter()
+    reloaded = SessionManager(store)
+    startup_s = time.perf_counter() - t
+
+    t = time.perf_counter()
+    reloaded.open_session(reloaded.sessions[0])
+    open_s = time.perf_counter() - t
+
+    bot = BotProfile(ollama_model=MODEL, system_prompt="Du bist hilfreich.")
+    builder = ContextBuilder()
+    t = time.perf_counter()
+    payload = builder.build(reloaded.active_session, bot)
+    first_build_s = time.perf_counter() - t
+
+    reloaded.add_message(reloaded.active_session, ChatMessage(content="Und jetzt?"))
+    t = time.perf_counter()
+    payload = builder.build(reloaded.active_session, bot)
+    incremental_build_s = time.perf_counter() - t
+
+    client = OllamaClient(MODEL, host=url)
+    stats = GenerationStats(MODEL)
+    turn = await timed_stream(client.chat(payload, options=bot.ollama_options(),
+                                          keep_alive=bot.keep_alive, stats=stats))
+    store.close()
+    return {
+        "messages": n_messages,
+        "startup_s": startup_s,
+        "open_session_s": open_s,
+        "first_build_s": first_build_s,
+        "incremental_build_s": incremental_build_s,
+        "payload_messages": len(payload),
+        "prompt_eval_count": stats.prompt_tokens,
+        "ttft_s": turn["ttft_s"],
+        "e2e_s": turn["e2e_s"],
+    }
+
+
+def scenario_many_sessions(workdir: Path, n_sessions: int, per_session: int) -> Dict:
+    store = SessionStore(workdir / "many_sessions.db")
+    writer = SessionManager(store)
+    for s in range(n_sessions):
+        session = writer.create_new_session()
+        for i in range(per_session):
+            writer.add_message(session, ChatMessage(content=f"Chat {s} Nachricht {i} " + "text " * 30))
+    del writer
+
+    rss_before = rss_bytes()
+    t = time.perf_counter()
+    manager = SessionManager(store)
+    startup_s = time.perf_counter() - t
+    rss_headers = rss_bytes() - rss_before
+
+    opened = manager.recent_sessions(8)
+    rss_before_open = rss_bytes()
+    for session in opened:
+        manager.open_session(session)
+    rss_per_open = (rss_bytes() - rss_before_open) / max(len(opened), 1)
+
+    t = time.perf_counter()
+    hits = manager.search("Nachricht 3")
+    search_s = time.perf_counter() - t
+    store.close()
+    return {
+        "sessions": n_sessions,
+        "messages_per_session": per_session,
+        "startup_s": startup_s,
+        "rss_headers_bytes": rss_headers,
+        "rss_per_session_header_bytes": rss_headers / max(n_sessions, 1),
+        "rss_per_opened_session_bytes": rss_per_open,
+        "search_s": search_s,
+        "search_hits": len(hits),
+    }
+
+
+async def scenario_concurrent_clients(url: str, workdir: Path, n_clients: int, max_in_flight: int) -> Dict:
+    store = SessionStore(workdir / "clients.db")
+    scheduler = GenerationScheduler(OllamaClient(MODEL, host=url), max_in_flight=max_in_flight)
+    bot = BotProfile(ollama_model=MODEL)
+
+    rss_before = rss_bytes()
+    managers = [SessionManager(store, owner_id=f"client-{i}") for i in range(n_clients)]
+    builders = [ContextBuilder() for _ in range(n_clients)]
+
+    async def one_client(i: int) -> Dict[str, float]:
+        manager = managers[i]
+        session = manager.create_new_session()
+        manager.add_message(session, ChatMessage(content=f"Frage von Client {i}"))
+        payload = builders[i].build(session, bot)
+        ticket = GenerationTicket(session.id, MODEL)
+        start = time.perf_counter()
+        result = await timed_stream(scheduler.chat(ticket, payload, options=bot.ollama_options()))
+        result["e2e_s"] = time.perf_counter() - start
+        result["queue_wait_s"] = ticket.stats.queue_wait
+        return result
+
+    with CpuTimer() as cpu:
+        results = await asyncio.gather(*(one_client(i) for i in range(n_clients)))
+    rss_per_client = (rss_bytes() - rss_before) / n_clients
+    store.close()
+
+    total_flushes = sum(r["flushes"] for r in results)
+    return {
+        "clients": n_clients,
+        "max_in_flight": max_in_flight,
+        "ttft_s": summarize([r["ttft_s"] for r in results]),
+        "e2e_s": summarize([r["e2e_s"] for r in results]),
+        "queue_wait_s": summarize([r["queue_wait_s"] for r in results]),
+        "ui_flushes_per_s": total_flushes / max(cpu.wall, 1e-9),
+        "rss_per_client_bytes": rss_per_client,
+        **cpu.to_dict(),
+    }
+
+
+async def scenario_compare(url: str, workdir: Path, n_bots: int = 3) -> Dict:
+    """Vergleichsmodus: eine Frage parallel an mehrere Bots (verschiedene Modelle)."""
+    store = SessionStore(workdir / "compare.db")
+    bots = [BotProfile(name=f"Bot {i}", ollama_model=f"modell-{i}:1b") for i in range(n_bots)]
+    manager = SessionManager(store, bots=bots)
+    session = manager.create_new_session()
+    manager.add_message(session, ChatMessage(content="Welches Modell ist am besten?"))
+    scheduler = GenerationScheduler(OllamaClient(MODEL, host=url))
+
+    t = time.perf_counter()
+    payloads = ContextBuilder().build_many(session, bots)
+    build_s = time.perf_counter() - t
+
+    async def one(bot: BotProfile, payload) -> Dict[str, float]:
+        ticket = GenerationTicket(session.id, bot.ollama_model)
+        return await timed_stream(scheduler.chat(ticket, payload, options=bot.ollama_options()))
+
+    t = time.perf_counter()
+    results = await asyncio.gather(*(one(bot, payload) for bot, payload in zip(bots, payloads)))
+    wall = time.perf_counter() - t
+    store.close()
+    return {
+        "bots": n_bots,
+        "build_s": build_s,
+        "wall_s": wall,
+        "slowest_e2e_s": max(r["e2e_s"] for r in results),
+        "sum_e2e_s": sum(r["e2e_s"] for r in results),
+        "ttft_s": summarize([r["ttft_s"] for r in results]),
+    }
+
+
+def server_stats(url: str) -> Dict[str, int]:
+    with urllib.request.urlopen(url + "/_stats") as response:
+        return json.loads(response.read())
+
+
+async def scenario_backends(args, n_requests: int) -> Dict:
+    """
+    Drei Hosts: einer mit geladenem Modell, einer kalt, dessen erste Anfragen
+    fehlschlagen, und einer, der gar nicht erreichbar ist.
+    """
+    server_args = (args.tokens_per_sec, args.latency, args.response_tokens)
+    with ExitStack() as stack:
+        warm = stack.enter_context(fake_server(*server_args))
+        flaky = stack.enter_context(fake_server(*server_args, "--loaded", "", "--fail-requests", "2"))
+        pool = BackendPool([DEAD_HOST, flaky, warm])
+        client = OllamaClient(MODEL, pool=pool)
+
+        t = time.perf_counter()
+        await pool.check_health()
+        health_s = time.perf_counter() - t
+
+        async def one_request() -> GenerationStats:
+            stats = GenerationStats(MODEL)
+            result = await timed_stream(client.chat([{"role": "user", "content": "Hallo"}], stats=stats))
+            stats.ttft = result["ttft_s"]
+            return stats
+
+        # Erste Anfrage nach dem Health-Check: Dead-Host ist bekannt, Flaky-Host kalt
+        # -> sollte direkt beim warmen Host landen. Danach verteilt sich die Last.
+        all_stats = [await one_request()]
+        # Flaky-Host als "gesund, Modell geladen" markieren, damit er ausgewählt wird und fehlschlägt
+        pool.backends[1].loaded_models.add(MODEL)
+        all_stats += await asyncio.gather(*(one_request() for _ in range(n_requests - 1)))
+
+        per_host = {url: (await asyncio.to_thread(server_stats, url))["completed"] for url in (warm, flaky)}
+        return {
+            "requests": n_requests,
+            "health_check_s": health_s,
+            "first_request_backend": all_stats[0].backend,
+            "completed_per_host": per_host,
+            "failovers": sum(s.failovers for s in all_stats),
+            "errors": sum(1 for s in all_stats if s.error),
+            "ttft_s": summarize([s.ttft for s in all_stats]),
+            "pool": pool.status(),
+        }
+
+
+async def scenario_residency(args) -> Dict:
+    """
+    Erste Antwort mit kaltem Modell: ohne Vorladen vs. Vorladen beim Öffnen/Tippen.
+    Danach mit einem Budget von einem Modell: das zuletzt unbenutzte wird entladen.
+    """
+    with fake_server(args.tokens_per_sec, args.latency, args.response_tokens, "--models",
+                     f"{MODEL},{OTHER_MODEL}", "--loaded", "", "--load-latency", str(LOAD_LATENCY)) as url:
+        pool = BackendPool([url])
+        await pool.check_health()
+        # Budget: genau ein Modell (der Fake-Server meldet 1 GB pro Modell)
+        residency = ModelResidency(pool, budget_bytes=1_000_000_000)
+        scheduler = GenerationScheduler(OllamaClient(MODEL, pool=pool), residency=residency)
+
+        async def first_answer(model: str) -> GenerationStats:
+            ticket = GenerationTicket("s", model)
+            await timed_stream(scheduler.chat(ticket, [{"role": "user", "content": "Hallo"}]))
+            return ticket.stats
+
+        cold = await first_answer(MODEL)
+
+        # Session mit dem anderen Modell wird geöffnet, der User tippt noch
+        residency.request_preload(OTHER_MODEL)
+        await asyncio.sleep(TYPING_S)
+        warm = await first_answer(OTHER_MODEL)
+
+        await pool.check_health()
+        return {
+            "load_latency_s": LOAD_LATENCY,
+            "cold_ttft_s": cold.ttft,
+            "preloaded_ttft_s": warm.ttft,
+            "preloaded_load_s": warm.load_duration,
+            "preloads": residency.preloads,
+            "evictions": residency.evictions,
+            "loaded_after": sorted(pool.backends[0].loaded_models),
+        }
+
+
+async def scenario_batch(url: str, n_prompts: int) -> Dict:
+    """Headless-Batch: Durchsatz (Tokens/s Wandzeit) je nach Parallelität."""
+    lines = [json.dumps({"id": i, "prompt": f"Frage {i}"}) for i in range(n_prompts)]
+    bot = BotProfile(ollama_model=MODEL)
+    results = {}
+    for concurrency in (1, 4, 16):
+        runner = BatchRunner(OllamaClient(MODEL, host=url), bot, concurrency, ordered=True)
+        summary = await runner.run(read_items(lines, bot), io.StringIO())
+        results[f"concurrency_{concurrency}"] = {"wall_s": summary.wall, "tokens_per_s": summary.throughput,
+                                                 "failed": summary.failed}
+    return results
+
+
+def scenario_documents(workdir: Path, megabytes: int) -> Dict:
+    """Canvas-Datei: Einlesen (kalt, Platten-Cache, Speicher-Cache) und Auswahl pro Frage."""
+    path = workdir / "document.py"
+    line = "    wert = berechne(eingabe, faktor) + korrektur  # Kommentar\n"
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(megabytes * 1024 * 1024 // len(line)):
+            f.write(f"def funktion_{i}(eingabe):\n" if i % 20 == 0 else line)
+
+    results = {"file_bytes": path.stat().st_size}
+    store = DocumentStore(workdir / "documents")
+    for label, loader in (("cold", store), ("memory_cache", store),
+                          ("disk_cache", DocumentStore(workdir / "documents"))):
+        with CpuTimer() as cpu:
+            document = loader.load(path)
+        results[f"load_{label}_s"] = cpu.wall
+
+    with CpuTimer() as cpu:
+        messages = context_messages([document], "Was macht funktion_4000 mit der eingabe?", 2048)
+    results["select_ms"] = cpu.wall * 1000
+    results["chunks"] = len(document.chunks)
+    results["prompt_chars"] = sum(len(m["content"]) for m in messages)
+    return results
+
+
+def markdown_answer(chars: int) -> List[str]:
+    """Eine lange Antwort mit Absätzen, Listen und Code, zerlegt in Token-große Stücke."""
+    pieces = ["## Abschnitt\n\n", "Ein Satz mit etwas **Markdown** und `Code`. " * 6 + "\n\n",
+              "- Punkt eins\n- Punkt zwei\n\n", "```python\nfor i in range(10):\n    print(i)\n```\n\n"]
+    text = ""
+    while len(text) < chars:
+        text += pieces[len(text) % len(pieces)]
+    return [text[i:i + 4] for i in range(0, len(text), 4)]
+
+
+def scenario_markdown_render(chars: int, flush_tokens: int = 32) -> Dict:
+    """Vergleicht "ganze Antwort pro Flush" mit blockweisem Rendern (nur der offene Block)."""
+    from nicegui.elements.markdown import prepare_content
+    to_html = lambda md: prepare_content.__wrapped__(md, 'fenced-code-blocks tables')
+    chunks = markdown_answer(chars)
+    flush_points = range(flush_tokens, len(chunks) + flush_tokens, flush_tokens)
+
+    results = {}
+    with CpuTimer() as cpu:
+        sent = 0
+        for end in flush_points:
+            sent += len(to_html("".join(chunks[:end])))
+    results["full_document"] = {"bytes_sent": sent, "cpu_s": cpu.cpu}
+
+    with CpuTimer() as cpu:
+        splitter = MarkdownBlockSplitter()
+        sent = 0
+        blocks = 0
+        for end in flush_points:
+            frozen, open_block = splitter.feed("".join(chunks[:end]))
+            for block in frozen:
+                sent += len(to_html(block))
+            blocks += len(frozen)
+            sent += len(to_html(open_block))
+    results["streaming_blocks"] = {"bytes_sent": sent, "cpu_s": cpu.cpu, "blocks": blocks}
+    results["chars"] = len("".join(chunks))
+    results["flushes"] = len(flush_points)
+    return results
+
+
+# --- Ablauf ---
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_all(args) -> Dict:
+    size = {key: values[1 if args.quick else 0] for key, values in SIZES.items()}
+    results: Dict[str, Dict] = {}
+    with tempfile.TemporaryDirectory() as tmp, \
+            fake_server(args.tokens_per_sec, args.latency, args.response_tokens) as url:
+        workdir = Path(tmp)
+        results["single_requests"] = await scenario_single_requests(url, size["single_requests"])
+        results["long_history"] = await scenario_long_history(url, workdir, size["history_messages"])
+        results["many_sessions"] = scenario_many_sessions(workdir, size["sessions"], size["messages_per_session"])
+        results["concurrent_clients"] = await scenario_concurrent_clients(
+            url, workdir, size["clients"], args.max_in_flight)
+        results["compare"] = await scenario_compare(url, workdir)
+        results["batch"] = await scenario_batch(url, size["batch_prompts"])
+    results["backends"] = await scenario_backends(args, size["backend_requests"])
+    results["residency"] = await scenario_residency(args)
+    results["markdown_render"] = scenario_markdown_render(size["markdown_chars"])
+    with tempfile.TemporaryDirectory() as tmp:
+        results["documents"] = scenario_documents(Path(tmp), size["document_mb"])
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "quick": args.quick,
+            "fake_server": {"tokens_per_sec": args.tokens_per_sec, "latency_s": args.latency,
+                            "response_tokens": args.response_tokens},
+        },
+        "scenarios": results,
+    }
+
+
+def flatten(data: Dict, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(old: Dict, new: Dict) -> List[str]:
+    """Zeilen 'metrik: alt -> neu (+x%)' für alle gemeinsamen Kennzahlen."""
+    old_flat, new_flat = flatten(old["scenarios"]), flatten(new["scenarios"])
+    lines = []
+    for name in sorted(old_flat.keys() & new_flat.keys()):
+        a, b = old_flat[name], new_flat[name]
+        change = f"{(b - a) / a * 100:+.1f}%" if a else "n/a"
+        lines.append(f"{name}: {a:.6g} -> {b:.6g} ({change})")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="KlugschAIsser End-to-End-Benchmarks")
+    parser.add_argument("--quick", action="store_true", help="Kleine Größen für einen schnellen Durchlauf")
+    parser.add_argument("--out", type=Path, help="JSON-Ergebnis in diese Datei schreiben")
+    parser.add_argument("--compare", type=Path, help="Mit einem früheren JSON-Ergebnis vergleichen")
+    parser.add_argument("--tokens-per-sec", type=float, default=200.0)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--response-tokens", type=int, default=200)
+    parser.add_argument("--max-in-flight", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(run_all(args))
+    text = json.dumps(result, indent=2)
+    if args.out:
+        args.out.write_text(text)
+    else:
+        print(text)
+
+    if args.compare:
+        for line in compare(json.loads(args.compare.read_text()), result):
+            print(line, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""
+Lokaler Ersatz für einen Ollama-Server (nur für Benchmarks).
+
+Spricht genug HTTP/1.1, damit ollama.AsyncClient damit arbeiten kann:
+/api/chat (Streaming als NDJSON), /api/generate (nur Laden/Entladen), /api/tags,
+/api/ps und /_stats. Tokens werden mit einstellbarer Rate und Anfangs-Latenz
+"generiert"; nicht geladene Modelle kosten zusätzlich 'load_latency'.
+
+Start als eigener Prozess:
+    python -m benchmarks.fake_ollama --port 0 --tokens-per-sec 200 --latency 0.05
+Die tatsächlich belegte Portnummer wird als erste Zeile ausgegeben.
+"""
+import argparse
+import asyncio
+import json
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set, Tuple
+
+WORDS = ("Das ist eine simulierte Antwort mit ein paar Wörtern und etwas `Code` "
+         "sowie **Markdown**, damit das Rendern realistisch bleibt.").split()
+
+
+@dataclass
+class FakeOllamaConfig:
+    tokens_per_sec: float = 200.0
+    first_token_latency: float = 0.05  # Sekunden bis zum ersten Token
+    response_tokens: int = 200
+    models: List[str] = field(default_factory=lambda: ["gemma3:1b"])
+    # Was /api/ps als geladen meldet (None = alle Modelle)
+    loaded_models: Optional[List[str]] = None
+    # Die ersten n Chat-Anfragen schlagen mit HTTP 500 fehl (Failover testen)
+    fail_requests: int = 0
+    # Sekunden, um ein nicht geladenes Modell zu laden (Kaltstart)
+    load_latency: float = 0.0
+
+
+@dataclass
+class FakeOllamaStats:
+    requests: int = 0
+    active: int = 0
+    max_active: int = 0
+    completed: int = 0
+    failed: int = 0
+    disconnected: int = 0  # Client hat den Stream vorzeitig geschlossen
+    loads: int = 0
+    unloads: int = 0
+
+    def to_dict(self) -> Dict[str, int]:
+        return dict(self.__dict__)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class FakeOllamaServer:
+    def __init__(self, config: FakeOllamaConfig, host: str = "127.0.0.1", port: int = 0):
+        self.config = config
+        self.host = host
+        self.port = port
+        self.stats = FakeOllamaStats()
+        self.loaded: Set[str] = set(config.models if config.loaded_models is None else config.loaded_models)
+        self._loading: Dict[str, asyncio.Task] = {}
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    # --- HTTP ---
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, path, body = request
+                await self._route(method, path, body, writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_request(reader: asyncio.StreamReader):
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError:
+            return None  # Verbindung wurde geschlossen
+        lines = head.decode("latin-1").split("\r\n")
+        method, path, _ = lines[0].split(" ", 2)
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                key, value = line.split(":", 1)
+                headers[key.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", "0"))
+        body = await reader.readexactly(length) if length else b""
+        return method, path, json.loads(body) if body else {}
+
+    async def _route(self, method: str, path: str, body: dict, writer: asyncio.StreamWriter):
+        if path == "/api/chat":
+            await self._chat(body, writer)
+        elif path == "/api/generate":
+            await self._generate(body, writer)
+        elif path == "/api/tags":
+            await self._send_json(writer, {"models": [self._model_info(m) for m in self.config.models]})
+        elif path == "/api/ps":
+            await self._send_json(writer, {"models": [self._model_info(m) for m in sorted(self.loaded)]})
+        elif path == "/_stats":
+            await self._send_json(writer, self.stats.to_dict())
+        else:
+            await self._send_json(writer, {"error": f"unknown path {path}"}, status="404 Not Found")
+
+    @staticmethod
+    def _model_info(name: str) -> dict:
+        return {"name": name, "model": name, "size": 1_000_000_000, "digest": "0" * 64,
+                "modified_at": _now(), "details": {}}
+
+    @staticmethod
+    async def _send_json(writer: asyncio.StreamWriter, payload: dict, status: str = "200 OK"):
+        data = json.dumps(payload).encode()
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n\r\n".encode() + data
+        )
+        await writer.drain()
+
+    # --- Laden/Entladen ---
+
+    async def _load(self, model: str) -> float:
+        """Lädt das Modell falls nötig; gibt die Ladezeit in Sekunden zurück."""
+        if model in self.loaded:
+            return 0.0
+        # Gleichzeitige Anfragen warten auf denselben Ladevorgang
+        if model not in self._loading:
+            self._loading[model] = asyncio.ensure_future(asyncio.sleep(self.config.load_latency))
+        start = asyncio.get_running_loop().time()
+        await asyncio.shield(self._loading[model])
+        if model not in self.loaded:
+            self.loaded.add(model)
+            self.stats.loads += 1
+            self._loading.pop(model, None)
+        return asyncio.get_running_loop().time() - start
+
+    def _apply_keep_alive(self, model: str, keep_alive):
+        if keep_alive in (0, "0", "0s", "0m"):
+            if model in self.loaded:
+                self.loaded.discard(model)
+                self.stats.unloads += 1
+
+    async def _generate(self, body: dict, writer: asyncio.StreamWriter):
+        """Nur was ModelResidency braucht: leerer Prompt lädt, keep_alive=0 entlädt."""
+        model = body.get("model", "")
+        load = 0.0
+        if body.get("keep_alive") not in (0, "0", "0s", "0m"):
+            load = await self._load(model)
+        self._apply_keep_alive(model, body.get("keep_alive"))
+        await self._send_json(writer, {"model": model, "created_at": _now(), "response": "", "done": True,
+                                       "load_duration": int(load * 1e9)})
+
+    # --- /api/chat ---
+
+    def _tokens(self) -> List[str]:
+        return [WORDS[i % len(WORDS)] + " " for i in range(self.config.response_tokens)]
+
+    def _final_chunk(self, model: str, messages: list, content: str = "", load: float = 0.0) -> dict:
+        prompt_tokens = sum(len(m.get("content", "")) // 4 + 4 for m in messages)
+        n = self.config.response_tokens
+        return {
+            "model": model, "created_at": _now(),
+            "message": {"role": "assistant", "content": content},
+            "done": True, "done_reason": "stop",
+            "prompt_eval_count": prompt_tokens, "prompt_eval_duration": prompt_tokens * 100_000,
+            "eval_count": n, "eval_duration": int(n / self.config.tokens_per_sec * 1e9),
+            "load_duration": int(load * 1e9),
+            "total_duration": int((load + n / self.config.tokens_per_sec) * 1e9),
+        }
+
+    async def _chat(self, body: dict, writer: asyncio.StreamWriter):
+        model = body.get("model", "")
+        messages = body.get("messages") or []
+        self.stats.requests += 1
+        if self.stats.requests <= self.config.fail_requests:
+            self.stats.failed += 1
+            await self._send_json(writer, {"error": "simulierter Serverfehler"},
+                                  status="500 Internal Server Error")
+            return
+        self.stats.active += 1
+        self.stats.max_active = max(self.stats.max_active, self.stats.active)
+        try:
+            load = await self._load(model)
+            await asyncio.sleep(self.config.first_token_latency)
+            if not body.get("stream", True):
+                await self._send_json(writer, self._final_chunk(model, messages, "".join(self._tokens()), load))
+                self.stats.completed += 1
+                return
+
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+                         b"Transfer-Encoding: chunked\r\n\r\n")
+            delay = 1.0 / self.config.tokens_per_sec
+            for token in self._tokens():
+                chunk = {"model": model, "created_at": _now(),
+                         "message": {"role": "assistant", "content": token}, "done": False}
+                self._write_chunk(writer, chunk)
+                await writer.drain()
+                await asyncio.sleep(delay)
+            self._write_chunk(writer, self._final_chunk(model, messages, load=load))
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+            self.stats.completed += 1
+            self._apply_keep_alive(model, body.get("keep_alive"))
+        except ConnectionError:
+            self.stats.disconnected += 1
+            raise
+        finally:
+            self.stats.active -= 1
+
+    @staticmethod
+    def _write_chunk(writer: asyncio.StreamWriter, payload: dict):
+        data = json.dumps(payload).encode() + b"\n"
+        writer.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+
+def parse_args(argv=None) -> Tuple[argparse.Namespace, FakeOllamaConfig]:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--tokens-per-sec", type=float, default=200.0)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--response-tokens", type=int, default=200)
+    parser.add_argument("--models", default="gemma3:1b", help="Kommagetrennt")
+    parser.add_argument("--loaded", default=None, help="Kommagetrennt, laut /api/ps geladen (Standard: alle)")
+    parser.add_argument("--fail-requests", type=int, default=0)
+    parser.add_argument("--load-latency", type=float, default=0.0, help="Sekunden pro Kaltstart")
+    args = parser.parse_args(argv)
+    loaded = None if args.loaded is None else [m for m in args.loaded.split(",") if m]
+    config = FakeOllamaConfig(args.tokens_per_sec, args.latency, args.response_tokens,
+                              args.models.split(","), loaded, args.fail_requests, args.load_latency)
+    return args, config
+
+
+async def _serve(args, config):
+    server = FakeOllamaServer(config, args.host, args.port)
+    await server.start()
+    print(server.port, flush=True)
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    _args, _config = parse_args()
+    try:
+        asyncio.run(_serve(_args, _config))
+    except KeyboardInterrupt:
+        pass
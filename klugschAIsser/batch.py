@@ -0,0 +1,301 @@
+"""
+Batch-Betrieb ohne Oberfläche: viele Prompts aus einer JSONL-Datei abarbeiten.
+
+    python -m klugschAIsser.batch prompts.jsonl -o antworten.jsonl --model gemma3:1b --concurrency 4
+
+Eingabe, eine Zeile pro Prompt:
+    {"id": "q1", "prompt": "..."}  oder  {"id": "q2", "messages": [{"role": "user", "content": "..."}]}
+Optional pro Zeile: "system" und "model". Ohne "id" gilt die Zeilennummer.
+
+Ausgabe, eine Zeile pro Prompt (sofort geschrieben):
+    {"id", "model", "response", "error", "attempts", "eval_tokens", "tokens_per_sec", "ttft", "duration"}
+
+Die Ausgabedatei ist gleichzeitig der Checkpoint: Wird ein abgebrochener Lauf mit
+derselben Ausgabedatei neu gestartet, werden alle Ids übersprungen, die dort schon
+ohne Fehler stehen. Gibt es eine Id mehrfach, gilt die letzte Zeile.
+
+Importiert weder NiceGUI noch PySide6, startet also schnell.
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, TextIO
+
+from klugschAIsser.core.backend_pool import BackendPool, hosts_from_env
+from klugschAIsser.core.metrics import GenerationStats
+from klugschAIsser.core.ollama_client import OllamaClient
+from klugschAIsser.core.types import BotProfile
+
+DEFAULT_CONCURRENCY = 4
+# Versuche pro Prompt (1 = keine Wiederholung)
+MAX_ATTEMPTS = 3
+# Wartezeit vor der n-ten Wiederholung: BACKOFF_BASE * 2^(n-1) (+ Zufall), höchstens BACKOFF_MAX
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 30.0
+
+
+@dataclass
+class BatchItem:
+    index: int  # laufende Nummer ohne Leerzeilen (für --ordered)
+    id: Any
+    messages: List[Dict[str, str]]
+    model: Optional[str] = None
+
+
+@dataclass
+class BatchSummary:
+    total: int = 0
+    skipped: int = 0  # schon im Checkpoint
+    completed: int = 0
+    failed: int = 0
+    retries: int = 0
+    eval_tokens: int = 0
+    eval_duration: float = 0.0  # Summe über alle Streams
+    wall: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Generierte Tokens pro Sekunde Wandzeit (alle Streams zusammen)."""
+        return self.eval_tokens / self.wall if self.wall else 0.0
+
+    @property
+    def tokens_per_sec(self) -> float:
+        """Durchschnittliche Geschwindigkeit eines einzelnen Streams (laut Ollama)."""
+        return self.eval_tokens / self.eval_duration if self.eval_duration else 0.0
+
+    def summary(self) -> str:
+        return (f"{self.completed} fertig, {self.failed} fehlgeschlagen, {self.skipped} übersprungen "
+                f"(von {self.total}), {self.retries} Wiederholungen · {self.eval_tokens} Tokens in "
+                f"{self.wall:.1f} s = {self.throughput:.1f} Tok/s gesamt, "
+                f"{self.tokens_per_sec:.1f} Tok/s pro Stream")
+
+
+def read_items(lines: Iterable[str], bot: BotProfile) -> Iterator[BatchItem]:
+    """Liest die Eingabe zeilenweise (die Datei wird nie ganz in den Speicher geladen)."""
+    index = 0
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        messages = record.get("messages") or [{"role": "user", "content": record["prompt"]}]
+        system = record.get("system", bot.system_prompt)
+        if system and messages[0].get("role") != "system":
+            messages = [{"role": "system", "content": system}] + messages
+        index += 1
+        yield BatchItem(index, record.get("id", number), messages, record.get("model"))
+
+
+def completed_ids(lines: Iterable[str]) -> Set[str]:
+    """Ids, die in einer früheren Ausgabe ohne Fehler stehen (Checkpoint)."""
+    done: Set[str] = set()
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue  # beim Abbruch halb geschriebene letzte Zeile
+        key = _key(record.get("id"))
+        if record.get("error"):
+            done.discard(key)
+        else:
+            done.add(key)
+    return done
+
+
+def truncate_torn_line(path: str):
+    """
+    Schneidet eine beim Abbruch halb geschriebene letzte Zeile ab. Sonst hinge das
+    erste neue Ergebnis direkt daran und beide Zeilen wären unlesbar.
+    """
+    try:
+        f = open(path, "rb+")
+    except FileNotFoundError:
+        return
+    with f:
+        pos = f.seek(0, 2)
+        # Rückwärts in Blöcken nach dem letzten Zeilenumbruch suchen (nicht die ganze Datei lesen)
+        while pos > 0:
+            start = max(0, pos - 4096)
+            f.seek(start)
+            newline = f.read(pos - start).rfind(b"\n")
+            if newline >= 0:
+                f.truncate(start + newline + 1)
+                return
+            pos = start
+        f.truncate(0)
+
+
+def _key(item_id: Any) -> str:
+    # Ids können Zahlen oder Strings sein; verglichen wird die JSON-Darstellung
+    return json.dumps(item_id)
+
+
+class BatchRunner:
+    """
+    Arbeitet BatchItems mit höchstens 'concurrency' gleichzeitigen Anfragen ab.
+
+    Die Eingabe wird nur so weit gelesen, wie Worker frei sind (begrenzte Queue).
+    Fehlgeschlagene Anfragen werden mit exponentiellem Backoff wiederholt.
+    Ergebnisse werden sofort geschrieben: in Fertigstellungs-Reihenfolge oder,
+    mit 'ordered', in Eingabe-Reihenfolge (dann puffert der Runner Vorläufer).
+    """
+
+    def __init__(self, client: OllamaClient, bot: BotProfile, concurrency: int = DEFAULT_CONCURRENCY,
+                 max_attempts: int = MAX_ATTEMPTS, backoff_base: float = BACKOFF_BASE, ordered: bool = False):
+        self.client = client
+        self.bot = bot
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.ordered = ordered
+
+        self.stats = BatchSummary()
+        self._out: Optional[TextIO] = None
+        # Nur bei 'ordered': index -> fertige Zeile (None = übersprungen)
+        self._pending: Dict[int, Optional[str]] = {}
+        self._next_index = 1
+
+    async def run(self, items: Iterable[BatchItem], out: TextIO, done: Optional[Set[str]] = None) -> BatchSummary:
+        self._out = out
+        done = done or set()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        workers = [asyncio.create_task(self._worker(queue)) for _ in range(self.concurrency)]
+
+        start = time.perf_counter()
+        try:
+            for item in items:
+                self.stats.total += 1
+                if _key(item.id) in done:
+                    self.stats.skipped += 1
+                    self._write(item.index, None)
+                    continue
+                await queue.put(item)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            self.stats.wall = time.perf_counter() - start
+        return self.stats
+
+    async def _worker(self, queue: asyncio.Queue):
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            result = await self._generate(item)
+            self._write(item.index, json.dumps(result, ensure_ascii=False))
+
+    async def _generate(self, item: BatchItem) -> Dict[str, Any]:
+        model = item.model or self.bot.ollama_model
+        for attempt in range(1, self.max_attempts + 1):
+            stats = GenerationStats(model)
+            parts = []
+            async for chunk in self.client.chat(item.messages, model=model, options=self.bot.ollama_options(),
+                                                keep_alive=self.bot.keep_alive, stats=stats):
+                if chunk:
+                    stats.mark_first_token()
+                parts.append(chunk)
+            stats.finish()
+
+            # OllamaClient liefert Fehler als Text und setzt stats.error
+            if not stats.error:
+                break
+            if attempt < self.max_attempts:
+                self.stats.retries += 1
+                delay = min(BACKOFF_MAX, self.backoff_base * 2 ** (attempt - 1))
+                await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+
+        if stats.error:
+            self.stats.failed += 1
+        else:
+            self.stats.completed += 1
+            self.stats.eval_tokens += stats.eval_tokens or 0
+            self.stats.eval_duration += stats.eval_duration or 0.0
+
+        return {
+            "id": item.id,
+            "model": model,
+            "response": None if stats.error else "".join(parts),
+            "error": "".join(parts) if stats.error else None,
+            "attempts": attempt,
+            "eval_tokens": stats.eval_tokens,
+            "tokens_per_sec": stats.tokens_per_sec,
+            "ttft": stats.ttft,
+            "duration": stats.duration,
+        }
+
+    def _write(self, index: int, line: Optional[str]):
+        if not self.ordered:
+            if line is not None:
+                self._emit(line)
+            return
+        self._pending[index] = line
+        while self._next_index in self._pending:
+            line = self._pending.pop(self._next_index)
+            if line is not None:
+                self._emit(line)
+            self._next_index += 1
+
+    def _emit(self, line: str):
+        # Sofort auf die Platte, damit ein Abbruch höchstens laufende Anfragen verliert
+        self._out.write(line + "\n")
+        self._out.flush()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Prompts aus einer JSONL-Datei ohne Oberfläche beantworten.")
+    parser.add_argument("input", help="JSONL-Datei mit Prompts ('-' = stdin)")
+    parser.add_argument("-o", "--output", required=True, help="JSONL-Ausgabe, zugleich Checkpoint")
+    parser.add_argument("--model", default=BotProfile.ollama_model)
+    parser.add_argument("--system", default="", help="System-Prompt für alle Zeilen ohne eigenen")
+    parser.add_argument("--temperature", type=float, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--num-ctx", type=int, default=BotProfile.num_ctx)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--attempts", type=int, default=MAX_ATTEMPTS, help="Versuche pro Prompt")
+    parser.add_argument("--ordered", action="store_true", help="Ausgabe in Eingabe-Reihenfolge")
+    parser.add_argument("--restart", action="store_true", help="Checkpoint ignorieren, Ausgabe überschreiben")
+    return parser.parse_args(argv)
+
+
+async def _run(args) -> BatchSummary:
+    options = {key: value for key, value in (("temperature", args.temperature), ("seed", args.seed))
+               if value is not None}
+    bot = BotProfile(name="Batch", ollama_model=args.model, system_prompt=args.system,
+                     num_ctx=args.num_ctx, options=options)
+    # Mehrere Hosts über OLLAMA_HOSTS wie in der Web-Oberfläche
+    client = OllamaClient(args.model, pool=BackendPool(hosts_from_env()))
+    runner = BatchRunner(client, bot, args.concurrency, args.attempts, ordered=args.ordered)
+
+    done: Set[str] = set()
+    if not args.restart:
+        truncate_torn_line(args.output)
+        try:
+            with open(args.output, encoding="utf-8") as previous:
+                done = completed_ids(previous)
+        except FileNotFoundError:
+            pass
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    try:
+        with open(args.output, "w" if args.restart else "a", encoding="utf-8") as out:
+            return await runner.run(read_items(source, bot), out, done)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    summary = asyncio.run(_run(args))
+    print(summary.summary(), file=sys.stderr)
+    return 1 if summary.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+import httpx
+import ollama
+
+logger = logging.getLogger(__name__)
+
+# Wie lange ein Health-Check pro Host dauern darf (Sekunden)
+HEALTH_TIMEOUT = 3.0
+# Abstand der Health-Checks (Sekunden)
+HEALTH_INTERVAL = 10.0
+# Verbindungen pro Host, die für Streams offen gehalten werden
+MAX_CONNECTIONS_PER_HOST = 16
+# Ein Host ohne geladenes Modell zählt so viele Anfragen mehr (Kaltstart dauert Sekunden)
+COLD_LOAD_PENALTY = 4
+
+
+def hosts_from_env() -> List[Optional[str]]:
+    """
+    OLLAMA_HOSTS="http://a:11434,http://b:11434" -> mehrere Backends.
+    Ohne Variable ein einzelnes Backend mit Standard-Host (OLLAMA_HOST bzw. localhost).
+    """
+    hosts = [h.strip() for h in os.environ.get('OLLAMA_HOSTS', '').split(',') if h.strip()]
+    return hosts or [None]
+
+
+class Backend:
+    """Ein Ollama-Host mit eigenem HTTP-Verbindungspool und dem zuletzt bekannten Zustand."""
+
+    def __init__(self, host: Optional[str] = None):
+        self.host = host
+        self.client = ollama.AsyncClient(
+            host=host,
+            limits=httpx.Limits(max_connections=MAX_CONNECTIONS_PER_HOST,
+                               max_keepalive_connections=MAX_CONNECTIONS_PER_HOST),
+        )
+
+        self.healthy = True  # bis zum ersten Check optimistisch
+        # Modelle, die der Host kennt (/api/tags); None = noch unbekannt
+        self.available_models: Optional[Set[str]] = None
+        # Modelle, die gerade im Speicher liegen (/api/ps) -> kein Kaltstart
+        self.loaded_models: Set[str] = set()
+        # Speicherbedarf der geladenen Modelle in Bytes (laut /api/ps)
+        self.loaded_sizes: Dict[str, int] = {}
+        self.outstanding = 0
+        self.failures = 0
+        self.last_check: Optional[float] = None
+
+    @property
+    def name(self) -> str:
+        return self.host or "default"
+
+    def has_model(self, model: str) -> bool:
+        return self.available_models is None or model in self.available_models
+
+    async def check(self):
+        """Fragt /api/ps und /api/tags ab. Jeder Fehler macht den Host vorübergehend ungesund."""
+        try:
+            ps, tags = await asyncio.wait_for(
+                asyncio.gather(self.client.ps(), self.client.list()), HEALTH_TIMEOUT)
+        except Exception as e:
+            if self.healthy:
+                logger.warning("Ollama-Host %s nicht erreichbar: %s", self.name, e)
+            self.healthy = False
+        else:
+            self.loaded_sizes = {m.model: m.size or 0 for m in ps.models}
+            self.loaded_models = set(self.loaded_sizes)
+            self.available_models = {m.model for m in tags.models}
+            self.healthy = True
+        self.last_check = time.monotonic()
+
+    def mark_failed(self):
+        self.failures += 1
+        self.healthy = False
+
+    def mark_success(self, model: str):
+        # Nach einer erfolgreichen Antwort liegt das Modell auf jeden Fall im Speicher
+        self.healthy = True
+        self.loaded_models.add(model)
+
+    def mark_unloaded(self, model: str):
+        self.loaded_models.discard(model)
+        self.loaded_sizes.pop(model, None)
+
+
+class BackendPool:
+    """
+    Verteilt Anfragen auf mehrere Ollama-Hosts.
+
+    Auswahl: nur gesunde Hosts, die das Modell haben; davon der mit den wenigsten
+    laufenden Anfragen, wobei Hosts ohne geladenes Modell COLD_LOAD_PENALTY
+    Anfragen Aufschlag bekommen. Sind alle Hosts ungesund, wird trotzdem einer
+    versucht (der Health-Check kann veraltet sein).
+    """
+
+    def __init__(self, hosts: Optional[Sequence[Optional[str]]] = None,
+                 health_interval: float = HEALTH_INTERVAL):
+        self.backends = [Backend(host) for host in (hosts or [None])]
+        self.health_interval = health_interval
+
+    def __len__(self):
+        return len(self.backends)
+
+    def pick(self, model: str, exclude: Iterable[Backend] = ()) -> Optional[Backend]:
+        excluded = set(map(id, exclude))
+        candidates = [b for b in self.backends if id(b) not in excluded]
+        if not candidates:
+            return None
+
+        preferred = [b for b in candidates if b.healthy and b.has_model(model)] \
+            or [b for b in candidates if b.healthy] \
+            or candidates
+        # Bei Gleichstand gewinnt der zuerst konfigurierte Host
+        return min(preferred, key=lambda b: b.outstanding + (0 if model in b.loaded_models else COLD_LOAD_PENALTY))
+
+    async def check_health(self):
+        await asyncio.gather(*(b.check() for b in self.backends))
+
+    async def run_health_checks(self):
+        """Dauerschleife für app.on_startup: hält Zustand und geladene Modelle aktuell."""
+        while True:
+            await self.check_health()
+            await asyncio.sleep(self.health_interval)
+
+    def status(self) -> List[dict]:
+        return [
+            {
+                "host": b.name,
+                "healthy": b.healthy,
+                "outstanding": b.outstanding,
+                "failures": b.failures,
+                "loaded_models": sorted(b.loaded_models),
+            }
+            for b in self.backends
+        ]
@@ -0,0 +1,81 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from klugschAIsser.core.session_manager import SessionManager
+from klugschAIsser.core.session_store import SessionStore
+from klugschAIsser.core.types import BotProfile
+
+
+@dataclass
+class _ClientEntry:
+    manager: SessionManager
+    connections: int = 0
+    last_seen: float = field(default_factory=time.monotonic)
+
+
+class ClientRegistry:
+    """
+    Verwaltet pro Browser-Client einen eigenen SessionManager.
+
+    Clients ohne offene Verbindung werden nach 'idle_timeout' Sekunden
+    (oder wenn mehr als 'max_idle_clients' warten, der am längsten inaktive)
+    aus dem Speicher entfernt. Ihre Chats liegen weiterhin im SessionStore
+    und werden beim nächsten Besuch wieder geladen.
+    """
+
+    def __init__(self, store: Optional[SessionStore] = None,
+                 idle_timeout: float = 15 * 60, max_idle_clients: int = 50,
+                 bots: Optional[List[BotProfile]] = None):
+        self.store = store
+        # Verfügbare Bots, für alle Clients gleich (None = nur der Standard-Bot)
+        self.bots = bots
+        self.idle_timeout = idle_timeout
+        self.max_idle_clients = max_idle_clients
+        # Reihenfolge = zuletzt benutzt (ältester zuerst)
+        self._clients: "OrderedDict[str, _ClientEntry]" = OrderedDict()
+
+    def connect(self, client_id: str) -> SessionManager:
+        """Gibt den SessionManager des Clients zurück und zählt die Verbindung."""
+        entry = self._clients.get(client_id)
+        if entry is None:
+            entry = _ClientEntry(SessionManager(self.store, owner_id=client_id, bots=self.bots))
+            self._clients[client_id] = entry
+        entry.connections += 1
+        self.touch(client_id)
+        return entry.manager
+
+    def disconnect(self, client_id: str):
+        entry = self._clients.get(client_id)
+        if entry is None:
+            return
+        entry.connections = max(0, entry.connections - 1)
+        self.touch(client_id)
+        self.evict_idle()
+
+    def touch(self, client_id: str):
+        """Markiert den Client als aktiv."""
+        entry = self._clients.get(client_id)
+        if entry is None:
+            return
+        entry.last_seen = time.monotonic()
+        self._clients.move_to_end(client_id)
+
+    def evict_idle(self) -> int:
+        """Entfernt inaktive Clients. Gibt die Anzahl entfernter Clients zurück."""
+        now = time.monotonic()
+        idle = [cid for cid, entry in self._clients.items() if entry.connections == 0]
+        over_limit = len(idle) - self.max_idle_clients
+
+        evicted = 0
+        for cid in idle:  # ältester zuerst
+            entry = self._clients[cid]
+            if evicted < over_limit or now - entry.last_seen > self.idle_timeout:
+                entry.manager.unload()
+                del self._clients[cid]
+                evicted += 1
+        return evicted
+
+    def __len__(self):
+        return len(self._clients)
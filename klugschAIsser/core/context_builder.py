@@ -0,0 +1,167 @@
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional
+from uuid import UUID
+
+from klugschAIsser.core.types import BotProfile, ChatMessage, ChatSession
+
+# Grobe Schätzung: ~4 Zeichen pro Token, plus etwas Overhead für Rolle & Formatierung
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Beim Kürzen nicht nur knapp unter das Budget gehen, sondern auf diesen Anteil.
+# So bleibt der vordere Teil des Prompts über mehrere Züge identisch und Ollama
+# kann seinen Prompt-Cache (KV-Cache) wiederverwenden.
+TRIM_RATIO = 0.75
+
+# Wie viele Sessions gleichzeitig ein Kontextfenster im Speicher halten
+MAX_CACHED_WINDOWS = 64
+
+
+def estimate_tokens(text: str) -> int:
+    """Schätzt die Tokenanzahl eines Textes (ohne echten Tokenizer)."""
+    return -(-len(text) // CHARS_PER_TOKEN) + MESSAGE_OVERHEAD_TOKENS
+
+
+def message_tokens(message: ChatMessage) -> int:
+    """Gibt die Tokenanzahl zurück und berechnet sie nur beim ersten Aufruf."""
+    if message.token_count is None:
+        message.token_count = estimate_tokens(message.content)
+    return message.token_count
+
+
+@dataclass
+class _ContextWindow:
+    """Der aktuell gesendete Ausschnitt einer Session: messages[start:end]."""
+    start: int = 0
+    end: int = 0
+    tokens: int = 0
+    budget: int = 0  # Budget beim Aufbau bzw. letzten Kürzen
+    payload: Deque[Optional[Dict[str, str]]] = field(default_factory=deque)  # None = Alternative
+    counts: Deque[int] = field(default_factory=deque)
+
+
+class ContextBuilder:
+    """
+    Baut die Nachrichtenliste für Ollama innerhalb eines Token-Budgets.
+
+    Pro Session wird ein Fenster gemerkt. Bei jedem Zug werden nur die neuen
+    Nachrichten angehängt. Erst wenn das Budget überschritten ist, wird vorne
+    ein größerer Block entfernt, damit der Prompt-Anfang danach wieder mehrere
+    Züge lang byte-gleich bleibt. Ist das Budget später wieder größer (weniger
+    Zusatz-Kontext), wird das Fenster nach vorne neu aufgebaut.
+    Der System-Prompt steht immer an erster Stelle.
+    Alternative Antworten (Vergleichsmodus) werden nicht mitgeschickt.
+    """
+
+    def __init__(self):
+        self._windows: "OrderedDict[UUID, _ContextWindow]" = OrderedDict()
+
+    def build(self, session: ChatSession, bot: BotProfile,
+              extra: Optional[List[Dict[str, str]]] = None) -> List[Dict[str, str]]:
+        """
+        'extra' (z.B. Erinnerungen) wird direkt vor der neuesten Nachricht eingefügt,
+        damit der stabile Anfang des Prompts davon unberührt bleibt.
+        """
+        budget = self._history_budget(bot) - sum(estimate_tokens(e["content"]) for e in extra or ())
+        return self._with_system(bot, self._history(session, budget), extra)
+
+    def build_many(self, session: ChatSession, bots: List[BotProfile],
+                   extra: Optional[List[Dict[str, str]]] = None) -> List[List[Dict[str, str]]]:
+        """
+        Wie build, aber für mehrere Bots auf einmal (Vergleichsmodus): Der gemeinsame
+        Verlauf wird nur einmal aufgebaut (mit dem kleinsten Budget), jeder Bot
+        bekommt nur seinen eigenen System-Prompt davor.
+        """
+        budget = min(self._history_budget(bot) for bot in bots)
+        budget -= sum(estimate_tokens(e["content"]) for e in extra or ())
+        history = self._history(session, budget)
+        return [self._with_system(bot, history, extra) for bot in bots]
+
+    @staticmethod
+    def _history_budget(bot: BotProfile) -> int:
+        return bot.context_token_budget - (estimate_tokens(bot.system_prompt) if bot.system_prompt else 0)
+
+    @staticmethod
+    def _with_system(bot: BotProfile, history: List[Dict[str, str]],
+                     extra: Optional[List[Dict[str, str]]]) -> List[Dict[str, str]]:
+        system = [{"role": "system", "content": bot.system_prompt}] if bot.system_prompt else []
+        payload = system + history
+        if extra and payload:
+            payload[-1:-1] = extra
+        return payload
+
+    def _history(self, session: ChatSession, budget: int) -> List[Dict[str, str]]:
+        """Der Verlauf innerhalb des Budgets (ohne System-Prompt)."""
+        window = self._get_window(session, budget)
+        messages = session.messages
+
+        # 1. Nur die Nachrichten seit dem letzten Aufruf anhängen
+        for msg in messages[window.end:]:
+            self._append(window, msg)
+        window.end = len(messages)
+
+        # 2. Nur bei Überschreitung kürzen, dann aber gleich auf TRIM_RATIO des Budgets.
+        #    Die neueste Nachricht bleibt immer erhalten.
+        if window.tokens > budget:
+            target = int(budget * TRIM_RATIO)
+            while window.tokens > target and len(window.payload) > 1:
+                window.payload.popleft()
+                window.tokens -= window.counts.popleft()
+                window.start += 1
+            window.budget = budget
+
+        return [m for m in window.payload if m is not None]
+
+    def window_start(self, session: ChatSession) -> int:
+        """Index der ältesten Nachricht, die aktuell mitgeschickt wird (0 wenn unbekannt)."""
+        window = self._windows.get(session.id)
+        return window.start if window else 0
+
+    @staticmethod
+    def _append(window: _ContextWindow, msg: ChatMessage):
+        if msg.alternative_to is not None:
+            # Platzhalter, damit window.start weiter dem Index in session.messages entspricht
+            window.payload.append(None)
+            window.counts.append(0)
+            return
+        count = message_tokens(msg)
+        window.payload.append(msg.to_ollama_dict())
+        window.counts.append(count)
+        window.tokens += count
+
+    def forget(self, session_id: UUID):
+        """Verwirft das gemerkte Fenster einer Session."""
+        self._windows.pop(session_id, None)
+
+    def _get_window(self, session: ChatSession, budget: int) -> _ContextWindow:
+        window = self._windows.get(session.id)
+
+        # Neu, Nachrichten wurden ersetzt (z.B. neu geladen) oder das Budget ist größer als beim
+        # letzten Kürzen (z.B. Zug ohne Datei-Ausschnitte nach einem mit) -> Fenster neu aufbauen
+        if window is None or window.end > len(session.messages) or (window.start > 0 and budget > window.budget):
+            window = self._initial_window(session.messages, budget)
+            self._windows[session.id] = window
+
+        self._windows.move_to_end(session.id)
+        while len(self._windows) > MAX_CACHED_WINDOWS:
+            self._windows.popitem(last=False)
+        return window
+
+    def _initial_window(self, messages: List[ChatMessage], budget: int) -> _ContextWindow:
+        """Läuft nur vom Ende rückwärts, bis das Budget voll ist (nicht über die ganze Liste)."""
+        start = len(messages)
+        tokens = 0
+        while start > 0:
+            msg = messages[start - 1]
+            count = 0 if msg.alternative_to is not None else message_tokens(msg)
+            if tokens + count > budget and start < len(messages):
+                break
+            tokens += count
+            start -= 1
+
+        window = _ContextWindow(start=start, end=start, budget=budget)
+        for msg in messages[start:]:
+            self._append(window, msg)
+        window.end = len(messages)
+        return window
@@ -0,0 +1,214 @@
+import copy
+import hashlib
+import json
+import math
+import mmap
+import os
+import re
+import tempfile
+import threading
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from klugschAIsser.core.context_builder import estimate_tokens
+
+DEFAULT_DOCUMENT_DIR = Path.home() / ".klugschAIsser" / "documents"
+
+# Zielgröße eines Chunks in Bytes (~500 Tokens); geschnitten wird möglichst an Absätzen
+CHUNK_BYTES = 2000
+# Erkennung von Binärdateien: Nullbyte in den ersten Bytes
+BINARY_PROBE_BYTES = 8192
+# Anteil des Token-Budgets eines Bots, den Ausschnitte höchstens belegen
+DOCUMENT_BUDGET_SHARE = 0.5
+# BM25-Parameter (übliche Standardwerte)
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Wörter ohne Unterstrich, damit auch Teile von Bezeichnern wie "berechne_steuer" gefunden werden
+_WORD_RE = re.compile(r"[^\W_]+", re.UNICODE)
+
+
+def _terms(text: str) -> List[str]:
+    return _WORD_RE.findall(text.lower())
+
+
+@dataclass
+class Chunk:
+    index: int
+    first_line: int
+    text: str
+
+    @property
+    def last_line(self) -> int:
+        return self.first_line + self.text.count('\n') - (1 if self.text.endswith('\n') else 0)
+
+
+class Document:
+    """
+    Eine hochgeladene Datei, zerlegt in Chunks, mit einem kleinen BM25-Index.
+
+    Pro Frage werden nur die Chunks ausgewählt, die lexikalisch am besten passen,
+    statt die ganze Datei in jeden Prompt zu packen.
+    """
+
+    def __init__(self, name: str, digest: str, chunks: List[Chunk], size: Optional[int] = None):
+        self.name = name
+        self.digest = digest
+        self.chunks = chunks
+        # Größe der Datei in Bytes (nicht Zeichen)
+        self.size = size if size is not None else sum(len(c.text.encode('utf-8')) for c in chunks)
+
+        # Invertierter Index: Wort -> [(Chunk-Index, Häufigkeit)]
+        self._postings: Dict[str, List[Tuple[int, int]]] = {}
+        self._lengths: List[int] = []
+        for chunk in chunks:
+            terms = _terms(chunk.text)
+            self._lengths.append(len(terms))
+            for term, count in Counter(terms).items():
+                self._postings.setdefault(term, []).append((chunk.index, count))
+        self._avg_length = sum(self._lengths) / len(self._lengths) if self._lengths else 0.0
+
+    def rank(self, query: str) -> List[Tuple[float, Chunk]]:
+        """BM25-Bewertung aller Chunks, die mindestens ein Wort der Frage enthalten (beste zuerst)."""
+        n = len(self.chunks)
+        scores: Dict[int, float] = {}
+        for term in set(_terms(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for index, tf in postings:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[index] / self._avg_length)
+                scores[index] = scores.get(index, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+        return sorted(((score, self.chunks[i]) for i, score in scores.items()), key=lambda x: -x[0])
+
+
+def select_chunks(documents: List[Document], query: str, max_tokens: int) -> List[Tuple[Document, Chunk]]:
+    """
+    Die besten Chunks aller Dokumente, bis 'max_tokens' erreicht ist.
+    Zurück in Datei-Reihenfolge, damit zusammenhängende Stellen zusammen stehen.
+    """
+    ranked = sorted(((score, doc_index, doc, chunk)
+                     for doc_index, doc in enumerate(documents) for score, chunk in doc.rank(query)),
+                    key=lambda x: -x[0])
+    selected = []
+    used = 0
+    for _, doc_index, doc, chunk in ranked:
+        tokens = estimate_tokens(chunk.text)
+        if used + tokens > max_tokens:
+            continue
+        used += tokens
+        selected.append((doc_index, chunk.index, doc, chunk))
+    return [(doc, chunk) for _, _, doc, chunk in sorted(selected, key=lambda x: x[:2])]
+
+
+def context_messages(documents: List[Document], query: str, max_tokens: int) -> List[Dict[str, str]]:
+    """Passende Ausschnitte als System-Nachricht für ContextBuilder.build(extra=...)."""
+    selected = select_chunks(documents, query, max_tokens)
+    if not selected:
+        return []
+    parts = [f"### {doc.name} (Zeilen {chunk.first_line}–{chunk.last_line})\n```\n{chunk.text.rstrip()}\n```"
+             for doc, chunk in selected]
+    return [{"role": "system", "content": "Relevante Ausschnitte aus hochgeladenen Dateien:\n\n" + "\n\n".join(parts)}]
+
+
+def split_chunks(data: mmap.mmap, chunk_bytes: int = CHUNK_BYTES) -> Iterator[Chunk]:
+    """
+    Zerlegt die eingeblendete Datei, ohne sie ganz zu kopieren. Geschnitten wird an
+    der letzten Leerzeile bzw. dem letzten Zeilenumbruch in der zweiten Fensterhälfte,
+    notfalls hart (aber nie mitten in einem UTF-8-Zeichen).
+    """
+    size = len(data)
+    pos = 0
+    line = 1
+    index = 0
+    while pos < size:
+        end = min(size, pos + chunk_bytes)
+        if end < size:
+            cut = data.rfind(b"\n\n", pos + chunk_bytes // 2, end)
+            if cut < 0:
+                cut = data.rfind(b"\n", pos + chunk_bytes // 2, end)
+            if cut >= 0:
+                end = cut + 1
+            else:
+                while end > pos + 1 and data[end] & 0xC0 == 0x80:
+                    end -= 1
+        raw = data[pos:end]
+        yield Chunk(index, line, raw.decode('utf-8', errors='replace'))
+        line += raw.count(b"\n")
+        pos = end
+        index += 1
+
+
+class DocumentStore:
+    """
+    Liest hochgeladene Dateien per mmap ein und zerlegt sie genau einmal.
+
+    Die Chunks werden unter dem SHA-256 des Inhalts auf der Platte abgelegt
+    (dieselbe Datei erneut hochladen = nur noch Hash berechnen) und die
+    zuletzt benutzten Dokumente samt Index zusätzlich im Speicher gehalten.
+    load() ist blockierend und gehört in einen Thread (run.io_bound).
+    """
+
+    def __init__(self, directory: Optional[Path] = None, max_memory_documents: int = 16):
+        self.directory = Path(directory) if directory else DEFAULT_DOCUMENT_DIR
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_memory_documents = max_memory_documents
+        self._memory: "OrderedDict[str, Document]" = OrderedDict()
+        # load() läuft in Worker-Threads
+        self._lock = threading.Lock()
+
+    def load(self, path: Path, name: Optional[str] = None) -> Document:
+        name = name or Path(path).name
+        with open(path, 'rb') as f:
+            if f.seek(0, 2) == 0:
+                return Document(name, hashlib.sha256().hexdigest(), [])
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if b"\0" in data[:BINARY_PROBE_BYTES]:
+                    raise ValueError(f"{name} ist keine Textdatei")
+                digest = hashlib.sha256(data).hexdigest()
+                with self._lock:
+                    document = self._memory.get(digest)
+                if document is None:
+                    chunks = self._cached(digest)
+                    if chunks is None:
+                        chunks = list(split_chunks(data))
+                        self._write_cache(digest, chunks)
+                    document = Document(name, digest, chunks, len(data))
+
+        with self._lock:
+            self._memory[digest] = document
+            self._memory.move_to_end(digest)
+            while len(self._memory) > self.max_memory_documents:
+                self._memory.popitem(last=False)
+        if document.name != name:
+            # Gleicher Inhalt unter anderem Namen: Index teilen, nur der Name ist eigen
+            document = copy.copy(document)
+            document.name = name
+        return document
+
+    def _path(self, digest: str) -> Path:
+        return self.directory / digest[:2] / f"{digest}.json"
+
+    def _cached(self, digest: str) -> Optional[List[Chunk]]:
+        try:
+            rows = json.loads(self._path(digest).read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+        return [Chunk(i, first_line, text) for i, (first_line, text) in enumerate(rows)]
+
+    def _write_cache(self, digest: str, chunks: List[Chunk]):
+        path = self._path(digest)
+        path.parent.mkdir(exist_ok=True)
+        # Erst vollständig schreiben, dann umbenennen: ein Abbruch hinterlässt keinen halben Cache.
+        # Eigener Temp-Name, da dieselbe Datei gleichzeitig in zwei Threads geladen werden kann.
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump([[c.first_line, c.text] for c in chunks], f, ensure_ascii=False)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
@@ -0,0 +1,96 @@
+import re
+from typing import List, Optional, Tuple
+
+# Beginn/Ende eines Code-Blocks: ``` oder ~~~ (höchstens 3 Leerzeichen eingerückt)
+_FENCE_RE = re.compile(r" {0,3}(`{3,}|~{3,})")
+# Listenpunkt: "- ", "* ", "+ " oder "1. " / "1) "
+_LIST_ITEM_RE = re.compile(r" {0,3}([-*+]|\d{1,9}[.)])(\s|$)")
+
+
+class MarkdownBlockSplitter:
+    """
+    Zerlegt eine wachsende Markdown-Antwort in Blöcke.
+
+    Ein Block endet an einer Leerzeile außerhalb von Code-Blöcken. Abgeschlossen
+    ("eingefroren") wird er aber erst, wenn die nächste nicht-leere Zeile da ist
+    und ihn nicht fortsetzt (eingerückt oder nächster Punkt derselben Liste).
+    Eingefrorene Blöcke ändern sich nie mehr und müssen nur einmal gerendert werden.
+
+    Jeder Aufruf von feed() sieht nur die seit dem letzten Aufruf neuen Zeilen an.
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._block_start = 0  # Offset des offenen Blocks
+        self._scan_pos = 0  # bis hier sind ganze Zeilen ausgewertet
+        self._fence: Optional[str] = None  # Markierung des offenen Code-Blocks
+        self._boundary: Optional[int] = None  # mögliche Blockgrenze nach einer Leerzeile
+        self._block_is_list = False
+        self._block_has_content = False
+
+    @property
+    def in_code_block(self) -> bool:
+        return self._fence is not None
+
+    def feed(self, text: str) -> Tuple[List[str], str]:
+        """
+        'text' ist die gesamte bisherige Antwort (nur hinten angehängt).
+        Gibt die neu eingefrorenen Blöcke und den aktuell offenen Block zurück.
+        """
+        self._text = text
+        frozen: List[str] = []
+
+        while True:
+            newline = text.find('\n', self._scan_pos)
+            if newline < 0:
+                break
+            line = text[self._scan_pos:newline]
+            block = self._scan_line(line, self._scan_pos)
+            if block is not None:
+                frozen.append(block)
+            self._scan_pos = newline + 1
+
+        return frozen, self.open_block()
+
+    def finish(self) -> str:
+        """Der Rest nach Ende des Streams (wird nicht mehr eingefroren, nur noch einmal gerendert)."""
+        return self._text[self._block_start:]
+
+    def open_block(self) -> str:
+        """Der offene Block zum Rendern; ein noch offener Code-Block wird provisorisch geschlossen."""
+        block = self._text[self._block_start:]
+        if self._fence:
+            block += ("" if block.endswith('\n') else "\n") + self._fence
+        return block
+
+    def _scan_line(self, line: str, offset: int) -> Optional[str]:
+        """Wertet eine vollständige Zeile aus. Gibt einen eingefrorenen Block zurück, falls einer endet."""
+        if self._fence:
+            closing = _FENCE_RE.match(line)
+            if closing and closing.group(1)[0] == self._fence[0] and len(closing.group(1)) >= len(self._fence) \
+                    and not line[closing.end():].strip():
+                self._fence = None
+            return None
+
+        if not line.strip():
+            if self._block_has_content and self._boundary is None:
+                self._boundary = offset + len(line) + 1
+            return None
+
+        frozen = None
+        if self._boundary is not None:
+            continues = line[:1] in (' ', '\t') or (self._block_is_list and _LIST_ITEM_RE.match(line))
+            if not continues:
+                frozen = self._text[self._block_start:self._boundary]
+                self._block_start = self._boundary
+                self._block_has_content = False
+            self._boundary = None
+
+        if not self._block_has_content:
+            self._block_has_content = True
+            self._block_is_list = bool(_LIST_ITEM_RE.match(line))
+
+        fence = _FENCE_RE.match(line)
+        if fence:
+            self._fence = fence.group(1)
+        return frozen
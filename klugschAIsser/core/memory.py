@@ -0,0 +1,255 @@
+import asyncio
+import hashlib
+import re
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Callable, Iterable, List, Optional, Sequence, Set
+from uuid import UUID
+
+import numpy as np
+
+from klugschAIsser.core.types import ChatMessage
+
+# Async-Funktion: Liste von Texten -> Liste von Vektoren (gleiche Reihenfolge)
+EmbedFn = Callable[[List[str]], Awaitable[List[List[float]]]]
+
+DEFAULT_MEMORY_DIR = Path.home() / ".klugschAIsser" / "embeddings"
+
+# Wie viele Texte pro Anfrage an den Embed-Endpunkt gehen
+EMBED_BATCH_SIZE = 32
+# Startgröße der Vektor-Datei (Zeilen), wächst bei Bedarf auf das Doppelte
+INITIAL_CAPACITY = 1024
+# Treffer unterhalb dieser Ähnlichkeit werden ignoriert
+MIN_SCORE = 0.3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key    TEXT PRIMARY KEY,
+    value  TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS vectors (
+    hash     TEXT PRIMARY KEY,   -- sha256 des Inhalts
+    row      INTEGER NOT NULL,   -- Zeile in vectors.f32
+    content  TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_vectors_row ON vectors(row);
+CREATE TABLE IF NOT EXISTS items (
+    message_id  TEXT PRIMARY KEY,
+    session_id  TEXT NOT NULL,
+    owner_id    TEXT NOT NULL,
+    role        TEXT NOT NULL,
+    row         INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_items_row ON items(row);
+"""
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def make_hash_embedder(dim: int = 256) -> EmbedFn:
+    """
+    Lokaler Ersatz für das Ollama-Embedding (Tests, Offline-Betrieb).
+    Hashing-Trick über Wörter: ähnlicher Wortschatz -> ähnliche Vektoren.
+    """
+    async def embed(texts: List[str]) -> List[List[float]]:
+        vectors = np.zeros((len(texts), dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in _WORD_RE.findall(text.lower()):
+                h = int.from_bytes(hashlib.blake2b(word.encode('utf-8'), digest_size=8).digest(), 'little')
+                vectors[i, h % dim] += 1.0 if (h >> 63) else -1.0
+        return vectors.tolist()
+
+    return embed
+
+
+@dataclass
+class MemoryHit:
+    message_id: UUID
+    session_id: UUID
+    role: str
+    content: str
+    score: float
+
+
+class SemanticMemory:
+    """
+    Erinnerung über ältere Nachrichten per Embedding-Suche.
+
+    - Jeder Inhalt wird genau einmal eingebettet (Schlüssel: sha256 des Textes).
+    - Alle Vektoren liegen normalisiert in EINER float32-Datei, die per
+      np.memmap eingeblendet wird. Die Suche ist ein einziges Matrix-Vektor-Produkt.
+    - Welche Nachricht zu welcher Zeile gehört, steht in einer kleinen SQLite-DB.
+    """
+
+    def __init__(self, embed_fn: EmbedFn, directory: Optional[Path] = None):
+        self.embed_fn = embed_fn
+        self.directory = Path(directory) if directory else DEFAULT_MEMORY_DIR
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.vectors_path = self.directory / "vectors.f32"
+
+        self.conn = sqlite3.connect(self.directory / "index.db", check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+        self.dim = int(self._get_meta('dim', '0'))
+        self.count = int(self._get_meta('count', '0'))
+        self._matrix: Optional[np.memmap] = None
+        if self.dim:
+            self._open_matrix(self._capacity_on_disk())
+
+        # Verhindert, dass zwei Aufgaben gleichzeitig Zeilen anhängen
+        self._lock = asyncio.Lock()
+
+    # --- Speicher ---
+
+    def _get_meta(self, key: str, default: str) -> str:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, key: str, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def _capacity_on_disk(self) -> int:
+        if not self.vectors_path.exists():
+            return 0
+        return self.vectors_path.stat().st_size // (4 * self.dim)
+
+    def _open_matrix(self, capacity: int):
+        if self._matrix is not None:
+            self._matrix.flush()
+            self._matrix = None
+        if capacity == 0:
+            return
+        self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode='r+', shape=(capacity, self.dim))
+
+    def _ensure_capacity(self, rows: int):
+        capacity = self._matrix.shape[0] if self._matrix is not None else 0
+        if rows <= capacity:
+            return
+        new_capacity = max(INITIAL_CAPACITY, capacity * 2)
+        while new_capacity < rows:
+            new_capacity *= 2
+        # Datei vergrößern (mit Nullen auffüllen), dann neu einblenden
+        with open(self.vectors_path, 'ab') as f:
+            f.truncate(new_capacity * self.dim * 4)
+        self._open_matrix(new_capacity)
+
+    # --- Einbetten ---
+
+    async def _embed_new(self, texts: Iterable[str]) -> None:
+        """Bettet alle noch unbekannten Texte in Batches ein und hängt sie an die Matrix."""
+        missing = {}
+        for text in texts:
+            h = content_hash(text)
+            if h not in missing and not self.conn.execute(
+                    "SELECT 1 FROM vectors WHERE hash = ?", (h,)).fetchone():
+                missing[h] = text
+        if not missing:
+            return
+
+        items = list(missing.items())
+        for start in range(0, len(items), EMBED_BATCH_SIZE):
+            batch = items[start:start + EMBED_BATCH_SIZE]
+            vectors = np.asarray(await self.embed_fn([text for _, text in batch]), dtype=np.float32)
+
+            if not self.dim:
+                self.dim = vectors.shape[1]
+                self._set_meta('dim', self.dim)
+
+            # Normalisieren: dann ist das Skalarprodukt direkt die Kosinus-Ähnlichkeit
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors /= np.maximum(norms, 1e-12)
+
+            self._ensure_capacity(self.count + len(batch))
+            self._matrix[self.count:self.count + len(batch)] = vectors
+            self.conn.executemany(
+                "INSERT INTO vectors (hash, row, content) VALUES (?, ?, ?)",
+                [(h, self.count + i, text) for i, (h, text) in enumerate(batch)],
+            )
+            self.count += len(batch)
+            self._set_meta('count', self.count)
+            self._matrix.flush()
+            self.conn.commit()
+
+    async def index_messages(self, owner_id: str, session_id: UUID, messages: Sequence[ChatMessage]):
+        """Nimmt Nachrichten in das Gedächtnis auf. Bereits bekannte werden übersprungen."""
+        async with self._lock:
+            new = [
+                m for m in messages
+                if m.content.strip() and not self.conn.execute(
+                    "SELECT 1 FROM items WHERE message_id = ?", (str(m.id),)).fetchone()
+            ]
+            if not new:
+                return
+            await self._embed_new(m.content for m in new)
+
+            rows = dict(self.conn.execute(
+                f"SELECT hash, row FROM vectors WHERE hash IN ({','.join('?' * len(new))})",
+                [content_hash(m.content) for m in new],
+            ).fetchall())
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO items (message_id, session_id, owner_id, role, row) VALUES (?, ?, ?, ?, ?)",
+                [(str(m.id), str(session_id), owner_id, m.role, rows[content_hash(m.content)]) for m in new],
+            )
+            self.conn.commit()
+
+    def forget_session(self, session_id: UUID):
+        """Entfernt die Zuordnung einer gelöschten Session (Vektoren bleiben als Cache)."""
+        self.conn.execute("DELETE FROM items WHERE session_id = ?", (str(session_id),))
+        self.conn.commit()
+
+    # --- Suche ---
+
+    async def recall(self, owner_id: str, query: str, k: int,
+                     exclude: Optional[Set[UUID]] = None) -> List[MemoryHit]:
+        """Die k ähnlichsten Nachrichten des Users (alle Sessions) zu 'query'."""
+        if k <= 0 or not self.count or not query.strip():
+            return []
+        q = np.asarray((await self.embed_fn([query]))[0], dtype=np.float32)
+        q /= max(float(np.linalg.norm(q)), 1e-12)
+
+        # Matrix und Zeilenzahl festhalten: index_messages kann die Matrix währenddessen
+        # neu einblenden (_ensure_capacity), der Thread rechnet dann mit dem alten Stand weiter
+        async with self._lock:
+            matrix, count = self._matrix, self.count
+        # Großzügig Kandidaten holen, da Zeilen anderer User/ausgeschlossene wegfallen
+        candidates = min(count, k * 8 + len(exclude or ()))
+        rows, scores = await asyncio.to_thread(self._top_rows, matrix[:count], q, candidates)
+
+        exclude_ids = {str(m) for m in (exclude or ())}
+        hits: List[MemoryHit] = []
+        for row, score in zip(rows, scores):
+            if score < MIN_SCORE:
+                break
+            for message_id, session_id, role, content in self.conn.execute(
+                    "SELECT i.message_id, i.session_id, i.role, v.content FROM items i "
+                    "JOIN vectors v ON v.row = i.row WHERE i.row = ? AND i.owner_id = ?",
+                    (int(row), owner_id)):
+                if message_id in exclude_ids:
+                    continue
+                hits.append(MemoryHit(UUID(message_id), UUID(session_id), role, content, float(score)))
+                break  # gleicher Inhalt nur einmal
+            if len(hits) >= k:
+                break
+        return hits
+
+    @staticmethod
+    def _top_rows(matrix: np.ndarray, query: np.ndarray, n: int):
+        """Vektorisiertes Top-n über alle Zeilen (läuft im Thread-Pool)."""
+        scores = matrix @ query
+        if n < len(scores):
+            top = np.argpartition(-scores, n - 1)[:n]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+        return top, scores[top]
+
+    def close(self):
+        if self._matrix is not None:
+            self._matrix.flush()
+        self.conn.close()
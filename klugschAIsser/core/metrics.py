@@ -0,0 +1,218 @@
+import bisect
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Bucket-Grenzen der Histogramme
+SECONDS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+RENDER_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+TOKENS_PER_SEC_BUCKETS = (1, 2, 5, 10, 20, 40, 80, 160, 320)
+TOKEN_COUNT_BUCKETS = (16, 64, 256, 1024, 2048, 4096, 8192, 16384, 32768)
+
+PREFIX = "klugschaisser_"
+
+
+@dataclass
+class GenerationStats:
+    """
+    Messwerte einer einzelnen Generierung (alle Zeiten in Sekunden).
+
+    Wird vom Scheduler (Wartezeit, TTFT), vom OllamaClient (Werte aus dem
+    letzten Stream-Chunk) und vom ChatWidget (Renderzeit) befüllt.
+    """
+    model: str = ""
+    started: float = field(default_factory=time.perf_counter, repr=False)
+    queue_wait: Optional[float] = None
+    ttft: Optional[float] = None  # ab Anfrage, inkl. Wartezeit
+    duration: Optional[float] = None
+    prompt_tokens: Optional[int] = None
+    prompt_eval_duration: Optional[float] = None
+    eval_tokens: Optional[int] = None
+    eval_duration: Optional[float] = None
+    load_duration: Optional[float] = None
+    total_duration: Optional[float] = None
+    render_time: float = 0.0
+    renders: int = 0
+    cached: bool = False
+    cancelled: bool = False
+    error: Optional[str] = None
+    backend: Optional[str] = None  # Ollama-Host, der geantwortet hat
+    failovers: int = 0
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def mark_first_token(self):
+        if self.ttft is None:
+            self.ttft = self.elapsed()
+
+    def finish(self):
+        self.duration = self.elapsed()
+
+    def record_done_chunk(self, chunk):
+        """Übernimmt die Zähler aus dem letzten Ollama-Chunk (Dauern dort in Nanosekunden)."""
+        ns = lambda key: chunk.get(key) / 1e9 if chunk.get(key) is not None else None
+        self.prompt_tokens = chunk.get('prompt_eval_count')
+        self.prompt_eval_duration = ns('prompt_eval_duration')
+        self.eval_tokens = chunk.get('eval_count')
+        self.eval_duration = ns('eval_duration')
+        self.load_duration = ns('load_duration')
+        self.total_duration = ns('total_duration')
+
+    @property
+    def tokens_per_sec(self) -> Optional[float]:
+        if not self.eval_tokens or not self.eval_duration:
+            return None
+        return self.eval_tokens / self.eval_duration
+
+    def summary(self) -> str:
+        """Kurze Zeile für die Anzeige unter einer Antwort."""
+        parts = []
+        if self.cached:
+            parts.append("aus Cache")
+        if self.eval_tokens is not None:
+            parts.append(f"{self.eval_tokens} Tokens")
+        if self.tokens_per_sec is not None:
+            parts.append(f"{self.tokens_per_sec:.1f} Tok/s")
+        if self.ttft is not None:
+            parts.append(f"erstes Token {self.ttft:.2f} s")
+        if self.queue_wait:
+            parts.append(f"Warteschlange {self.queue_wait:.2f} s")
+        if self.prompt_tokens is not None:
+            parts.append(f"Prompt {self.prompt_tokens} Tokens")
+        if self.load_duration and self.load_duration >= 0.1:
+            parts.append(f"Modell geladen in {self.load_duration:.1f} s")
+        if self.error:
+            parts.append(f"Fehler: {self.error}")
+        return " · ".join(parts)
+
+
+class Histogram:
+    """Prometheus-Histogramm (kumulative Buckets) mit einem Label-Wert pro Reihe."""
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float]):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        # label -> (Zähler je Bucket inkl. +Inf, Summe)
+        self._series: Dict[str, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, label: str, value: float):
+        counts, total = self._series.setdefault(label, ([0] * (len(self.buckets) + 1), [0.0]))
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def render(self, label_name: str) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for label, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float('inf') else repr(float(bound))
+                lines.append(f'{self.name}_bucket{{{label_name}="{_escape(label)}",le="{le}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{label_name}="{_escape(label)}"}} {total[0]}')
+            lines.append(f'{self.name}_count{{{label_name}="{_escape(label)}"}} {cumulative}')
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._values: Dict[Tuple[Tuple[str, str], ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = tuple(sorted(labels.items()))
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self._values.items()):
+            labels = ",".join(f'{k}="{_escape(v)}"' for k, v in key)
+            lines.append(f"{self.name}{{{labels}}} {value}" if labels else f"{self.name} {value}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class MetricsRegistry:
+    """
+    Sammelt GenerationStats zu Histogrammen/Zählern (Label: Modell)
+    und gibt sie im Prometheus-Textformat aus.
+
+    Zusätzliche Momentwerte (z.B. Länge der Warteschlange) können als
+    Gauge-Funktionen registriert werden, die erst beim Abruf ausgewertet werden.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.queue_wait = Histogram(PREFIX + "queue_wait_seconds",
+                                    "Wartezeit in der Warteschlange", SECONDS_BUCKETS)
+        self.ttft = Histogram(PREFIX + "time_to_first_token_seconds",
+                              "Zeit bis zum ersten Token (inkl. Warteschlange)", SECONDS_BUCKETS)
+        self.duration = Histogram(PREFIX + "generation_duration_seconds",
+                                  "Gesamtdauer einer Generierung", SECONDS_BUCKETS)
+        self.tokens_per_sec = Histogram(PREFIX + "tokens_per_second",
+                                        "Generierte Tokens pro Sekunde (laut Ollama)", TOKENS_PER_SEC_BUCKETS)
+        self.prompt_tokens = Histogram(PREFIX + "prompt_tokens",
+                                       "Vom Modell ausgewertete Prompt-Tokens", TOKEN_COUNT_BUCKETS)
+        self.load_duration = Histogram(PREFIX + "model_load_seconds",
+                                       "Ladezeit des Modells (laut Ollama)", SECONDS_BUCKETS)
+        self.render_time = Histogram(PREFIX + "ui_render_seconds",
+                                     "Renderzeit der UI pro Antwort", RENDER_BUCKETS)
+        self.requests = Counter(PREFIX + "generations_total", "Generierungen nach Ausgang")
+        self.eval_tokens = Counter(PREFIX + "generated_tokens_total", "Insgesamt generierte Tokens")
+        self.failovers = Counter(PREFIX + "failovers_total", "Wechsel auf einen anderen Ollama-Host")
+        self._gauges: Dict[str, Tuple[str, str, Callable[[], Dict[str, float]]]] = {}
+
+    def add_gauge(self, name: str, help_text: str, fn: Callable[[], Dict[str, float]],
+                  label_name: str = "model"):
+        """'fn' liefert {label_wert: zahl}. Leerer Key = Wert ohne Label."""
+        self._gauges[PREFIX + name] = (help_text, label_name, fn)
+
+    def observe(self, stats: GenerationStats):
+        model = stats.model
+        if stats.error:
+            outcome = "error"
+        elif stats.cancelled:
+            outcome = "cancelled"
+        elif stats.cached:
+            outcome = "cached"
+        else:
+            outcome = "ok"
+
+        with self._lock:
+            self.requests.inc(model=model, outcome=outcome)
+            for histogram, value in (
+                    (self.queue_wait, stats.queue_wait),
+                    (self.ttft, stats.ttft),
+                    (self.duration, stats.duration),
+                    (self.tokens_per_sec, stats.tokens_per_sec),
+                    (self.prompt_tokens, stats.prompt_tokens),
+                    (self.load_duration, stats.load_duration),
+                    (self.render_time, stats.render_time if stats.renders else None)):
+                if value is not None:
+                    histogram.observe(model, value)
+            if stats.eval_tokens:
+                self.eval_tokens.inc(stats.eval_tokens, model=model)
+            if stats.failovers:
+                self.failovers.inc(stats.failovers, model=model)
+
+    def render(self) -> str:
+        with self._lock:
+            lines = []
+            for histogram in (self.queue_wait, self.ttft, self.duration, self.tokens_per_sec,
+                              self.prompt_tokens, self.load_duration, self.render_time):
+                lines += histogram.render("model")
+            lines += self.requests.render()
+            lines += self.eval_tokens.render()
+            lines += self.failovers.render()
+
+        for name, (help_text, label_name, fn) in self._gauges.items():
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+            for label, value in sorted(fn().items()):
+                lines.append(f'{name}{{{label_name}="{_escape(label)}"}} {value}' if label else f"{name} {value}")
+        return "\n".join(lines) + "\n"
@@ -1,32 +1,160 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
 import ollama
 
+from klugschAIsser.core.backend_pool import Backend, BackendPool
+from klugschAIsser.core.metrics import GenerationStats
+from klugschAIsser.core.response_cache import ResponseCache
+
+logger = logging.getLogger(__name__)
+
+# Gecachte Antworten werden in Stücken dieser Größe "gestreamt"
+REPLAY_CHUNK_CHARS = 32
+
 
 class OllamaClient:
-    def __init__(self, model='gemma3:1b'):
+    def __init__(self, model='gemma3:1b', cache: Optional[ResponseCache] = None, host: Optional[str] = None,
+                 pool: Optional[BackendPool] = None):
         self.model = model
-        # WICHTIG: AsyncClient statt normaler Client
-        # Das erlaubt uns, auf Antworten zu warten, ohne das ganze Programm zu blockieren.
-        self.client = ollama.AsyncClient()
+        # Optional: identische, deterministische Anfragen aus dem Cache beantworten
+        self.cache = cache
+        # Ein oder mehrere Ollama-Hosts, jeder mit eigenem ollama.AsyncClient
+        # (AsyncClient erlaubt uns, auf Antworten zu warten, ohne das ganze Programm zu blockieren).
+        # host=None -> OLLAMA_HOST bzw. localhost:11434
+        self.pool = pool or BackendPool([host])
 
-    async def chat(self, messages):
+    async def chat(self, messages: List[Dict[str, str]], model: Optional[str] = None,
+                   options: Optional[Dict[str, Any]] = None, keep_alive: Optional[str] = None,
+                   stats: Optional[GenerationStats] = None):
         """
         Asynchroner Generator.
         'async def' markiert die Funktion als coroutine (pausierbar).
+
+        'options' und 'keep_alive' sollten pro Session gleich bleiben:
+        Nur dann kann Ollama den bereits ausgewerteten Prompt-Anfang wiederverwenden.
+
+        'stats' (optional, pro Anfrage) wird mit den Zählern aus dem letzten Chunk befüllt.
         """
-        try:
-            # 'await' gibt die Kontrolle kurz an das System zurück, bis Ollama antwortet
-            stream = await self.client.chat(
-                model=self.model,
-                messages=messages,
-                stream=True
-            )
-
-            # 'async for' iteriert durch die Antwortschnipsel, sobald sie eintreffen
-            async for chunk in stream:
-                content = chunk.get('message', {}).get('content', '')
-                if content:
-                    yield content
-
-        except Exception as e:
+        model = model or self.model
+        if stats is not None and not stats.model:
+            stats.model = model
+
+        cache_key = None
+        if self.cache:
+            if self.cache.is_cacheable(options):
+                cache_key = self.cache.make_key(model, messages, options)
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    if stats is not None:
+                        stats.cached = True
+                    async for piece in self._replay(cached):
+                        yield piece
+                    return
+            else:
+                self.cache.bypassed += 1
+
+        parts = []
+        completed = False
+        tried: List[Backend] = []
+        error: Optional[Exception] = None
+        # Failover: schlägt ein Host fehl, BEVOR Text kam, wird der nächste versucht
+        while not parts:
+            backend = self.pool.pick(model, exclude=tried)
+            if backend is None:
+                break
+            if tried and stats is not None:
+                stats.failovers += 1
+            tried.append(backend)
+            if stats is not None:
+                stats.backend = backend.name
+
+            backend.outstanding += 1
+            stream = None
+            try:
+                # 'await' gibt die Kontrolle kurz an das System zurück, bis Ollama antwortet
+                stream = await backend.client.chat(
+                    model=model,
+                    messages=messages,
+                    stream=True,
+                    options=options,
+                    keep_alive=keep_alive,
+                )
+
+                # 'async for' iteriert durch die Antwortschnipsel, sobald sie eintreffen
+                async for chunk in stream:
+                    content = chunk.get('message', {}).get('content', '')
+                    if content:
+                        parts.append(content)
+                        yield content
+
+                    if chunk.get('done'):
+                        self._record_stats(chunk, stats)
+                        completed = True
+
+                backend.mark_success(model)
+                error = None
+                break
+
+            except Exception as e:
+                error = e
+                # 4xx (z.B. Modell fehlt auf diesem Host) heißt nicht, dass der Host kaputt ist
+                if not (isinstance(e, ollama.ResponseError) and e.status_code < 500):
+                    backend.mark_failed()
+                logger.warning("Ollama-Host %s: %s", backend.name, e)
+
+            finally:
+                backend.outstanding -= 1
+                # Bei Abbruch den HTTP-Stream sofort schließen, damit Ollama den Slot freigibt
+                if stream is not None:
+                    await stream.aclose()
+
+        if error is not None:
+            if stats is not None:
+                stats.error = type(error).__name__
             # Fehler auch als Text zurückgeben, damit er im Chat erscheint
-            yield f"Error: {str(e)}"
\ No newline at end of file
+            yield f"Error: {str(error)}"
+
+        # Nur vollständige, fehlerfreie Antworten cachen
+        if cache_key and completed:
+            self.cache.put(cache_key, ''.join(parts))
+
+    @staticmethod
+    async def _replay(text: str):
+        """Gibt eine gecachte Antwort über dieselbe Generator-Schnittstelle aus."""
+        for i in range(0, len(text), REPLAY_CHUNK_CHARS):
+            yield text[i:i + REPLAY_CHUNK_CHARS]
+            await asyncio.sleep(0)  # Event-Loop nicht blockieren
+
+    async def embed(self, texts: List[str], model: str) -> List[List[float]]:
+        """Berechnet Embeddings für mehrere Texte in einer Anfrage (mit Failover wie chat)."""
+        tried: List[Backend] = []
+        while True:
+            backend = self.pool.pick(model, exclude=tried)
+            tried.append(backend)
+            backend.outstanding += 1
+            try:
+                response = await backend.client.embed(model=model, input=texts)
+            except Exception as e:
+                # Wie in chat: 4xx (z.B. Embedding-Modell fehlt) heißt nicht, dass der Host kaputt ist
+                if not (isinstance(e, ollama.ResponseError) and e.status_code < 500):
+                    backend.mark_failed()
+                if len(tried) == len(self.pool):
+                    raise
+            else:
+                backend.mark_success(model)
+                return response['embeddings']
+            finally:
+                backend.outstanding -= 1
+
+    @staticmethod
+    def _record_stats(chunk, stats: Optional[GenerationStats]):
+        if stats is not None:
+            stats.record_done_chunk(chunk)
+        # Kleiner prompt_eval_count bei langem Verlauf = Prompt-Cache hat gegriffen
+        logger.debug(
+            "Prompt: %s Tokens in %.1f ms ausgewertet",
+            chunk.get('prompt_eval_count'),
+            (chunk.get('prompt_eval_duration') or 0) / 1e6,
+        )
@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+
+from klugschAIsser.core.backend_pool import Backend, BackendPool
+
+logger = logging.getLogger(__name__)
+
+# keep_alive für benutzte Modelle: negativ = Ollama entlädt nie selbst, das macht ModelResidency
+PINNED_KEEP_ALIVE = "-1m"
+# Beim Beenden bekommen angepinnte Modelle wieder eine normale Ablaufzeit
+RELEASE_KEEP_ALIVE = "5m"
+# Nach so vielen Sekunden ohne Benutzung wird ein Modell entladen
+IDLE_TIMEOUT = 15 * 60
+# Abstand der Prüfungen (Sekunden)
+CHECK_INTERVAL = 30.0
+
+
+def budget_from_env() -> Optional[int]:
+    """KLUGSCHAISSER_MODEL_MEMORY_GB=12 -> höchstens 12 GB geladene Modelle pro Ollama-Host."""
+    value = os.environ.get('KLUGSCHAISSER_MODEL_MEMORY_GB', '').strip()
+    return int(float(value) * 1024 ** 3) if value else None
+
+
+class ModelResidency:
+    """
+    Entscheidet, welche Modelle auf den Ollama-Hosts geladen bleiben.
+
+    - preload(): lädt das Modell einer Session im Hintergrund, sobald sie geöffnet
+      wird oder der User zu tippen beginnt, damit die erste Antwort nicht auf den
+      Kaltstart warten muss.
+    - Benutzte Modelle werden mit negativem keep_alive angepinnt (siehe GenerationScheduler).
+    - enforce(): entlädt Modelle, die länger als 'idle_timeout' unbenutzt sind, und
+      pro Host die am längsten unbenutzten, solange mehr als 'budget_bytes' geladen ist.
+      Modelle mit laufender Generierung werden nie entladen.
+
+    Was geladen ist, kommt aus /api/ps (BackendPool-Health-Check bzw. refresh()).
+    """
+
+    def __init__(self, pool: BackendPool, budget_bytes: Optional[int] = None,
+                 idle_timeout: float = IDLE_TIMEOUT, interval: float = CHECK_INTERVAL):
+        self.pool = pool
+        self.budget_bytes = budget_bytes
+        self.idle_timeout = idle_timeout
+        self.interval = interval
+        self.keep_alive = PINNED_KEEP_ALIVE
+
+        # model -> letzte Benutzung (monotonic); Reihenfolge = LRU, zuletzt benutzt hinten
+        self._last_used: "OrderedDict[str, float]" = OrderedDict()
+        self._in_use: Dict[str, int] = {}
+        # Modelle, die mit PINNED_KEEP_ALIVE angefragt wurden (laufen nicht von alleine ab)
+        self._pinned: Set[str] = set()
+        # Laufende Preloads, damit schnelles Tippen nicht mehrfach lädt
+        self._preloading: Dict[Tuple[int, str], asyncio.Task] = {}
+        self.preloads = 0
+        self.evictions = 0
+
+    # --- Benutzung (vom Scheduler) ---
+
+    def touch(self, model: str):
+        self._last_used[model] = time.monotonic()
+        self._last_used.move_to_end(model)
+
+    def begin(self, model: str):
+        self.touch(model)
+        self._pinned.add(model)
+        self._in_use[model] = self._in_use.get(model, 0) + 1
+
+    def end(self, model: str):
+        self.touch(model)
+        self._in_use[model] -= 1
+        if not self._in_use[model]:
+            del self._in_use[model]
+
+    # --- Vorladen ---
+
+    def request_preload(self, model: str):
+        """Startet preload() im Hintergrund (aus synchronen UI-Handlern aufrufbar)."""
+        backend = self.pool.pick(model)
+        if backend is None or model in backend.loaded_models:
+            self.touch(model)
+            return
+        key = (id(backend), model)
+        if key not in self._preloading:
+            self._preloading[key] = asyncio.get_running_loop().create_task(self.preload(model, backend))
+
+    async def preload(self, model: str, backend: Optional[Backend] = None):
+        """Lädt 'model' auf den Host, den auch die nächste Anfrage bekäme (leerer Prompt)."""
+        self.touch(model)
+        backend = backend or self.pool.pick(model)
+        if backend is None:
+            return
+        key = (id(backend), model)
+        try:
+            if model not in backend.loaded_models:
+                await backend.client.generate(model=model, prompt='', keep_alive=self.keep_alive)
+                backend.mark_success(model)
+                self._pinned.add(model)
+                self.preloads += 1
+                logger.info("Modell %s auf %s vorgeladen", model, backend.name)
+        except Exception as e:
+            logger.warning("Vorladen von %s auf %s fehlgeschlagen: %s", model, backend.name, e)
+        finally:
+            self._preloading.pop(key, None)
+        # Speicherbedarf des neuen Modells kennt erst /api/ps
+        await backend.check()
+        await self.enforce(backend, keep=model)
+
+    # --- Entladen ---
+
+    async def enforce(self, backend: Optional[Backend] = None, keep: Optional[str] = None):
+        """Entlädt untätige Modelle und hält das Speicherbudget ein (ein oder alle Hosts)."""
+        for b in [backend] if backend else self.pool.backends:
+            for model in self._evictable(b, keep):
+                await self.unload(b, model)
+
+    def _evictable(self, backend: Backend, keep: Optional[str] = None):
+        now = time.monotonic()
+        # Nie benutzte Modelle zählen als am ältesten
+        candidates = sorted((m for m in backend.loaded_models if m not in self._in_use and m != keep),
+                            key=lambda m: self._last_used.get(m, 0.0))
+
+        evict = []
+        for model in candidates:
+            last_used = self._last_used.get(model)
+            # Nur selbst angepinnte Modelle laufen nicht von alleine ab
+            if model in self._pinned and last_used is not None and now - last_used > self.idle_timeout:
+                evict.append(model)
+
+        if self.budget_bytes is not None:
+            loaded = sum(size for m, size in backend.loaded_sizes.items() if m not in evict)
+            for model in candidates:
+                if loaded <= self.budget_bytes:
+                    break
+                if model not in evict:
+                    evict.append(model)
+                    loaded -= backend.loaded_sizes.get(model, 0)
+        return evict
+
+    async def unload(self, backend: Backend, model: str):
+        try:
+            await backend.client.generate(model=model, prompt='', keep_alive=0)
+        except Exception as e:
+            logger.warning("Entladen von %s auf %s fehlgeschlagen: %s", model, backend.name, e)
+            return
+        backend.mark_unloaded(model)
+        self.evictions += 1
+        logger.info("Modell %s auf %s entladen", model, backend.name)
+
+    async def release(self):
+        """Für app.on_shutdown: angepinnte Modelle laufen danach wieder normal ab."""
+        for backend in self.pool.backends:
+            for model in list(backend.loaded_models):
+                if model in self._pinned:
+                    try:
+                        await backend.client.generate(model=model, prompt='', keep_alive=RELEASE_KEEP_ALIVE)
+                    except Exception as e:
+                        logger.warning("Freigeben von %s auf %s fehlgeschlagen: %s", model, backend.name, e)
+        self._pinned.clear()
+
+    # --- Hintergrund ---
+
+    async def refresh(self):
+        """Aktualisiert den Stand aus /api/ps aller Hosts."""
+        await self.pool.check_health()
+
+    async def run(self):
+        """Dauerschleife für app.on_startup."""
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.refresh()
+            await self.enforce()
+
+    def status(self) -> Dict[str, float]:
+        """Sekunden seit der letzten Benutzung je Modell (für /metrics)."""
+        now = time.monotonic()
+        return {model: round(now - last_used, 1) for model, last_used in self._last_used.items()}
@@ -0,0 +1,148 @@
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = Path.home() / ".klugschAIsser" / "response_cache"
+
+
+class ResponseCache:
+    """
+    Zwischenspeicher für komplette Antworten auf identische Anfragen.
+
+    Zwei Stufen: ein kleiner LRU-Cache im Speicher und ein größenbegrenztes
+    Verzeichnis auf der Platte (älteste Dateien fliegen zuerst).
+    Gecacht wird nur bei deterministischem Sampling (temperature=0 oder fester seed),
+    sonst würde der Cache zufällige Antworten "einfrieren".
+    """
+
+    def __init__(self, directory: Optional[Path] = None, max_memory_entries: int = 256,
+                 max_disk_bytes: int = 100 * 1024 * 1024):
+        self.directory = Path(directory) if directory else DEFAULT_CACHE_DIR
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        # Schlüssel -> Dateigröße, älteste zuerst (einmalig beim Start eingelesen)
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        self._scan_disk()
+
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    # --- Schlüssel ---
+
+    @staticmethod
+    def is_cacheable(options: Optional[Mapping[str, Any]]) -> bool:
+        """Nur deterministische Einstellungen liefern bei gleicher Anfrage die gleiche Antwort."""
+        if not options:
+            return False  # Ollama-Standard ist temperature=0.8
+        return options.get('temperature') == 0 or options.get('seed') is not None
+
+    @staticmethod
+    def make_key(model: str, messages: List[Dict[str, str]], options: Optional[Mapping[str, Any]]) -> str:
+        """Hash über Modell, normalisierte Nachrichten (inkl. System-Prompt) und Optionen."""
+        normalized = [
+            {"role": m.get("role", ""), "content": m.get("content", "").strip()}
+            for m in messages
+        ]
+        payload = json.dumps(
+            {"model": model, "messages": normalized, "options": dict(options or {})},
+            sort_keys=True, ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    # --- Zugriff ---
+
+    def get(self, key: str) -> Optional[str]:
+        text = self._memory.get(key)
+        if text is not None:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return text
+
+        if key in self._disk:
+            path = self._path(key)
+            try:
+                text = path.read_text(encoding='utf-8')
+            except OSError:
+                self._forget_disk(key)
+            else:
+                os.utime(path)  # LRU-Reihenfolge auch über Neustarts hinweg
+                self._disk.move_to_end(key)
+                self._remember(key, text)
+                self.hits += 1
+                return text
+
+        self.misses += 1
+        return None
+
+    def put(self, key: str, text: str):
+        self._remember(key, text)
+
+        path = self._path(key)
+        data = text.encode('utf-8')
+        try:
+            path.parent.mkdir(exist_ok=True)
+            # Erst vollständig schreiben, dann umbenennen: ein Abbruch hinterlässt keine halbe Antwort
+            tmp = path.with_suffix('.tmp')
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        except OSError as e:
+            # Platte voll o.ä.: die Antwort ist schon gestreamt, der Cache ist nur ein Bonus
+            logger.warning("Antwort-Cache konnte %s nicht schreiben: %s", path, e)
+            return
+        self._forget_disk(key)
+        self._disk[key] = len(data)
+        self._disk_bytes += len(data)
+
+        while self._disk_bytes > self.max_disk_bytes and len(self._disk) > 1:
+            oldest = next(iter(self._disk))
+            self._forget_disk(oldest)
+            try:
+                self._path(oldest).unlink()
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "memory_entries": len(self._memory),
+            "disk_entries": len(self._disk),
+            "disk_bytes": self._disk_bytes,
+        }
+
+    # --- intern ---
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.txt"
+
+    def _remember(self, key: str, text: str):
+        self._memory[key] = text
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _forget_disk(self, key: str):
+        size = self._disk.pop(key, None)
+        if size is not None:
+            self._disk_bytes -= size
+
+    def _scan_disk(self):
+        entries = []
+        for path in self.directory.glob("*/*.txt"):
+            stat = path.stat()
+            entries.append((stat.st_mtime, path.stem, stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_bytes += size
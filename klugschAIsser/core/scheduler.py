@@ -0,0 +1,203 @@
+import asyncio
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from klugschAIsser.core.metrics import GenerationStats
+from klugschAIsser.core.ollama_client import OllamaClient
+from klugschAIsser.core.residency import ModelResidency
+
+# Markiert das Ende eines Streams in der internen Queue
+_DONE = object()
+
+
+class GenerationTicket:
+    """
+    Eine angefragte Generierung.
+    'position' ist der Platz in der Warteschlange (0 = läuft gerade).
+    'stats' sammelt die Messwerte dieser einen Anfrage (Wartezeit, TTFT, Tokens/s ...).
+    """
+
+    def __init__(self, session_key: Any, model: str,
+                 on_position: Optional[Callable[[int], None]] = None):
+        self.session_key = session_key
+        self.model = model
+        self.on_position = on_position
+        self.position: Optional[int] = None
+        self.cancelled = False
+        self.stats = GenerationStats(model)
+
+        self._holds_slot = False
+        self._granted = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._scheduler: Optional["GenerationScheduler"] = None
+
+    def cancel(self):
+        """Bricht ab: entfernt aus der Warteschlange bzw. schließt den laufenden HTTP-Stream."""
+        if self.cancelled:
+            return
+        self.cancelled = True
+        self.stats.cancelled = True
+        if self._task and not self._task.done():
+            # Abbrechen des Pump-Tasks beendet den Ollama-Stream sofort
+            self._task.cancel()
+        elif self._scheduler:
+            self._scheduler._remove_waiting(self)
+        self._granted.set()
+
+    def _set_position(self, position: int):
+        if position == self.position:
+            return
+        self.position = position
+        if self.on_position:
+            self.on_position(position)
+
+
+class GenerationScheduler:
+    """
+    Reiht Generierungen vor dem OllamaClient ein.
+
+    Pro Modell laufen höchstens 'max_in_flight' Anfragen gleichzeitig
+    (abweichend über 'model_limits'). Wartende Anfragen werden reihum
+    nach Session vergeben, damit keine Session die anderen aushungert.
+
+    Mit 'residency' werden benutzte Modelle angepinnt (keep_alive) und ihre
+    Benutzung gemeldet, damit nur untätige Modelle entladen werden.
+    """
+
+    def __init__(self, client: OllamaClient, max_in_flight: int = 2,
+                 model_limits: Optional[Dict[str, int]] = None,
+                 residency: Optional[ModelResidency] = None):
+        self.client = client
+        self.max_in_flight = max_in_flight
+        self.model_limits = model_limits or {}
+        self.residency = residency
+
+        # model -> session_key -> wartende Tickets; Reihenfolge der Keys = Round-Robin
+        self._waiting: Dict[str, "OrderedDict[Any, Deque[GenerationTicket]]"] = {}
+        self._running: Dict[str, int] = {}
+
+    def limit_for(self, model: str) -> int:
+        return self.model_limits.get(model, self.max_in_flight)
+
+    async def chat(self, ticket: GenerationTicket, messages: List[Dict[str, str]],
+                   options: Optional[Dict[str, Any]] = None, keep_alive: Optional[str] = None):
+        """
+        Asynchroner Generator wie OllamaClient.chat, aber erst sobald ein Slot frei ist.
+        Nach ticket.cancel() endet der Generator einfach (ohne Exception).
+        """
+        await self._acquire(ticket)
+        if ticket.cancelled:
+            if ticket._holds_slot:
+                self._release(ticket)
+            return
+
+        if self.residency:
+            # Die Lebensdauer des Modells verwaltet ModelResidency, nicht Ollamas Timer
+            # (ersetzt BotProfile.keep_alive; die Leerlaufzeit ist ModelResidency.idle_timeout)
+            keep_alive = self.residency.keep_alive
+            self.residency.begin(ticket.model)
+
+        # Ein eigener Task liest den Stream. So kann cancel() ihn jederzeit abbrechen,
+        # ohne den aufrufenden UI-Handler zu treffen.
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def pump():
+            try:
+                async for chunk in self.client.chat(messages, model=ticket.model, options=options,
+                                                    keep_alive=keep_alive, stats=ticket.stats):
+                    queue.put_nowait(chunk)
+            finally:
+                queue.put_nowait(_DONE)
+
+        ticket._task = asyncio.create_task(pump())
+        try:
+            while True:
+                chunk = await queue.get()
+                if chunk is _DONE:
+                    break
+                if chunk:
+                    ticket.stats.mark_first_token()
+                yield chunk
+        finally:
+            ticket.stats.finish()
+            if not ticket._task.done():
+                ticket._task.cancel()
+            if self.residency:
+                self.residency.end(ticket.model)
+            self._release(ticket)
+
+    # --- Warteschlange ---
+
+    async def _acquire(self, ticket: GenerationTicket):
+        ticket._scheduler = self
+        model = ticket.model
+        if self._running.get(model, 0) < self.limit_for(model) and not self._waiting.get(model):
+            self._grant(ticket)
+            return
+
+        sessions = self._waiting.setdefault(model, OrderedDict())
+        sessions.setdefault(ticket.session_key, deque()).append(ticket)
+        self._update_positions(model)
+        await ticket._granted.wait()
+
+    def _grant(self, ticket: GenerationTicket):
+        self._running[ticket.model] = self._running.get(ticket.model, 0) + 1
+        ticket._holds_slot = True
+        ticket.stats.queue_wait = ticket.stats.elapsed()
+        ticket._set_position(0)
+        ticket._granted.set()
+
+    def _release(self, ticket: GenerationTicket):
+        if not ticket._holds_slot:
+            return
+        ticket._holds_slot = False
+        self._running[ticket.model] -= 1
+        self._dispatch(ticket.model)
+
+    def _dispatch(self, model: str):
+        sessions = self._waiting.get(model)
+        while sessions and self._running.get(model, 0) < self.limit_for(model):
+            # Erste Session in der Runde ist dran, danach ans Ende
+            key, tickets = next(iter(sessions.items()))
+            ticket = tickets.popleft()
+            if tickets:
+                sessions.move_to_end(key)
+            else:
+                del sessions[key]
+
+            self._grant(ticket)
+
+        if sessions is not None:
+            self._update_positions(model)
+
+    def _remove_waiting(self, ticket: GenerationTicket):
+        sessions = self._waiting.get(ticket.model, {})
+        tickets = sessions.get(ticket.session_key)
+        if tickets and ticket in tickets:
+            tickets.remove(ticket)
+            if not tickets:
+                del sessions[ticket.session_key]
+            self._update_positions(ticket.model)
+
+    def _update_positions(self, model: str):
+        """Berechnet die Plätze so, wie das Round-Robin sie vergeben wird."""
+        queues = [list(tickets) for tickets in self._waiting.get(model, {}).values()]
+        position = 1
+        depth = 0
+        while any(depth < len(q) for q in queues):
+            for q in queues:
+                if depth < len(q):
+                    q[depth]._set_position(position)
+                    position += 1
+            depth += 1
+
+    def queue_length(self, model: str) -> int:
+        return sum(len(t) for t in self._waiting.get(model, {}).values())
+
+    def queue_lengths(self) -> Dict[str, int]:
+        """Wartende Anfragen je Modell (für /metrics)."""
+        return {model: self.queue_length(model) for model in self._waiting}
+
+    def in_flight(self) -> Dict[str, int]:
+        """Laufende Anfragen je Modell (für /metrics)."""
+        return dict(self._running)
\ No newline at end of file
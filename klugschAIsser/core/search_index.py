@@ -0,0 +1,129 @@
+import re
+import sqlite3
+from dataclasses import dataclass
+from typing import List, Optional
+from uuid import UUID
+
+# Eigene FTS5-Tabelle in derselben Datenbank wie die Chats.
+# 'kind' unterscheidet Titel ('title') und Nachrichten ('message').
+SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(
+    content,
+    kind UNINDEXED,
+    session_id UNINDEXED,
+    message_id UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+KIND_TITLE = 'title'
+KIND_MESSAGE = 'message'
+
+# Nur Wortzeichen als Suchbegriffe, damit Nutzereingaben keine FTS-Syntax auslösen
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+
+@dataclass
+class SearchHit:
+    session_id: UUID
+    message_id: Optional[UUID]  # None = Treffer im Titel
+    title: str
+    snippet: str
+    score: float
+
+
+class SearchIndex:
+    """
+    Volltextsuche über alle Chats (SQLite FTS5, invertierter Index).
+
+    Der Index liegt persistent in der Datenbank und wird vom SessionStore
+    bei jeder neuen Nachricht, Titeländerung oder Löschung mitgepflegt.
+    Beim Start wird nichts neu aufgebaut (nur einmalig für ältere Datenbanken).
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.available = True
+        try:
+            existed = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'search_fts'"
+            ).fetchone() is not None
+            conn.executescript(SCHEMA)
+        except sqlite3.OperationalError:
+            # SQLite ohne FTS5 -> Suche deaktiviert, der Rest läuft weiter
+            self.available = False
+            return
+
+        if not existed:
+            self._backfill()
+
+    def _backfill(self):
+        """Indexiert bestehende Chats einmalig (z.B. nach einem Update)."""
+        self.conn.execute(
+            "INSERT INTO search_fts (content, kind, session_id, message_id) "
+            "SELECT title, ?, id, NULL FROM sessions",
+            (KIND_TITLE,),
+        )
+        self.conn.execute(
+            "INSERT INTO search_fts (content, kind, session_id, message_id) "
+            "SELECT content, ?, session_id, id FROM messages",
+            (KIND_MESSAGE,),
+        )
+
+    # --- Pflege (Aufrufer committet) ---
+
+    def add_message(self, session_id: UUID, message_id: UUID, content: str):
+        if not self.available:
+            return
+        self.conn.execute(
+            "INSERT INTO search_fts (content, kind, session_id, message_id) VALUES (?, ?, ?, ?)",
+            (content, KIND_MESSAGE, str(session_id), str(message_id)),
+        )
+
+    def set_title(self, session_id: UUID, title: str):
+        if not self.available:
+            return
+        self.conn.execute(
+            "DELETE FROM search_fts WHERE session_id = ? AND kind = ?",
+            (str(session_id), KIND_TITLE),
+        )
+        self.conn.execute(
+            "INSERT INTO search_fts (content, kind, session_id, message_id) VALUES (?, ?, ?, NULL)",
+            (title, KIND_TITLE, str(session_id)),
+        )
+
+    def remove_session(self, session_id: UUID):
+        if not self.available:
+            return
+        self.conn.execute("DELETE FROM search_fts WHERE session_id = ?", (str(session_id),))
+
+    # --- Suche ---
+
+    def search(self, query: str, owner_id: str = "", limit: int = 20) -> List[SearchHit]:
+        """Gibt die besten Treffer (BM25) zurück. Der letzte Begriff zählt als Präfix."""
+        if not self.available:
+            return []
+        terms = _TERM_RE.findall(query)
+        if not terms:
+            return []
+        match = ' '.join(f'"{t}"' for t in terms[:-1])
+        match = f'{match} "{terms[-1]}"*'.strip()
+
+        rows = self.conn.execute(
+            "SELECT f.session_id, f.message_id, s.title, "
+            "       snippet(search_fts, 0, '**', '**', '…', 12), f.rank "
+            "FROM search_fts f JOIN sessions s ON s.id = f.session_id "
+            "WHERE search_fts MATCH ? AND s.owner_id = ? "
+            "ORDER BY f.rank LIMIT ?",
+            (match, owner_id, limit),
+        ).fetchall()
+        return [
+            SearchHit(
+                session_id=UUID(row[0]),
+                message_id=UUID(row[1]) if row[1] else None,
+                title=row[2],
+                snippet=row[3],
+                score=-row[4],  # FTS5-rank ist negativ: kleiner = besser
+            )
+            for row in rows
+        ]
@@ -1,25 +1,166 @@
-from typing import List, Optional
+from collections import OrderedDict
+from datetime import datetime
+from itertools import islice
+from typing import Callable, List, Optional
 from uuid import UUID
-from klugschAIsser.core.types import ChatSession, BotProfile
+from klugschAIsser.core.search_index import SearchHit
+from klugschAIsser.core.session_store import SessionStore
+from klugschAIsser.core.types import ChatSession, BotProfile, ChatMessage, MessageList
+
+
+# Wie viele Sessions pro User gleichzeitig mit Nachrichten im Speicher liegen dürfen
+MAX_LOADED_SESSIONS = 8
+
+# Ereignisse für Listener (z.B. die Sidebar), damit diese nur gezielt aktualisieren
+EVENT_CREATED = 'created'      # neue Session, steht jetzt ganz oben
+EVENT_MOVED = 'moved'          # bestehende Session ist nach oben gerutscht
+EVENT_RETITLED = 'retitled'    # Titel hat sich geändert
+EVENT_ACTIVATED = 'activated'  # andere Session ist jetzt aktiv
+EVENT_DELETED = 'deleted'      # Session wurde gelöscht
+
+SessionListener = Callable[[str, ChatSession], None]
 
 
 class SessionManager:
-    def __init__(self):
-        self.sessions: List[ChatSession] = []
+    def __init__(self, store: Optional[SessionStore] = None, owner_id: str = "",
+                 bots: Optional[List[BotProfile]] = None):
+        self.store = store
+        self.owner_id = owner_id
         self.active_session: Optional[ChatSession] = None
+        self.listeners: List[SessionListener] = []
+
+        # UUID -> Session, Reihenfolge = zuletzt benutzt (neueste am ENDE, damit move_to_end O(1) ist)
+        # Beim Start nur die Kopfdaten laden, Nachrichten kommen erst beim Öffnen
+        headers = store.load_session_headers(owner_id) if store else []
+        self._sessions: "OrderedDict[UUID, ChatSession]" = OrderedDict(
+            (s.id, s) for s in reversed(headers)
+        )
+        # Zuletzt geöffnete Sessions mit geladenen Nachrichten (älteste zuerst)
+        self._loaded: List[ChatSession] = []
+
+        # Verfügbare Bots; der erste ist der Standard-Bot, mehrere erlauben den Vergleichsmodus
+        # (UUID aus Name und Modell, bleibt über Neustarts gleich)
+        self.bots: List[BotProfile] = list(bots) if bots else [BotProfile(name="Gemma", ollama_model="gemma3:1b")]
+        self.default_bot = self.bots[0]
 
-        # Standard-Bot (UUID ist hier dynamisch, später fixieren wir das evtl.)
-        self.default_bot = BotProfile(name="Gemma", ollama_model="gemma3:1b")
+    @property
+    def sessions(self) -> List[ChatSession]:
+        """Alle Sessions, zuletzt benutzte zuerst. Für lange Listen besser recent_sessions() nutzen."""
+        return list(reversed(self._sessions.values()))
+
+    def recent_sessions(self, limit: int, offset: int = 0) -> List[ChatSession]:
+        """Eine Seite der Sessions (zuletzt benutzte zuerst), ohne die ganze Liste zu kopieren."""
+        return list(islice(reversed(self._sessions.values()), offset, offset + limit))
+
+    def __len__(self):
+        return len(self._sessions)
 
     def create_new_session(self) -> ChatSession:
         """Erstellt eine neue Session und setzt sie als aktiv."""
         session = ChatSession()
-        self.sessions.insert(0, session)  # Neue Session oben in die Liste
+        self._sessions[session.id] = session  # Neue Session oben in die Liste
+        self.active_session = session
+        if self.store:
+            self.store.save_session(session, self.owner_id)
+        self._mark_loaded(session)
+
+        self._notify(EVENT_CREATED, session)
+        self._notify(EVENT_ACTIVATED, session)
+        return session
+
+    def open_session(self, session: ChatSession) -> ChatSession:
+        """Setzt die Session als aktiv und lädt ihre Nachrichten bei Bedarf nach."""
+        if not session.messages_loaded and self.store:
+            session.messages = self.store.load_messages(session.id)
+            session.messages_loaded = True
+        changed = session is not self.active_session
         self.active_session = session
+        self._mark_loaded(session)
+        if changed:
+            self._notify(EVENT_ACTIVATED, session)
         return session
 
+    def unload(self):
+        """Gibt alle Nachrichten im Speicher frei (sie liegen ja im Store)."""
+        if not self.store:
+            return
+        for session in self._loaded:
+            self._unload_session(session)
+        # Die aktive Session behält ihre Nachrichten und bleibt deshalb erfasst
+        self._loaded = [s for s in self._loaded if s is self.active_session]
+
+    def _mark_loaded(self, session: ChatSession):
+        if session in self._loaded:
+            self._loaded.remove(session)
+        self._loaded.append(session)
+
+        # Älteste geladene Sessions wieder auf Kopfdaten reduzieren
+        if self.store:
+            while len(self._loaded) > MAX_LOADED_SESSIONS:
+                # Die aktive Session nie verdrängen, sonst fiele sie aus der Verwaltung
+                oldest = next(s for s in self._loaded if s is not self.active_session)
+                self._loaded.remove(oldest)
+                self._unload_session(oldest)
+
+    def _unload_session(self, session: ChatSession):
+        if session is self.active_session:
+            return
+        session.messages = MessageList()
+        session.messages_loaded = False
+
+    def add_message(self, session: ChatSession, message: ChatMessage):
+        """Hängt eine Nachricht an und speichert nur diese eine Nachricht."""
+        session.messages.append(message)
+        if self.store:
+            self.store.append_message(session.id, message)
+        self.touch(session, message.timestamp)
+
+    def touch(self, session: ChatSession, when: Optional[datetime] = None):
+        """Schiebt die Session an die Spitze der Liste (O(1))."""
+        session.updated_at = when or datetime.now()
+        if session.id not in self._sessions:
+            return
+        was_on_top = next(reversed(self._sessions)) == session.id
+        self._sessions.move_to_end(session.id)
+        if not was_on_top:
+            self._notify(EVENT_MOVED, session)
+
+    def update_title(self, session: ChatSession) -> bool:
+        """Aktualisiert den Titel aus dem Inhalt und speichert ihn, falls er sich geändert hat."""
+        changed = session.update_title_from_content()
+        if changed:
+            if self.store:
+                self.store.update_title(session)
+            self._notify(EVENT_RETITLED, session)
+        return changed
+
+    def delete_session(self, session: ChatSession):
+        """Löscht die Session (inkl. Suchindex). War sie aktiv, wird die nächste geöffnet."""
+        if self._sessions.pop(session.id, None) is None:
+            return
+        if session in self._loaded:
+            self._loaded.remove(session)
+        if self.store:
+            self.store.delete_session(session.id)
+        self._notify(EVENT_DELETED, session)
+
+        if session is self.active_session:
+            self.active_session = None
+            if self._sessions:
+                self.open_session(self._sessions[next(reversed(self._sessions))])
+            else:
+                self.create_new_session()
+
+    def search(self, query: str, limit: int = 20) -> List[SearchHit]:
+        """Volltextsuche über die Chats dieses Users (nur mit SessionStore)."""
+        if not self.store:
+            return []
+        hits = self.store.search_index.search(query, self.owner_id, limit)
+        return [hit for hit in hits if hit.session_id in self._sessions]
+
     def get_session(self, session_id: UUID) -> Optional[ChatSession]:
-        for s in self.sessions:
-            if s.id == session_id:
-                return s
-        return None
\ No newline at end of file
+        return self._sessions.get(session_id)
+
+    def _notify(self, event: str, session: ChatSession):
+        for listener in list(self.listeners):
+            listener(event, session)
@@ -0,0 +1,150 @@
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+from uuid import UUID
+
+from klugschAIsser.core.search_index import SearchIndex
+from klugschAIsser.core.types import ChatMessage, ChatSession, MessageList
+
+# Standard-Speicherort im Home-Verzeichnis des Users
+DEFAULT_DB_PATH = Path.home() / ".klugschAIsser" / "sessions.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id          TEXT PRIMARY KEY,
+    owner_id    TEXT NOT NULL DEFAULT '',
+    title       TEXT NOT NULL,
+    created_at  TEXT NOT NULL,
+    updated_at  TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS messages (
+    seq         INTEGER PRIMARY KEY AUTOINCREMENT,
+    id          TEXT NOT NULL,
+    session_id  TEXT NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+    role        TEXT NOT NULL,
+    sender_id   TEXT NOT NULL,
+    content     TEXT NOT NULL,
+    timestamp   TEXT NOT NULL,
+    alternative_to TEXT          -- Vergleichsmodus: ID der übernommenen Antwort
+);
+CREATE INDEX IF NOT EXISTS idx_messages_session ON messages(session_id, seq);
+CREATE INDEX IF NOT EXISTS idx_sessions_recent ON sessions(owner_id, updated_at);
+"""
+
+
+class SessionStore:
+    """
+    Persistenter Speicher für Chats (SQLite).
+
+    Beim Start werden nur die Kopfdaten (ID, Titel, Zeitstempel) gelesen.
+    Die Nachrichten einer Session werden erst beim Öffnen geladen und
+    neue Nachrichten einzeln angehängt, statt die ganze Session neu zu schreiben.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else DEFAULT_DB_PATH
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        # check_same_thread=False: NiceGUI-Handler laufen nicht zwingend im Erzeuger-Thread
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self._migrate()
+        self.conn.executescript(SCHEMA)
+        # Volltextindex liegt in derselben DB und wird bei jedem Schreiben mitgepflegt
+        self.search_index = SearchIndex(self.conn)
+        self.conn.commit()
+
+    def _migrate(self):
+        """Ergänzt Spalten, die ältere Datenbanken noch nicht haben."""
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(sessions)")]
+        if columns and 'owner_id' not in columns:
+            self.conn.execute("ALTER TABLE sessions ADD COLUMN owner_id TEXT NOT NULL DEFAULT ''")
+        if columns and 'updated_at' not in columns:
+            self.conn.execute("ALTER TABLE sessions ADD COLUMN updated_at TEXT NOT NULL DEFAULT ''")
+            self.conn.execute("UPDATE sessions SET updated_at = created_at")
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(messages)")]
+        if columns and 'alternative_to' not in columns:
+            self.conn.execute("ALTER TABLE messages ADD COLUMN alternative_to TEXT")
+        # Alter Index (nach created_at) wurde durch einen nach updated_at ersetzt
+        self.conn.execute("DROP INDEX IF EXISTS idx_sessions_owner")
+
+    def load_session_headers(self, owner_id: str = "") -> List[ChatSession]:
+        """Lädt alle Sessions eines Users OHNE Nachrichten (zuletzt benutzte zuerst)."""
+        rows = self.conn.execute(
+            "SELECT id, title, created_at, updated_at FROM sessions WHERE owner_id = ? "
+            "ORDER BY updated_at DESC",
+            (owner_id,),
+        ).fetchall()
+        return [
+            ChatSession(
+                id=UUID(row[0]),
+                title=row[1],
+                created_at=datetime.fromisoformat(row[2]),
+                updated_at=datetime.fromisoformat(row[3]),
+                messages_loaded=False,
+            )
+            for row in rows
+        ]
+
+    def load_messages(self, session_id: UUID) -> MessageList:
+        """Lädt die Nachrichten einer einzelnen Session (direkt in die kompakte Liste)."""
+        rows = self.conn.execute(
+            "SELECT id, role, sender_id, content, timestamp, alternative_to FROM messages "
+            "WHERE session_id = ? ORDER BY seq",
+            (str(session_id),),
+        )
+        return MessageList.from_rows(rows)
+
+    def save_session(self, session: ChatSession, owner_id: str = ""):
+        """Legt die Kopfdaten einer (neuen) Session an."""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO sessions (id, owner_id, title, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (str(session.id), owner_id, session.title,
+             session.created_at.isoformat(), session.updated_at.isoformat()),
+        )
+        self.search_index.set_title(session.id, session.title)
+        self.conn.commit()
+
+    def update_title(self, session: ChatSession):
+        self.conn.execute(
+            "UPDATE sessions SET title = ? WHERE id = ?",
+            (session.title, str(session.id)),
+        )
+        self.search_index.set_title(session.id, session.title)
+        self.conn.commit()
+
+    def append_message(self, session_id: UUID, message: ChatMessage):
+        """Schreibt genau eine Nachricht (inkrementell) und merkt sich den Zeitpunkt."""
+        self.conn.execute(
+            "UPDATE sessions SET updated_at = ? WHERE id = ?",
+            (message.timestamp.isoformat(), str(session_id)),
+        )
+        self.conn.execute(
+            "INSERT INTO messages (id, session_id, role, sender_id, content, timestamp, alternative_to) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                str(message.id),
+                str(session_id),
+                message.role,
+                message.sender_id,
+                message.content,
+                message.timestamp.isoformat(),
+                str(message.alternative_to) if message.alternative_to else None,
+            ),
+        )
+        self.search_index.add_message(session_id, message.id, message.content)
+        self.conn.commit()
+
+    def delete_session(self, session_id: UUID):
+        """Löscht eine Session samt Nachrichten und Suchindex-Einträgen."""
+        self.conn.execute("DELETE FROM messages WHERE session_id = ?", (str(session_id),))
+        self.conn.execute("DELETE FROM sessions WHERE id = ?", (str(session_id),))
+        self.search_index.remove_session(session_id)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,75 @@
+import time
+from typing import AsyncIterator, Callable, List, Optional
+
+
+class StreamBuffer:
+    """
+    Sammelt Streaming-Chunks und entscheidet, wann die UI neu gezeichnet wird.
+
+    Statt bei jedem Token die ganze Antwort neu zu rendern, wird nur alle
+    'flush_interval_ms' Millisekunden oder nach 'flush_tokens' Chunks geflusht.
+    """
+
+    def __init__(self, flush_interval_ms: int = 50, flush_tokens: int = 32):
+        self.flush_interval = flush_interval_ms / 1000
+        self.flush_tokens = flush_tokens
+
+        # Liste statt 'str +=', damit das Anhängen O(1) bleibt
+        self._parts: List[str] = []
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        self.flush_count = 0
+
+    def add(self, chunk: str) -> bool:
+        """
+        Hängt einen Chunk an.
+        Gibt True zurück, wenn jetzt geflusht werden sollte.
+        """
+        if not chunk:
+            return False
+        self._parts.append(chunk)
+        self._pending += 1
+
+        if self._pending >= self.flush_tokens:
+            return True
+        return time.monotonic() - self._last_flush >= self.flush_interval
+
+    @property
+    def has_pending(self) -> bool:
+        return self._pending > 0
+
+    @property
+    def text(self) -> str:
+        """Der bisher gesammelte Text (ohne den Flush-Zähler zu verändern)."""
+        if len(self._parts) > 1:
+            # Zusammenfassen, damit spätere joins nur den neuen Teil anfassen
+            self._parts = [''.join(self._parts)]
+        return self._parts[0] if self._parts else ""
+
+    def flush(self) -> str:
+        """Markiert alle offenen Chunks als gerendert und gibt den Gesamttext zurück."""
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        self.flush_count += 1
+        return self.text
+
+
+async def pump_stream(stream: AsyncIterator[str], buffer: StreamBuffer, on_flush: Callable[[str], None],
+                      on_first_chunk: Optional[Callable[[], None]] = None) -> str:
+    """
+    Liest einen Chunk-Stream in den Buffer und ruft 'on_flush' nur gebündelt auf.
+    Am Ende (auch bei Fehlern/Abbruch) wird der Rest garantiert geflusht.
+    """
+    first = True
+    try:
+        async for chunk in stream:
+            if first and chunk:
+                first = False
+                if on_first_chunk:
+                    on_first_chunk()
+            if buffer.add(chunk):
+                on_flush(buffer.flush())
+    finally:
+        if buffer.has_pending:
+            on_flush(buffer.flush())
+    return buffer.text
@@ -1,39 +1,245 @@
+import sys
+from array import array
+from collections.abc import Sequence
 from dataclasses import dataclass, field
-from datetime import datetime
-from uuid import UUID, uuid4
-from typing import List, Dict, Any
+from datetime import datetime, timedelta
+from uuid import NAMESPACE_URL, UUID, uuid4, uuid5
+from typing import List, Dict, Any, Iterable, Iterator, Optional
 
 
 @dataclass
 class BotProfile:
     """Repräsentiert einen 'Assistenten'."""
-    id: UUID = field(default_factory=uuid4)
+    # Ohne Angabe aus Name und Modell abgeleitet: gleich über Neustarts hinweg, damit
+    # gespeicherte Antworten (ChatMessage.sender_id) ihrem Bot zugeordnet bleiben
+    id: Optional[UUID] = None
     name: str = "Standard Assistent"
     ollama_model: str = "gemma3:1b"  # Technischer Modellname für Ollama
     system_prompt: str = ""
+    # Maximale Anzahl Tokens, die als Verlauf an das Modell geschickt werden
+    context_token_budget: int = 4096
+    # Fest pro Bot: eine Änderung von num_ctx zwingt Ollama, das Modell neu zu laden
+    num_ctx: int = 8192
+    # Wie lange Ollama Modell & Prompt-Cache nach der letzten Anfrage behält.
+    # Gilt nur ohne ModelResidency (Batch, Desktop): in der Web-Oberfläche pinnt der
+    # GenerationScheduler benutzte Modelle und ModelResidency entlädt sie nach IDLE_TIMEOUT.
+    keep_alive: str = "30m"
+    options: Dict[str, Any] = field(default_factory=dict)
+    # Anzahl ähnlicher älterer Nachrichten, die per SemanticMemory eingefügt werden (0 = aus)
+    memory_top_k: int = 0
+
+    def __post_init__(self):
+        if self.id is None:
+            self.id = uuid5(NAMESPACE_URL, f"klugschaisser-bot:{self.name}:{self.ollama_model}")
+
+    def ollama_options(self) -> Dict[str, Any]:
+        """Optionen für Ollama. Bleiben pro Bot stabil, damit der KV-Cache wiederverwendet wird."""
+        return {"num_ctx": self.num_ctx, **self.options}
+
+
+# Zeitstempel werden als Mikrosekunden seit 1970 (naiv, ohne Zeitzone) gespeichert
+_EPOCH = datetime(1970, 1, 1)
+
+
+def to_micros(when: datetime) -> int:
+    return (when - _EPOCH) // timedelta(microseconds=1)
+
+
+def from_micros(micros: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=micros)
+
+
+# Rollen und Absender-IDs wiederholen sich ständig -> jeder Wert nur einmal im Speicher.
+# MessageList speichert statt des Strings nur dessen Nummer in dieser Tabelle.
+_symbols: List[str] = []
+_symbol_ids: Dict[str, int] = {}
+
+
+def _symbol_id(value: str) -> int:
+    symbol = _symbol_ids.get(value)
+    if symbol is None:
+        symbol = _symbol_ids[value] = len(_symbols)
+        _symbols.append(sys.intern(value))
+    return symbol
 
 
-@dataclass
 class ChatMessage:
-    """Eine einzelne Nachricht."""
-    id: UUID = field(default_factory=uuid4)
-    role: str = "user"  # 'user' oder 'assistant'
-    sender_id: str = ""  # User-ID oder BotProfile.id
-    content: str = ""
-    timestamp: datetime = field(default_factory=datetime.now)
+    """
+    Eine einzelne Nachricht.
+
+    Kompakt: __slots__ statt __dict__, internierte Rolle/Absender und der
+    Zeitstempel als int. Nachrichten aus einer MessageList sind nur leichte
+    Kopien ihrer Zeile; ein gesetzter token_count wird dorthin zurückgeschrieben.
+    """
+    __slots__ = ('id', 'role', 'sender_id', 'content', 'timestamp_us', 'alternative_to',
+                 '_token_count', '_owner', '_index')
+
+    def __init__(self, id: Optional[UUID] = None, role: str = "user", sender_id: str = "",
+                 content: str = "", timestamp: Optional[datetime] = None,
+                 token_count: Optional[int] = None, alternative_to: Optional[UUID] = None):
+        self.id = id or uuid4()
+        self.role = sys.intern(role)  # 'user' oder 'assistant'
+        self.sender_id = sys.intern(sender_id)  # User-ID oder BotProfile.id
+        self.content = content
+        self.timestamp_us = to_micros(timestamp or datetime.now())
+        # Vergleichsmodus: ID der übernommenen Antwort, zu der dies eine Alternative ist.
+        # Alternativen werden angezeigt, aber nicht als Verlauf an das Modell geschickt.
+        self.alternative_to = alternative_to
+        # Wird vom ContextBuilder einmalig berechnet und hier zwischengespeichert
+        self._token_count = token_count
+        self._owner: Optional["MessageList"] = None
+        self._index = 0
+
+    @property
+    def timestamp(self) -> datetime:
+        return from_micros(self.timestamp_us)
+
+    @timestamp.setter
+    def timestamp(self, value: datetime):
+        self.timestamp_us = to_micros(value)
+
+    @property
+    def token_count(self) -> Optional[int]:
+        if self._owner is not None:
+            tokens = self._owner._tokens[self._index]
+            return None if tokens < 0 else tokens
+        return self._token_count
+
+    @token_count.setter
+    def token_count(self, value: Optional[int]):
+        self._token_count = value
+        if self._owner is not None:
+            self._owner._tokens[self._index] = -1 if value is None else value
 
     def to_ollama_dict(self) -> Dict[str, str]:
         """Konvertiert das Objekt in das Format, das Ollama erwartet."""
         return {"role": self.role, "content": self.content}
 
+    def _key(self):
+        return self.id, self.role, self.sender_id, self.content, self.timestamp_us, self.alternative_to
+
+    def __eq__(self, other):
+        if not isinstance(other, ChatMessage):
+            return NotImplemented
+        return self._key() == other._key()
+
+    __hash__ = None  # veränderlich wie vorher die Dataclass
+
+    def __repr__(self):
+        return (f"ChatMessage(id={self.id!r}, role={self.role!r}, sender_id={self.sender_id!r}, "
+                f"content={self.content!r}, timestamp={self.timestamp!r})")
+
+
+class MessageList(Sequence):
+    """
+    Die Nachrichten einer Session in wenigen flachen Puffern statt als Objekte.
+
+    Alle Inhalte liegen UTF-8-kodiert hintereinander in EINEM bytearray
+    (Offsets in einem array), IDs als 16 Bytes, Rolle/Absender als Nummer,
+    Zeitstempel als int. ChatMessage-Objekte entstehen erst beim Zugriff.
+    Verhält sich nach außen wie eine (nur anhängbare) Liste von ChatMessages.
+    """
+
+    def __init__(self, messages: Iterable[ChatMessage] = ()):
+        self._ids = bytearray()
+        self._roles = array('I')
+        self._senders = array('I')
+        self._timestamps = array('q')
+        self._tokens = array('i')  # -1 = noch nicht berechnet
+        self._offsets = array('Q', [0])  # Inhalt i = _content[_offsets[i]:_offsets[i + 1]]
+        self._content = bytearray()
+        # Nur wenige Nachrichten sind Alternativen -> dünn besetzt: Index -> UUID
+        self._alternatives: Dict[int, UUID] = {}
+        for message in messages:
+            self.append(message)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[tuple]) -> "MessageList":
+        """
+        Baut die Liste direkt aus DB-Zeilen
+        (id, role, sender_id, content, timestamp als ISO-Text, alternative_to oder None).
+        """
+        messages = cls()
+        for id_, role, sender_id, content, timestamp, alternative_to in rows:
+            messages._append_fields(UUID(id_).bytes, role, sender_id, content,
+                                    to_micros(datetime.fromisoformat(timestamp)), None,
+                                    UUID(alternative_to) if alternative_to else None)
+        return messages
+
+    def _append_fields(self, id_bytes: bytes, role: str, sender_id: str, content: str,
+                       timestamp_us: int, token_count: Optional[int], alternative_to: Optional[UUID]):
+        if alternative_to is not None:
+            self._alternatives[len(self)] = alternative_to
+        self._ids += id_bytes
+        self._roles.append(_symbol_id(role))
+        self._senders.append(_symbol_id(sender_id))
+        self._timestamps.append(timestamp_us)
+        self._tokens.append(-1 if token_count is None else token_count)
+        self._content += content.encode('utf-8')
+        self._offsets.append(len(self._content))
+
+    def append(self, message: ChatMessage):
+        """Speichert die Nachricht; das Objekt wird danach zu einer Sicht auf die neue Zeile."""
+        self._append_fields(message.id.bytes, message.role, message.sender_id, message.content,
+                            message.timestamp_us, message.token_count, message.alternative_to)
+        message._owner = self
+        message._index = len(self) - 1
+
+    def content_at(self, index: int) -> str:
+        """Nur der Inhalt, ohne eine ChatMessage zu erzeugen."""
+        index = range(len(self))[index]
+        return self._content[self._offsets[index]:self._offsets[index + 1]].decode('utf-8')
+
+    def __len__(self) -> int:
+        return len(self._roles)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._view(i) for i in range(*index.indices(len(self)))]
+        return self._view(range(len(self))[index])
+
+    def __iter__(self) -> Iterator[ChatMessage]:
+        for i in range(len(self)):
+            yield self._view(i)
+
+    def _view(self, i: int) -> ChatMessage:
+        message = ChatMessage.__new__(ChatMessage)
+        message.id = UUID(bytes=bytes(self._ids[16 * i:16 * i + 16]))
+        message.role = _symbols[self._roles[i]]
+        message.sender_id = _symbols[self._senders[i]]
+        message.content = self._content[self._offsets[i]:self._offsets[i + 1]].decode('utf-8')
+        message.timestamp_us = self._timestamps[i]
+        message.alternative_to = self._alternatives.get(i)
+        message._token_count = None  # token_count liest direkt aus _tokens
+        message._owner = self
+        message._index = i
+        return message
+
+    def nbytes(self) -> int:
+        """Belegter Speicher der Puffer (ohne Python-Objekt-Overhead)."""
+        return (len(self._ids) + len(self._content)
+                + sum(a.itemsize * len(a) for a in (self._roles, self._senders, self._timestamps,
+                                                    self._tokens, self._offsets)))
+
+    def __repr__(self):
+        return f"MessageList({len(self)} Nachrichten)"
+
 
 @dataclass
 class ChatSession:
     """Ein ganzer Chat-Verlauf."""
     id: UUID = field(default_factory=uuid4)
     title: str = "Neuer Chat"
-    messages: List[ChatMessage] = field(default_factory=list)
+    messages: MessageList = field(default_factory=MessageList)
     created_at: datetime = field(default_factory=datetime.now)
+    # Zeitpunkt der letzten Nachricht, bestimmt die Reihenfolge in der Sidebar
+    updated_at: datetime = field(default_factory=datetime.now)
+    # False, solange die Nachrichten noch nicht aus dem SessionStore geladen wurden
+    messages_loaded: bool = field(default=True, repr=False, compare=False)
+
+    def __post_init__(self):
+        if not isinstance(self.messages, MessageList):
+            self.messages = MessageList(self.messages)
 
     def update_title_from_content(self) -> bool:
         """
@@ -41,7 +247,7 @@ class ChatSession:
         Gibt True zurück, wenn sich der Titel geändert hat.
         """
         if self.messages and self.title == "Neuer Chat":
-            first_msg = self.messages[0].content.strip()
+            first_msg = self.messages.content_at(0).strip()
             if not first_msg:
                 return False
 
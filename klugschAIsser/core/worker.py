@@ -1,16 +1,140 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Coroutine, Dict, List, Optional
+
 from PySide6.QtCore import QObject, Signal
 
+from klugschAIsser.core.metrics import GenerationStats
+from klugschAIsser.core.stream_buffer import StreamBuffer, pump_stream
+
+# Ein Bildschirm-Frame bei 60 Hz: öfter als so muss Qt keinen neuen Text bekommen
+FRAME_INTERVAL_MS = 16
+
+
+class AsyncLoopThread:
+    """
+    Eine asyncio-Eventloop in einem eigenen Hintergrund-Thread.
+
+    Qt hat seine eigene Eventloop im UI-Thread; alle Ollama-Anfragen der
+    Desktop-Oberfläche laufen deshalb als Tasks auf dieser einen Loop.
+    Der OllamaClient (bzw. dessen AsyncClient/Verbindungspool) ist an die Loop
+    gebunden, auf der er zuerst benutzt wurde, und darf daher nur hier laufen.
+    """
+
+    _shared: Optional["AsyncLoopThread"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name="ollama-asyncio", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def shared(cls) -> "AsyncLoopThread":
+        """Die Loop für die ganze Anwendung (wird beim ersten Aufruf gestartet)."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro: Coroutine) -> Future:
+        """Startet 'coro' auf der Loop (threadsicher). future.cancel() bricht den Task ab."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+
+
 class OllamaWorker(QObject):
-    chunk_received = Signal(str)
-    finished = Signal()
+    """
+    Streamt eine Antwort auf der AsyncLoopThread und reicht sie an Qt weiter.
+
+    Die Chunks werden wie in der Web-Oberfläche über einen StreamBuffer gebündelt:
+    höchstens einmal pro Frame kommt ein Signal mit dem neuen Text seit dem
+    letzten Signal, statt eines Signals pro Token. Die Signale werden aus dem
+    Loop-Thread ausgelöst; Qt stellt sie automatisch in die Warteschlange des
+    UI-Threads, Slots laufen also immer dort.
+    """
+    chunks_received = Signal(str)  # neuer Text seit dem letzten Signal
+    failed = Signal(str)
+    finished = Signal(str)  # gesamter Text (auch nach Abbruch oder Fehler)
 
-    def __init__(self, client, messages):
-        super().__init__()
+    def __init__(self, client, messages: List[Dict[str, str]], model: Optional[str] = None,
+                 options: Optional[Dict[str, Any]] = None, keep_alive: Optional[str] = None,
+                 loop_thread: Optional[AsyncLoopThread] = None,
+                 frame_interval_ms: int = FRAME_INTERVAL_MS, parent: Optional[QObject] = None):
+        super().__init__(parent)
         self.client = client
         self.messages = messages
+        self.model = model
+        self.options = options
+        self.keep_alive = keep_alive
+        self.loop_thread = loop_thread or AsyncLoopThread.shared()
+        self.frame_interval_ms = frame_interval_ms
+
+        self.stats = GenerationStats()
+        self.cancelled = False
+        self._future: Optional[Future] = None
+        self._task: Optional[asyncio.Task] = None  # wird erst auf der Loop gesetzt
+
+    def start(self):
+        """Kehrt sofort zurück; der Stream läuft im Hintergrund."""
+        self._future = self.loop_thread.submit(self._run())
+
+    def cancel(self):
+        """Aus dem UI-Thread aufrufbar. Schließt den HTTP-Stream, 'finished' kommt trotzdem."""
+        self.cancelled = True
+        # Nicht future.cancel(): ein Task, der noch nicht gestartet ist, liefe dann gar nicht
+        # und 'finished' käme nie. Auf der Loop wird nur ein laufender Task abgebrochen,
+        # ein noch nicht gestarteter sieht 'cancelled' und endet sofort.
+        self.loop_thread.loop.call_soon_threadsafe(self._cancel_task)
+
+    def _cancel_task(self):
+        if self._task is not None:
+            self._task.cancel()
+
+    @property
+    def running(self) -> bool:
+        return self._future is not None and not self._future.done()
+
+    async def _run(self):
+        self._task = asyncio.current_task()
+        buffer = StreamBuffer(self.frame_interval_ms)
+        emitted = 0
+
+        def emit(text: str):
+            nonlocal emitted
+            if len(text) > emitted:
+                self.chunks_received.emit(text[emitted:])
+                emitted = len(text)
+
+        async def flush_on_pause():
+            # Kommt eine Weile kein Chunk, trotzdem den letzten Stand zeigen
+            while True:
+                await asyncio.sleep(self.frame_interval_ms / 1000)
+                if buffer.has_pending:
+                    emit(buffer.flush())
 
-    def run(self):
-        # Ruft die Streaming-Funktion auf
-        for chunk in self.client.chat(self.messages):
-            self.chunk_received.emit(chunk)
-        self.finished.emit()
\ No newline at end of file
+        flusher = asyncio.create_task(flush_on_pause())
+        try:
+            if self.cancelled:
+                raise asyncio.CancelledError
+            stream = self.client.chat(self.messages, model=self.model, options=self.options,
+                                      keep_alive=self.keep_alive, stats=self.stats)
+            # TTFT beim ersten Chunk messen, nicht erst beim ersten gebündelten Signal
+            await pump_stream(stream, buffer, emit, on_first_chunk=self.stats.mark_first_token)
+        except asyncio.CancelledError:
+            self.stats.cancelled = True
+        except Exception as e:
+            self.stats.error = type(e).__name__
+            self.failed.emit(str(e))
+        finally:
+            flusher.cancel()
+            self.stats.finish()
+            self.finished.emit(buffer.text)
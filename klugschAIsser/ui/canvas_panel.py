@@ -0,0 +1,69 @@
+import tempfile
+from pathlib import Path
+from typing import List
+
+from nicegui import events, run, ui
+
+from klugschAIsser.core.documents import Document, DocumentStore
+
+# Größere Dateien lehnt schon der Browser ab
+MAX_UPLOAD_BYTES = 50 * 1024 * 1024
+
+
+class CanvasPanel:
+    """
+    Dateien im Canvas (rechte Leiste).
+
+    Hochgeladene Text-/Code-Dateien werden im Hintergrund-Thread zerlegt (DocumentStore)
+    und landen in 'documents', einer Liste, die mit dem ChatWidget geteilt wird.
+    Der Chat schickt pro Frage nur die passenden Ausschnitte mit, nie die ganze Datei.
+    """
+
+    def __init__(self, store: DocumentStore, documents: List[Document]):
+        self.store = store
+        self.documents = documents
+        self.list = None
+
+    def build(self):
+        ui.label('Dateien hochladen: der Chat nutzt daraus nur die zur Frage passenden Stellen.') \
+            .classes('text-gray-500 text-xs px-4')
+        ui.upload(multiple=True, auto_upload=True, max_file_size=MAX_UPLOAD_BYTES,
+                  on_upload=self.handle_upload,
+                  on_rejected=lambda: ui.notify('Datei zu groß', type='warning')) \
+            .props('dark flat bordered accept=".txt,.md,.py,.js,.ts,.json,.csv,.html,.css,.java,.c,.cpp,.h,.rs,.go,.yaml,.yml,.toml,.xml,.sql,.sh,.log"') \
+            .classes('w-full px-4')
+        self.list = ui.column().classes('w-full px-4 gap-2')
+        self.refresh()
+
+    async def handle_upload(self, e: events.UploadEventArguments):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'upload'
+            # Wird gestreamt gespeichert, nie komplett im Speicher gehalten
+            await e.file.save(path)
+            try:
+                # Hashen, Zerlegen und Indexieren blockieren -> nicht im Event-Loop
+                document = await run.io_bound(self.store.load, path, e.file.name)
+            except (OSError, ValueError) as error:
+                ui.notify(f"{e.file.name}: {error}", type='negative')
+                return
+
+        # Gleicher Inhalt ersetzt die alte Version statt doppelt zu zählen
+        self.documents[:] = [d for d in self.documents if d.digest != document.digest] + [document]
+        self.refresh()
+
+    def remove(self, document: Document):
+        self.documents.remove(document)
+        self.refresh()
+
+    def refresh(self):
+        self.list.clear()
+        with self.list:
+            for document in self.documents:
+                with ui.row().classes('w-full items-center gap-2 bg-gray-800 rounded p-2 no-wrap'):
+                    ui.icon('description', color='blue-400')
+                    with ui.column().classes('gap-0 min-w-0 flex-grow'):
+                        ui.label(document.name).classes('text-gray-200 text-sm truncate w-full')
+                        ui.label(f"{document.size / 1024:.0f} KB · {len(document.chunks)} Abschnitte") \
+                            .classes('text-gray-500 text-xs')
+                    ui.button(icon='close', on_click=lambda d=document: self.remove(d)) \
+                        .props('flat round dense size=sm text-color=grey')
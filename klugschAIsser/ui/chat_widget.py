@@ -1,45 +1,131 @@
-from nicegui import ui
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from uuid import UUID
+
+from nicegui import background_tasks, ui
+from klugschAIsser.core.context_builder import ContextBuilder
+from klugschAIsser.core.documents import DOCUMENT_BUDGET_SHARE, Document, context_messages
+from klugschAIsser.core.memory import SemanticMemory
+from klugschAIsser.core.metrics import MetricsRegistry
 from klugschAIsser.core.ollama_client import OllamaClient
-from klugschAIsser.core.types import ChatMessage, ChatSession
+from klugschAIsser.core.scheduler import GenerationScheduler, GenerationTicket
+from klugschAIsser.core.session_manager import SessionManager
+from klugschAIsser.core.stream_buffer import StreamBuffer, pump_stream
+from klugschAIsser.core.types import BotProfile, ChatMessage, ChatSession
+from klugschAIsser.ui.streaming_markdown import StreamingMarkdown
+
+SCROLL_TO_BOTTOM_JS = "window.scrollTo(0, document.body.scrollHeight);"
+
+# Beim Öffnen eines Chats nur die neuesten Nachrichten zeichnen, ältere beim Hochscrollen nachladen
+RENDER_WINDOW = 30
+# Wie viele bereits gezeichnete Chats versteckt im Browser bleiben (schnelles Zurückwechseln)
+MAX_CACHED_VIEWS = 5
+
+# Meldet dem Server, wenn oben angekommen wurde (-> ältere Nachrichten laden)
+SCROLL_TOP_JS = """
+window.addEventListener('scroll', () => {
+    if (window.scrollY < 100) getElement(%d).$emit('scroll_top');
+});
+"""
+
+
+@dataclass
+class _SessionView:
+    """Die gezeichneten Elemente eines Chats."""
+    container: ui.column
+    history: ui.column  # ältere Nachrichten werden hier oben eingefügt
+    older_button: ui.button
+    first_index: int  # Index der ersten gezeichneten Nachricht
+    rendered_count: int  # len(messages) beim letzten Zeichnen
 
 
 class ChatWidget:
-    def __init__(self):
-        self.client = OllamaClient()
+    def __init__(self, session_manager: SessionManager, scheduler: Optional[GenerationScheduler] = None,
+                 memory: Optional[SemanticMemory] = None, metrics: Optional[MetricsRegistry] = None,
+                 flush_interval_ms: int = 50, flush_tokens: int = 32, show_stats: bool = False):
+        # Alle Generierungen laufen über den (meist app-weit geteilten) Scheduler
+        self.scheduler = scheduler or GenerationScheduler(OllamaClient())
+        self.client = self.scheduler.client
+        # Laufende Generierungen (im Vergleichsmodus eine pro Bot)
+        self.current_tickets: List[GenerationTicket] = []
+        # Gesetzt von der Eingabe bis zum Ende der Antwort (current_tickets erst ab dem Ticket)
+        self._sending = False
+        # Über den SessionManager werden neue Nachrichten direkt persistiert
+        self.session_manager = session_manager
+        # Baut den Verlauf innerhalb des Token-Budgets des Bots
+        self.context_builder = ContextBuilder()
+        # Optional: ähnliche ältere Nachrichten per Embedding-Suche (BotProfile.memory_top_k)
+        self.memory = memory
+        # Dateien aus dem Canvas (von CanvasPanel befüllt); pro Frage gehen nur passende Ausschnitte mit
+        self.documents: List[Document] = []
+        # Optional: Messwerte jeder Generierung sammeln (/metrics) und unter der Antwort anzeigen
+        self.metrics = metrics
+        self.show_stats = show_stats
         self.active_session = None
 
+        # Streaming: UI wird höchstens alle 'flush_interval_ms' bzw. nach 'flush_tokens' Chunks aktualisiert
+        self.flush_interval_ms = flush_interval_ms
+        self.flush_tokens = flush_tokens
+
+        # Gezeichnete Chats (zuletzt benutzter am Ende), nur der aktive ist sichtbar
+        self._views: "OrderedDict[UUID, _SessionView]" = OrderedDict()
+
         # UI-Referenzen
         self.chat_container = None
+        self.placeholder = None
         self.input_field = None
         self.footer = None
+        self.send_button = None
+        self.stop_button = None
+        self.compare_select = None
 
     def build(self):
         """Erstellt die UI-Elemente für den Chat."""
 
         # 1. Nachrichten-Bereich
         with ui.column().classes('w-full max-w-4xl mx-auto p-4 gap-8 pb-32') as self.chat_container:
-            if not self.active_session:
-                ui.label('Bitte wähle oder erstelle einen Chat.').classes('text-gray-500 italic')
-            else:
-                self._render_messages()
+            self.placeholder = ui.label('Bitte wähle oder erstelle einen Chat.').classes('text-gray-500 italic')
+        self.chat_container.on('scroll_top', self._load_older, throttle=0.5)
+        ui.run_javascript(SCROLL_TOP_JS % self.chat_container.id)
+
+        if self.active_session:
+            self.set_session(self.active_session)
 
         # 2. Eingabe-Bereich (Fixed Bottom)
         with ui.footer().classes('bg-slate-900/90 no-shadow p-4 z-50'):
 
             with ui.row().classes(
                     'w-full max-w-4xl mx-auto bg-slate-800 rounded-xl px-4 py-2 items-end border border-gray-700 shadow-2xl') as self.footer:
+                # Vergleichsmodus: mit 2+ ausgewählten Bots geht jede Frage parallel an alle
+                bots = self.session_manager.bots
+                if len(bots) > 1:
+                    self.compare_select = ui.select({i: bot.name for i, bot in enumerate(bots)}, value=[],
+                                                    multiple=True, label='Modelle vergleichen',
+                                                    on_change=self._preload) \
+                        .props('dark dense borderless use-chips options-dense') \
+                        .classes('w-full text-gray-100')
+
                 # ÄNDERUNG: input-style hinzugefügt
                 # max-height: 50vh -> Maximal 50% der Fensterhöhe
                 # overflow-y: auto -> Scrollbalken erscheint, wenn Text länger ist
                 self.input_field = ui.textarea(placeholder='Frag KlugschAIsser...') \
                     .classes('w-full text-gray-100 bg-transparent') \
                     .props('dark borderless autogrow rows=1 input-style="max-height: 50vh; overflow-y: auto"') \
-                    .on('keydown.enter.prevent', self.handle_enter, args=['shiftKey'])
+                    .on('keydown.enter.prevent', self.handle_enter, args=['shiftKey']) \
+                    .on('keydown', self._preload, throttle=5)
 
                 with self.input_field.add_slot('append'):
-                    ui.button(icon='send', on_click=self.send_message) \
+                    self.send_button = ui.button(icon='send', on_click=self.send_message) \
                         .props('flat round dense text-color=blue') \
                         .classes('mb-1')
+                    # Nur sichtbar, während eine Antwort generiert wird
+                    self.stop_button = ui.button(icon='stop', on_click=self.cancel_generation) \
+                        .props('flat round dense text-color=red') \
+                        .classes('mb-1')
+                    self.stop_button.set_visibility(False)
 
     async def handle_enter(self, e):
         """Entscheidet anhand der Shift-Taste, was passiert."""
@@ -50,18 +136,120 @@ class ChatWidget:
             # Nur Enter: Senden
             await self.send_message()
 
+    def cancel_generation(self):
+        """Bricht die laufenden oder wartenden Generierungen ab (Stop-Button oder Verbindungsabbruch)."""
+        for ticket in self.current_tickets:
+            ticket.cancel()
+
+    def _set_generating(self, generating: bool):
+        self.send_button.set_visibility(not generating)
+        self.stop_button.set_visibility(generating)
+
     def set_session(self, session: ChatSession):
+        """Zeigt den Chat an. Bereits gezeichnete Chats werden nur wieder eingeblendet."""
+        if self.placeholder:
+            self.placeholder.delete()
+            self.placeholder = None
+
+        current = self._views.get(self.active_session.id) if self.active_session else None
+        if current:
+            current.container.set_visibility(False)
+
         self.active_session = session
-        self.chat_container.clear()
+        view = self._views.get(session.id)
+        if view and view.rendered_count != len(session.messages):
+            # Nachrichten wurden inzwischen neu geladen -> View ist veraltet
+            self._drop_view(session.id)
+            view = None
+
+        if view:
+            view.container.set_visibility(True)
+            self._views.move_to_end(session.id)
+        else:
+            self._views[session.id] = self._render_view(session)
+            while len(self._views) > MAX_CACHED_VIEWS:
+                self._drop_view(next(iter(self._views)))
+
+        ui.run_javascript(SCROLL_TO_BOTTOM_JS)
+        self._preload()
+
+    def _preload(self):
+        """Lädt die Modelle der nächsten Antwort schon vor, während der User noch tippt."""
+        residency = self.scheduler.residency
+        if not residency:
+            return
+        bots = self._compare_bots()
+        for bot in bots if len(bots) > 1 else [self.session_manager.default_bot]:
+            residency.request_preload(bot.ollama_model)
+
+    @property
+    def _active_view(self) -> _SessionView:
+        return self._views[self.active_session.id]
+
+    def _render_view(self, session: ChatSession) -> _SessionView:
+        """Zeichnet nur die letzten RENDER_WINDOW Nachrichten."""
+        first_index = max(0, len(session.messages) - RENDER_WINDOW)
         with self.chat_container:
-            self._render_messages()
+            with ui.column().classes('w-full gap-8') as container:
+                older_button = ui.button('Ältere Nachrichten laden', on_click=self._load_older) \
+                    .props('flat no-caps text-color=grey').classes('self-center')
+                older_button.set_visibility(first_index > 0)
+                with ui.column().classes('w-full gap-8') as history:
+                    for msg in session.messages[first_index:]:
+                        self._create_stored_message(msg)
 
-    def _render_messages(self):
-        if not self.active_session: return
-        for msg in self.active_session.messages:
-            self._create_message_element(msg.content, is_user=(msg.role == 'user'))
+        return _SessionView(container, history, older_button, first_index, len(session.messages))
+
+    def _load_older(self):
+        """Zeichnet den nächsten Block älterer Nachrichten oberhalb der bisherigen."""
+        if not self.active_session or self.active_session.id not in self._views:
+            return
+        view = self._active_view
+        if view.first_index == 0:
+            return
+
+        start = max(0, view.first_index - RENDER_WINDOW)
+        with view.history:
+            with ui.column().classes('w-full gap-8') as block:
+                for msg in self.active_session.messages[start:view.first_index]:
+                    self._create_stored_message(msg)
+        block.move(view.history, target_index=0)
 
-    def _create_message_element(self, text, is_user):
+        view.first_index = start
+        view.older_button.set_visibility(start > 0)
+
+    def forget_session(self, session_id: UUID):
+        """Verwirft alles, was zu einer (gelöschten) Session zwischengespeichert ist."""
+        if any(ticket.session_key == session_id for ticket in self.current_tickets):
+            self.cancel_generation()
+        if session_id in self._views:
+            self._drop_view(session_id)
+        self.context_builder.forget(session_id)
+        if self.memory:
+            self.memory.forget_session(session_id)
+        if self.active_session and self.active_session.id == session_id:
+            self.active_session = None
+
+    def _drop_view(self, session_id: UUID):
+        view = self._views.pop(session_id)
+        view.container.delete()
+
+    def _create_stored_message(self, msg: ChatMessage):
+        if msg.role == 'user':
+            self._create_message_element(msg.content, is_user=True)
+        elif msg.alternative_to is not None:
+            self._create_message_element(msg.content, is_user=False,
+                                         label=f'{self._bot_name(msg.sender_id)} · Alternative')
+        else:
+            self._create_message_element(msg.content, is_user=False, label=self._bot_name(msg.sender_id))
+
+    def _bot_name(self, sender_id: str) -> str:
+        for bot in self.session_manager.bots:
+            if str(bot.id) == sender_id:
+                return bot.name
+        return 'KlugschAIsser'
+
+    def _create_message_element(self, text, is_user, streaming=False, label='KlugschAIsser'):
         if is_user:
             # USER: Rechtsbündig
             with ui.row().classes('w-full justify-end items-end gap-2'):
@@ -73,54 +261,236 @@ class ChatWidget:
             with ui.row().classes('w-full items-start gap-4 animate-fade'):
                 ui.avatar(icon='smart_toy', color='blue-grey-9', text_color='white').classes('mt-1')
                 with ui.column().classes('flex-grow min-w-0 spacing-y-1'):
-                    ui.label('KlugschAIsser').classes('text-blue-400 text-xs font-bold mb-1')
-                    content = ui.markdown(text).classes('w-full text-gray-200 leading-relaxed')
+                    ui.label(label).classes('text-blue-400 text-xs font-bold mb-1')
+                    # Gestreamte Antworten blockweise rendern, fertige Nachrichten am Stück
+                    markdown = StreamingMarkdown if streaming else ui.markdown
+                    content = markdown(text).classes('w-full text-gray-200 leading-relaxed')
                     return content
 
     async def send_message(self):
         if not self.active_session: return
+        if self._sending: return  # Es läuft bereits eine Antwort
 
         text = self.input_field.value
         if not text or not text.strip(): return
 
         self.input_field.value = ''
 
+        # Schon vor dem ersten await sperren (Gedächtnis-Suche), sonst startet doppeltes Enter zwei Antworten
+        self._sending = True
+        try:
+            await self._send(text)
+        finally:
+            self._sending = False
+
+    async def _send(self, text: str):
+        # Festhalten: der User kann während des Streamings den Chat wechseln
+        session = self.active_session
+        view = self._active_view
+
         # User Nachricht anzeigen
-        with self.chat_container:
+        with view.history:
             self._create_message_element(text, is_user=True)
 
-        self.active_session.messages.append(ChatMessage(role='user', content=text))
+        user_msg = ChatMessage(role='user', content=text)
+        self.session_manager.add_message(session, user_msg)
+        self._sync_view(session)
+
+        bots = self._compare_bots()
+        if len(bots) > 1:
+            await self._send_compare(session, view, user_msg, bots)
+            return
 
         # Platzhalter für Bot
-        with self.chat_container:
+        with view.history:
             spinner_row = ui.row().classes('items-center gap-2')
             with spinner_row:
                 ui.avatar(icon='smart_toy', color='blue-grey-9', text_color='white')
                 ui.spinner(size='1.5em', color='blue-400')
+                queue_label = ui.label().classes('text-gray-500 text-xs')
+
+            response_markdown = self._create_message_element("", is_user=False, streaming=True)
 
-            response_markdown = self._create_message_element("", is_user=False)
+        bot = self.session_manager.default_bot
+        extra = await self._recall(session, text, bot) + self._document_context(text, bot)
+        history_dicts = self.context_builder.build(session, bot, extra)
 
-        # LLM Streaming
-        full_response = ""
-        history_dicts = [m.to_ollama_dict() for m in self.active_session.messages]
+        def show_position(position: int):
+            queue_label.text = f'Warteschlange: Platz {position}' if position > 0 else ''
 
+        ticket = GenerationTicket(session.id, bot.ollama_model, on_position=show_position)
+        self.current_tickets = [ticket]
+        self._set_generating(True)
+        answer = ""
         try:
-            first_chunk = True
-            async for chunk in self.client.chat(history_dicts):
-                if first_chunk:
-                    spinner_row.delete()
-                    first_chunk = False
+            answer = await self._stream(ticket, history_dicts, bot, response_markdown, view.history,
+                                        on_first_chunk=spinner_row.delete, show_stats=self.show_stats)
+        finally:
+            self.current_tickets = []
+            self._set_generating(False)
+            if not answer:
+                spinner_row.delete()
+
+        # Abgebrochen, bevor etwas kam, oder Chat inzwischen gelöscht -> nichts speichern
+        if not answer:
+            return
+        if self.session_manager.get_session(session.id) is None:
+            return
+
+        bot_msg = ChatMessage(role='assistant', content=answer)
+        self.session_manager.add_message(session, bot_msg)
+        self.session_manager.update_title(session)
+        self._sync_view(session)
+        self._remember(session, session.messages[-2:])
 
-                full_response += chunk
-                if response_markdown:
-                    response_markdown.content = full_response
+    async def _stream(self, ticket: GenerationTicket, payload: List[Dict[str, str]], bot: BotProfile,
+                      target: StreamingMarkdown, container, on_first_chunk=None, show_stats=False) -> str:
+        """Streamt eine Antwort in 'target' und gibt den fertigen Text zurück (leer bei Abbruch ohne Text)."""
+        # Chunks werden gepuffert und gebündelt gerendert (inkl. Scrollen),
+        # statt bei jedem Token die komplette Antwort neu zu senden.
+        buffer = StreamBuffer(self.flush_interval_ms, self.flush_tokens)
 
-                ui.run_javascript("window.scrollTo(0, document.body.scrollHeight);")
+        def render(text: str):
+            start = time.perf_counter()
+            target.content = text
+            ui.run_javascript(SCROLL_TO_BOTTOM_JS)
+            ticket.stats.render_time += time.perf_counter() - start
+            ticket.stats.renders += 1
+
+        # Timer sorgt dafür, dass auch bei einer Pause im Stream der letzte Stand erscheint
+        with container:
+            flush_timer = ui.timer(self.flush_interval_ms / 1000,
+                                   lambda: buffer.has_pending and render(buffer.flush()))
+
+        try:
+            stream = self.scheduler.chat(ticket, payload, options=bot.ollama_options(), keep_alive=bot.keep_alive)
+            # Finaler Flush passiert in pump_stream, damit garantiert der vollständige Text erscheint
+            await pump_stream(stream, buffer, render, on_first_chunk=on_first_chunk)
 
         except Exception as e:
+            ticket.stats.error = type(e).__name__
             ui.notify(f"Fehler: {e}", type='negative')
-            if 'spinner_row' in locals(): spinner_row.delete()
 
-        bot_msg = ChatMessage(role='assistant', content=full_response)
-        self.active_session.messages.append(bot_msg)
-        self.active_session.update_title_from_content()
\ No newline at end of file
+        finally:
+            flush_timer.cancel()
+            if self.metrics:
+                self.metrics.observe(ticket.stats)
+
+        if show_stats and buffer.text:
+            with target.parent_slot:
+                ui.label(ticket.stats.summary()).classes('text-gray-500 text-xs')
+        return buffer.text
+
+    # --- Vergleichsmodus ---
+
+    def _compare_bots(self) -> List[BotProfile]:
+        if not self.compare_select or not self.compare_select.value:
+            return []
+        return [self.session_manager.bots[i] for i in sorted(self.compare_select.value)]
+
+    async def _send_compare(self, session: ChatSession, view: _SessionView, user_msg: ChatMessage,
+                            bots: List[BotProfile]):
+        """
+        Schickt dieselbe Frage gleichzeitig an mehrere Bots, jede Antwort in einer eigenen Spalte.
+        Die erste Antwort wird übernommen, die übrigen als Alternativen gespeichert.
+        """
+        # Gemeinsamer Verlauf wird nur einmal gebaut, jeder Bot bekommt seinen System-Prompt davor
+        extra = await self._recall(session, user_msg.content, bots[0]) + self._document_context(
+            user_msg.content, min(bots, key=lambda b: b.context_token_budget))
+        payloads = self.context_builder.build_many(session, bots, extra)
+
+        with view.history:
+            with ui.row().classes('w-full gap-4 items-start no-wrap overflow-x-auto'):
+                columns = [self._compare_column(session, bot) for bot in bots]
+
+        async def run(column, payload: List[Dict[str, str]], bot: BotProfile) -> str:
+            ticket, markdown, stop = column
+            # gather() startet eigene Tasks ohne NiceGUI-Slot -> Ziel explizit setzen (ui.notify etc.)
+            with view.history:
+                try:
+                    return await self._stream(ticket, payload, bot, markdown, view.history, show_stats=True)
+                finally:
+                    stop.set_visibility(False)
+
+        self.current_tickets = [ticket for ticket, _, _ in columns]
+        self._set_generating(True)
+        try:
+            # Alle parallel: die Gesamtdauer entspricht etwa dem langsamsten Modell
+            answers = await asyncio.gather(*(run(c, p, b) for c, p, b in zip(columns, payloads, bots)))
+        finally:
+            self.current_tickets = []
+            self._set_generating(False)
+
+        if self.session_manager.get_session(session.id) is None:
+            return
+        new_messages = []
+        primary: Optional[ChatMessage] = None
+        for bot, answer in zip(bots, answers):
+            if not answer:
+                continue
+            msg = ChatMessage(role='assistant', sender_id=str(bot.id), content=answer,
+                              alternative_to=primary.id if primary else None)
+            primary = primary or msg
+            self.session_manager.add_message(session, msg)
+            new_messages.append(msg)
+
+        self.session_manager.update_title(session)
+        self._sync_view(session)
+        self._remember(session, [user_msg] + new_messages)
+
+    def _compare_column(self, session: ChatSession, bot: BotProfile):
+        """Eine Spalte mit Kopfzeile (Name, Warteschlange, eigener Stop-Button) und Antwort."""
+        with ui.column().classes('flex-1 min-w-64 gap-1'):
+            with ui.row().classes('w-full items-center gap-2'):
+                ui.label(bot.name).classes('text-blue-400 text-xs font-bold')
+                queue_label = ui.label().classes('text-gray-500 text-xs')
+                ui.space()
+                stop = ui.button(icon='stop').props('flat round dense size=sm text-color=red')
+            markdown = StreamingMarkdown().classes('w-full text-gray-200 leading-relaxed')
+
+        def show_position(position: int):
+            queue_label.text = f'Warteschlange: Platz {position}' if position > 0 else ''
+
+        ticket = GenerationTicket(session.id, bot.ollama_model, on_position=show_position)
+        # Jede Spalte lässt sich einzeln abbrechen
+        stop.on_click(ticket.cancel)
+        return ticket, markdown, stop
+
+    def _sync_view(self, session: ChatSession):
+        """Merkt sich, dass der View alle Nachrichten der Session enthält."""
+        view = self._views.get(session.id)
+        if view:
+            view.rendered_count = len(session.messages)
+
+    async def _recall(self, session: ChatSession, text: str, bot: BotProfile) -> List[Dict[str, str]]:
+        """Sucht ähnliche ältere Nachrichten, die nicht ohnehin im Kontext stehen."""
+        if not self.memory or not bot.memory_top_k:
+            return []
+        in_context = {m.id for m in session.messages[self.context_builder.window_start(session):]}
+        try:
+            hits = await self.memory.recall(self.session_manager.owner_id, text, bot.memory_top_k,
+                                            exclude=in_context)
+        except Exception as e:
+            # Ohne Erinnerung weitermachen statt die Antwort zu blockieren
+            ui.notify(f"Gedächtnis nicht verfügbar: {e}", type='warning')
+            return []
+        if not hits:
+            return []
+        lines = '\n'.join(f"- ({hit.role}) {hit.content}" for hit in hits)
+        return [{"role": "system", "content": f"Relevante frühere Nachrichten:\n{lines}"}]
+
+    def _document_context(self, text: str, bot: BotProfile) -> List[Dict[str, str]]:
+        """Die zur Frage passenden Ausschnitte der Canvas-Dateien (höchstens ein Teil des Budgets)."""
+        if not self.documents:
+            return []
+        return context_messages(self.documents, text, int(bot.context_token_budget * DOCUMENT_BUDGET_SHARE))
+
+    def _remember(self, session: ChatSession, messages):
+        """Nimmt Nachrichten im Hintergrund ins Gedächtnis auf (bekannte werden übersprungen)."""
+        # Nur einbetten, wenn überhaupt ein Bot das Gedächtnis abfragt
+        if not any(bot.memory_top_k for bot in self.session_manager.bots):
+            return
+        if self.memory and messages:
+            background_tasks.create(
+                self.memory.index_messages(self.session_manager.owner_id, session.id, list(messages))
+            )
\ No newline at end of file
@@ -1,10 +1,15 @@
+from typing import Dict
+from uuid import UUID
+
 from PySide6.QtWidgets import (QMainWindow, QWidget, QHBoxLayout,
-                               QVBoxLayout, QPushButton, QListWidget)
+                               QVBoxLayout, QPushButton, QListWidget, QListWidgetItem)
 from PySide6.QtCore import Qt
 
 from klugschAIsser.ui.theme import load_stylesheet
-from klugschAIsser.ui.chat_widget import ChatWidget
-from klugschAIsser.core.session_manager import SessionManager
+from klugschAIsser.ui.qt_chat_widget import QtChatWidget
+from klugschAIsser.core.session_manager import (
+    SessionManager, EVENT_ACTIVATED, EVENT_CREATED, EVENT_MOVED, EVENT_RETITLED,
+)
 
 
 class MainWindow(QMainWindow):
@@ -13,6 +18,8 @@ class MainWindow(QMainWindow):
 
         # Daten-Manager initialisieren
         self.session_manager = SessionManager()
+        # Session-ID -> Listeneintrag, damit wir gezielt einzelne Einträge ändern können
+        self._session_items: Dict[UUID, QListWidgetItem] = {}
         # Initialer Chat
         self.session_manager.create_new_session()
 
@@ -52,7 +59,10 @@ class MainWindow(QMainWindow):
         # Nachdem alles erstellt ist, laden wir den ersten Chat
         self._refresh_sidebar_and_chat()
 
-        # Signal verbinden: Wenn Titel im ChatWidget aktualisiert wird -> Sidebar neu laden
+        # Ab jetzt nur noch gezielte Updates über die Ereignisse des SessionManagers
+        self.session_manager.listeners.append(self._on_session_event)
+
+        # Signal verbinden: Wenn Titel im ChatWidget aktualisiert wird -> Eintrag umbenennen
         # chat_container ist ein QWidget (Container), wir müssen auf das innere Widget zugreifen
         # Siehe _create_chat_container Implementierung unten
         self.chat_widget_instance.chat_title_updated.connect(self._update_sidebar_only)
@@ -103,7 +113,7 @@ class MainWindow(QMainWindow):
         layout.setContentsMargins(0, 0, 0, 0)
 
         # ChatWidget Instanz speichern, damit wir Signale verbinden können
-        self.chat_widget_instance = ChatWidget()
+        self.chat_widget_instance = QtChatWidget(self.session_manager)
         self.chat_widget_instance.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
 
         layout.addWidget(self.chat_widget_instance)
@@ -112,15 +122,16 @@ class MainWindow(QMainWindow):
     # --- Logik ---
 
     def on_new_chat_clicked(self):
-        self.session_manager.create_new_session()
-        self._refresh_sidebar_and_chat()
+        # Sidebar-Eintrag & Markierung kommen über _on_session_event
+        session = self.session_manager.create_new_session()
+        self.chat_widget_instance.load_session(session, self.session_manager.default_bot)
 
     def on_sidebar_item_clicked(self, item):
-        # Wir nutzen hier den Index der Liste, da er der Reihenfolge in sessions entspricht
-        # (Achtung: funktioniert nur solange wir nicht sortieren/filtern)
-        index = self.session_list_widget.row(item)
-        session = self.session_manager.sessions[index]
-        self.session_manager.active_session = session
+        # Die Session-ID hängt am Eintrag, unabhängig von der Position in der Liste
+        session = self.session_manager.get_session(item.data(Qt.ItemDataRole.UserRole))
+        if session is None:
+            return
+        self.session_manager.open_session(session)
 
         # Nur Chat laden, Sidebar muss nicht neu gebaut werden
         self.chat_widget_instance.load_session(
@@ -129,8 +140,11 @@ class MainWindow(QMainWindow):
         )
 
     def _refresh_sidebar_and_chat(self):
-        """Lädt Sidebar neu und zeigt aktiven Chat an."""
-        self._update_sidebar_only()
+        """Baut die Sidebar einmalig auf und zeigt den aktiven Chat an."""
+        self.session_list_widget.clear()
+        self._session_items.clear()
+        for session in self.session_manager.sessions:
+            self.session_list_widget.addItem(self._create_item(session))
 
         if self.session_manager.active_session:
             # Chat Widget laden
@@ -138,18 +152,35 @@ class MainWindow(QMainWindow):
                 self.session_manager.active_session,
                 self.session_manager.default_bot
             )
-
-            # Selektierung in der Liste korrigieren
-            idx = self.session_manager.sessions.index(self.session_manager.active_session)
-            self.session_list_widget.setCurrentRow(idx)
+            self._select(self.session_manager.active_session)
 
     def _update_sidebar_only(self):
-        """Aktualisiert nur die Texte in der Liste."""
-        self.session_list_widget.clear()
-        for session in self.session_manager.sessions:
-            self.session_list_widget.addItem(session.title)
-
-        # Selektion wiederherstellen falls möglich
-        if self.session_manager.active_session in self.session_manager.sessions:
-            idx = self.session_manager.sessions.index(self.session_manager.active_session)
-            self.session_list_widget.setCurrentRow(idx)
\ No newline at end of file
+        """Aktualisiert nur den Titel des aktiven Chats."""
+        if self.session_manager.active_session:
+            self._on_session_event(EVENT_RETITLED, self.session_manager.active_session)
+
+    def _on_session_event(self, event, session):
+        item = self._session_items.get(session.id)
+        if event in (EVENT_CREATED, EVENT_MOVED):
+            if item is not None:
+                self.session_list_widget.takeItem(self.session_list_widget.row(item))
+            else:
+                item = self._create_item(session)
+            self.session_list_widget.insertItem(0, item)
+            if session is self.session_manager.active_session:
+                self._select(session)
+        elif event == EVENT_RETITLED and item is not None:
+            item.setText(session.title)
+        elif event == EVENT_ACTIVATED:
+            self._select(session)
+
+    def _create_item(self, session):
+        item = QListWidgetItem(session.title)
+        item.setData(Qt.ItemDataRole.UserRole, session.id)
+        self._session_items[session.id] = item
+        return item
+
+    def _select(self, session):
+        item = self._session_items.get(session.id)
+        if item is not None:
+            self.session_list_widget.setCurrentItem(item)
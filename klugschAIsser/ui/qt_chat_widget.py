@@ -0,0 +1,189 @@
+from typing import Dict, Optional
+from uuid import UUID
+
+from PySide6.QtCore import Qt, QTimer, Signal
+from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QScrollArea,
+                               QLabel, QLineEdit, QPushButton)
+
+from klugschAIsser.core.context_builder import ContextBuilder
+from klugschAIsser.core.ollama_client import OllamaClient
+from klugschAIsser.core.session_manager import SessionManager
+from klugschAIsser.core.types import BotProfile, ChatMessage, ChatSession
+from klugschAIsser.core.worker import AsyncLoopThread, OllamaWorker
+
+
+class QtChatWidget(QWidget):
+    """
+    Chat-Bereich der Desktop-Oberfläche (PySide6).
+
+    Jede Antwort läuft in einem eigenen OllamaWorker auf der gemeinsamen
+    AsyncLoopThread; der UI-Thread bekommt nur gebündelte Text-Stücke und bleibt
+    bedienbar. Mehrere Chats können gleichzeitig generieren: Beim Wechsel läuft
+    die Antwort im Hintergrund weiter und erscheint beim Zurückwechseln.
+    """
+    chat_title_updated = Signal()
+
+    def __init__(self, session_manager: SessionManager, client: Optional[OllamaClient] = None,
+                 loop_thread: Optional[AsyncLoopThread] = None, parent: Optional[QWidget] = None):
+        super().__init__(parent)
+        self.session_manager = session_manager
+        # Ein Client für alle Worker; er lebt auf der Hintergrund-Loop
+        self.client = client or OllamaClient()
+        self.loop_thread = loop_thread or AsyncLoopThread.shared()
+        self.context_builder = ContextBuilder()
+
+        self.active_session: Optional[ChatSession] = None
+        self.bot: Optional[BotProfile] = None
+        # Laufende Antworten und ihr bisheriger Text, je Session
+        self._workers: Dict[UUID, OllamaWorker] = {}
+        self._partial: Dict[UUID, str] = {}
+        self._live_label: Optional[QLabel] = None
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(15, 15, 15, 15)
+
+        self.scroll_area = QScrollArea()
+        self.scroll_area.setWidgetResizable(True)
+        content = QWidget()
+        content.setObjectName("chat_scroll_content")
+        self.messages_layout = QVBoxLayout(content)
+        self.messages_layout.setSpacing(10)
+        self.messages_layout.addStretch()
+        self.scroll_area.setWidget(content)
+        layout.addWidget(self.scroll_area, 1)
+
+        input_row = QHBoxLayout()
+        self.input_field = QLineEdit()
+        self.input_field.setPlaceholderText("Schreibe eine Nachricht...")
+        self.input_field.returnPressed.connect(self.send_message)
+        self.send_button = QPushButton("Senden")
+        self.send_button.clicked.connect(self.send_message)
+        self.stop_button = QPushButton("Stop")
+        self.stop_button.clicked.connect(self.cancel_generation)
+        self.stop_button.hide()
+        input_row.addWidget(self.input_field, 1)
+        input_row.addWidget(self.send_button)
+        input_row.addWidget(self.stop_button)
+        layout.addLayout(input_row)
+
+    def load_session(self, session: ChatSession, bot: BotProfile):
+        self.active_session = session
+        self.bot = bot
+        self._clear_messages()
+        for msg in session.messages:
+            if msg.alternative_to is None:
+                self._add_bubble(msg.content, is_user=msg.role == 'user')
+
+        # Läuft in diesem Chat noch eine Antwort, bisherigen Stand zeigen und weiter anhängen
+        self._live_label = None
+        if session.id in self._workers:
+            self._live_label = self._add_bubble(self._partial.get(session.id, ""), is_user=False)
+        self._update_buttons()
+        self._scroll_to_bottom()
+
+    def send_message(self):
+        session = self.active_session
+        if session is None or session.id in self._workers:
+            return
+        text = self.input_field.text().strip()
+        if not text:
+            return
+        self.input_field.clear()
+
+        self._add_bubble(text, is_user=True)
+        self.session_manager.add_message(session, ChatMessage(role='user', content=text))
+
+        bot = self.bot or self.session_manager.default_bot
+        worker = OllamaWorker(self.client, self.context_builder.build(session, bot),
+                              model=bot.ollama_model, options=bot.ollama_options(),
+                              keep_alive=bot.keep_alive, loop_thread=self.loop_thread, parent=self)
+        # Session-ID festhalten: der User kann während des Streamings den Chat wechseln
+        worker.chunks_received.connect(lambda delta, sid=session.id: self._on_chunks(sid, delta))
+        worker.failed.connect(lambda error, sid=session.id: self._on_failed(sid, error))
+        worker.finished.connect(lambda answer, s=session, b=bot: self._on_finished(s, b, answer))
+
+        self._workers[session.id] = worker
+        self._partial[session.id] = ""
+        self._live_label = self._add_bubble("", is_user=False)
+        self._update_buttons()
+        self._scroll_to_bottom()
+        worker.start()
+
+    def cancel_generation(self):
+        if self.active_session and self.active_session.id in self._workers:
+            self._workers[self.active_session.id].cancel()
+
+    # --- Slots der Worker (laufen im UI-Thread) ---
+
+    def _on_chunks(self, session_id: UUID, delta: str):
+        text = self._partial.get(session_id, "") + delta
+        self._partial[session_id] = text
+        if self._is_active(session_id) and self._live_label is not None:
+            self._live_label.setText(text)
+            self._scroll_to_bottom()
+
+    def _on_failed(self, session_id: UUID, error: str):
+        if self._is_active(session_id) and self._live_label is not None:
+            self._live_label.setText(f"{self._partial.get(session_id, '')}\n\nFehler: {error}")
+
+    def _on_finished(self, session: ChatSession, bot: BotProfile, answer: str):
+        worker = self._workers.pop(session.id, None)
+        self._partial.pop(session.id, None)
+        if worker is not None:
+            worker.deleteLater()
+
+        if self._is_active(session.id):
+            if not answer and self._live_label is not None and not self._live_label.text():
+                self._live_label.deleteLater()
+            self._live_label = None
+            self._update_buttons()
+
+        # Abgebrochen, bevor etwas kam, oder Chat inzwischen gelöscht -> nichts speichern
+        if not answer or self.session_manager.get_session(session.id) is None:
+            return
+        self.session_manager.add_message(session, ChatMessage(role='assistant', sender_id=str(bot.id),
+                                                              content=answer))
+        if self.session_manager.update_title(session):
+            self.chat_title_updated.emit()
+
+    # --- Hilfsfunktionen ---
+
+    def _is_active(self, session_id: UUID) -> bool:
+        return self.active_session is not None and self.active_session.id == session_id
+
+    def _update_buttons(self):
+        generating = self.active_session is not None and self.active_session.id in self._workers
+        self.send_button.setVisible(not generating)
+        self.stop_button.setVisible(generating)
+
+    def _add_bubble(self, text: str, is_user: bool) -> QLabel:
+        label = QLabel(text)
+        label.setWordWrap(True)
+        label.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse)
+        label.setProperty("class", "user-bubble" if is_user else "llm-bubble")
+        if not is_user:
+            label.setTextFormat(Qt.TextFormat.MarkdownText)
+
+        row = QHBoxLayout()
+        if is_user:
+            row.addStretch()
+        row.addWidget(label)
+        if not is_user:
+            row.addStretch()
+        # Vor dem Stretch am Ende einfügen, damit die Nachrichten oben beginnen
+        self.messages_layout.insertLayout(self.messages_layout.count() - 1, row)
+        return label
+
+    def _clear_messages(self):
+        while self.messages_layout.count() > 1:
+            row = self.messages_layout.takeAt(0).layout()
+            while row.count():
+                widget = row.takeAt(0).widget()
+                if widget is not None:
+                    widget.deleteLater()
+            row.deleteLater()
+
+    def _scroll_to_bottom(self):
+        # Erst nach dem nächsten Layout-Durchlauf ist die neue Höhe bekannt
+        bar = self.scroll_area.verticalScrollBar()
+        QTimer.singleShot(0, lambda: bar.setValue(bar.maximum()))
@@ -0,0 +1,44 @@
+from typing import Callable
+
+from nicegui import ui
+
+from klugschAIsser.core.session_manager import SessionManager
+from klugschAIsser.core.types import ChatSession
+
+# Wie viele Treffer angezeigt werden
+MAX_RESULTS = 20
+
+
+class SearchPanel:
+    """Suchfeld in der linken Leiste, durchsucht Titel und Nachrichten aller Chats."""
+
+    def __init__(self, session_manager: SessionManager, on_select: Callable[[ChatSession], None]):
+        self.session_manager = session_manager
+        self.on_select = on_select
+
+        self.input = None
+        self.results = None
+
+    def build(self):
+        # Suche erst, wenn kurz nicht mehr getippt wurde
+        self.input = ui.input(placeholder='Chats durchsuchen...', on_change=self.update_results) \
+            .props('dark dense outlined clearable debounce=300') \
+            .classes('w-full px-2 mb-2')
+        self.results = ui.column().classes('w-full px-2 gap-1 mb-4')
+
+    def update_results(self):
+        self.results.clear()
+        query = (self.input.value or '').strip()
+        if not query:
+            return
+
+        hits = self.session_manager.search(query, limit=MAX_RESULTS)
+        with self.results:
+            if not hits:
+                ui.label('Keine Treffer').classes('text-gray-500 text-xs italic')
+            for hit in hits:
+                session = self.session_manager.get_session(hit.session_id)
+                with ui.card().classes('w-full p-2 bg-gray-800 cursor-pointer') \
+                        .on('click', lambda s=session: self.on_select(s)):
+                    ui.label(hit.title).classes('text-gray-200 text-sm font-bold truncate w-full')
+                    ui.markdown(hit.snippet).classes('text-gray-400 text-xs')
@@ -0,0 +1,106 @@
+from typing import Callable, Dict, Optional
+from uuid import UUID
+
+from nicegui import ui
+
+from klugschAIsser.core.session_manager import (
+    EVENT_ACTIVATED, EVENT_CREATED, EVENT_DELETED, EVENT_MOVED, EVENT_RETITLED, SessionManager,
+)
+from klugschAIsser.core.types import ChatSession
+
+# Wie viele Chats pro "Mehr anzeigen" zusätzlich gezeichnet werden
+PAGE_SIZE = 50
+
+ACTIVE_CLASSES = 'bg-gray-800 border border-gray-700'
+
+
+class SessionSidebar:
+    """
+    Liste der Chats in der linken Leiste.
+
+    Statt bei jeder Änderung alle Buttons neu zu bauen, hört die Sidebar auf
+    die Ereignisse des SessionManagers und ändert nur den betroffenen Button
+    (einfügen, nach oben schieben, umbenennen, markieren).
+    Es werden nur die ersten Seiten gezeichnet, weitere auf Klick.
+    """
+
+    def __init__(self, session_manager: SessionManager, on_select: Callable[[ChatSession], None],
+                 on_delete: Callable[[ChatSession], None]):
+        self.session_manager = session_manager
+        self.on_select = on_select
+        self.on_delete = on_delete
+
+        self._buttons: Dict[UUID, ui.button] = {}
+        self._highlighted: Optional[UUID] = None
+
+        self.container = None
+        self.more_button = None
+
+    def build(self):
+        self.container = ui.column().classes('w-full px-2 gap-2')
+        self.more_button = ui.button('Mehr anzeigen', on_click=self.show_more) \
+            .props('flat no-caps text-color=grey').classes('w-full')
+        self.show_more()
+        self.session_manager.listeners.append(self.handle_event)
+
+    def detach(self):
+        """Beim Schließen des Tabs abmelden, damit der Manager keine toten UIs referenziert."""
+        if self.handle_event in self.session_manager.listeners:
+            self.session_manager.listeners.remove(self.handle_event)
+
+    def show_more(self):
+        """Zeichnet die nächste Seite älterer Chats unten an."""
+        page = self.session_manager.recent_sessions(PAGE_SIZE, offset=len(self._buttons))
+        with self.container:
+            for session in page:
+                if session.id not in self._buttons:
+                    self._create_button(session)
+        self.more_button.set_visibility(len(self._buttons) < len(self.session_manager))
+        self._highlight(self.session_manager.active_session)
+
+    def handle_event(self, event: str, session: ChatSession):
+        if event in (EVENT_CREATED, EVENT_MOVED):
+            self._move_to_top(session)
+        elif event == EVENT_RETITLED:
+            button = self._buttons.get(session.id)
+            if button:
+                button.text = session.title
+        elif event == EVENT_ACTIVATED:
+            self._highlight(session)
+        elif event == EVENT_DELETED:
+            button = self._buttons.pop(session.id, None)
+            if button:
+                button.delete()
+            if self._highlighted == session.id:
+                self._highlighted = None
+
+    def _create_button(self, session: ChatSession) -> ui.button:
+        button = ui.button(session.title, on_click=lambda s=session: self.on_select(s))
+        button.props('flat align=left no-caps').classes('w-full text-gray-300 truncate')
+        with button:
+            with ui.context_menu():
+                ui.menu_item('Löschen', on_click=lambda s=session: self.on_delete(s))
+        self._buttons[session.id] = button
+        return button
+
+    def _move_to_top(self, session: ChatSession):
+        button = self._buttons.get(session.id)
+        if button is None:
+            with self.container:
+                button = self._create_button(session)
+        button.move(self.container, target_index=0)
+        if session is self.session_manager.active_session:
+            self._highlight(session)
+
+    def _highlight(self, session: Optional[ChatSession]):
+        new_id = session.id if session else None
+        if new_id == self._highlighted:
+            return
+
+        old_button = self._buttons.get(self._highlighted)
+        if old_button:
+            old_button.classes(remove=ACTIVE_CLASSES)
+        new_button = self._buttons.get(new_id)
+        if new_button:
+            new_button.classes(ACTIVE_CLASSES)
+        self._highlighted = new_id
@@ -0,0 +1,45 @@
+from nicegui import ui
+
+from klugschAIsser.core.markdown_blocks import MarkdownBlockSplitter
+
+
+class StreamingMarkdown(ui.column):
+    """
+    Markdown-Anzeige für eine Antwort, die gerade gestreamt wird.
+
+    Jeder Block ist ein eigenes ui.markdown. Eingefrorene Blöcke werden genau
+    einmal gerendert und danach nie mehr angefasst; bei jedem Flush wird nur der
+    letzte (offene) Block neu nach HTML konvertiert und übertragen. Der Browser
+    bekommt also entweder "neuer Block angehängt" oder "letzter Block ersetzt",
+    nie die ganze Antwort. Aufwand und Bytes wachsen damit linear mit der Länge.
+
+    Wie ui.markdown über '.content' bedienbar; der Text darf nur hinten wachsen.
+    """
+
+    def __init__(self, content: str = ''):
+        super().__init__()
+        self.classes('w-full gap-0')
+        self._splitter = MarkdownBlockSplitter()
+        self._text = ''
+        with self:
+            self._open_block = ui.markdown('')
+        if content:
+            self.content = content
+
+    @property
+    def content(self) -> str:
+        return self._text
+
+    @content.setter
+    def content(self, text: str):
+        if text == self._text:
+            return
+        self._text = text
+        frozen, open_block = self._splitter.feed(text)
+        for block in frozen:
+            # Letzter Stand dieses Blocks, danach ist er fertig
+            self._open_block.content = block
+            with self:
+                self._open_block = ui.markdown('')
+        self._open_block.content = open_block
+
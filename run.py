@@ -1,8 +1,28 @@
-from nicegui import ui
+import asyncio
+import os
+import secrets
+from pathlib import Path
+
+from fastapi.responses import PlainTextResponse
+from nicegui import app, ui
 
 # Importe aus unserer Core-Logik
+from klugschAIsser.core.backend_pool import BackendPool, hosts_from_env
+from klugschAIsser.core.client_registry import ClientRegistry
+from klugschAIsser.core.documents import DocumentStore
+from klugschAIsser.core.memory import DEFAULT_MEMORY_DIR, SemanticMemory
+from klugschAIsser.core.metrics import MetricsRegistry
+from klugschAIsser.core.ollama_client import OllamaClient
+from klugschAIsser.core.residency import ModelResidency, budget_from_env
+from klugschAIsser.core.response_cache import ResponseCache
+from klugschAIsser.core.scheduler import GenerationScheduler
 from klugschAIsser.core.session_manager import SessionManager
+from klugschAIsser.core.session_store import SessionStore
+from klugschAIsser.core.types import BotProfile
+from klugschAIsser.ui.canvas_panel import CanvasPanel
 from klugschAIsser.ui.chat_widget import ChatWidget
+from klugschAIsser.ui.search_panel import SearchPanel
+from klugschAIsser.ui.session_sidebar import SessionSidebar
 
 # Konstanten
 THEME_COLORS = {
@@ -10,15 +30,83 @@ THEME_COLORS = {
     "TEXT": "#f9fafb"
 }
 
-# --- State Initialisierung ---
-session_manager = SessionManager()
-if not session_manager.sessions:
-    session_manager.create_new_session()
+# Wie viele Generierungen pro Modell und Ollama-Host gleichzeitig laufen
+MAX_GENERATIONS_PER_MODEL = 2
+
+# Semantisches Gedächtnis: KLUGSCHAISSER_MEMORY_TOP_K=3 gibt jedem Bot bis zu 3 ähnliche
+# ältere Nachrichten mit. Ohne Variable (0) wird nichts eingebettet und EMBEDDING_MODEL nie angefragt.
+MEMORY_TOP_K = int(os.environ.get('KLUGSCHAISSER_MEMORY_TOP_K', '0'))
+EMBEDDING_MODEL = 'nomic-embed-text'
 
-chat_widget = ChatWidget()
+# Bots für den Vergleichsmodus, z.B. KLUGSCHAISSER_MODELS="gemma3:1b,llama3.2:1b" (erster = Standard)
+BOT_MODELS = [m.strip() for m in os.environ.get('KLUGSCHAISSER_MODELS', '').split(',') if m.strip()] \
+    or [BotProfile.ollama_model]
 
+# Wie oft inaktive Clients aus dem Speicher geräumt werden (Sekunden)
+EVICTION_INTERVAL = 60
 
-def create_layout():
+# Signiert das Browser-Cookie (app.storage.browser); ohne KLUGSCHAISSER_STORAGE_SECRET hier erzeugt
+STORAGE_SECRET_PATH = Path.home() / ".klugschAIsser" / "storage_secret"
+
+# --- State Initialisierung ---
+# Chats werden persistent gespeichert, beim Start nur Titel & IDs geladen.
+# Jeder Browser bekommt seinen eigenen SessionManager (siehe main_page).
+session_store = SessionStore()
+clients = ClientRegistry(session_store, bots=[BotProfile(name=m, ollama_model=m, memory_top_k=MEMORY_TOP_K)
+                                             for m in BOT_MODELS])
+# Ollama-Hosts aus OLLAMA_HOSTS (kommagetrennt), sonst nur der Standard-Host
+backends = BackendPool(hosts_from_env())
+# Modelle vorladen, angepinnt halten und bei Leerlauf/Speicherknappheit entladen
+# (Budget pro Host aus KLUGSCHAISSER_MODEL_MEMORY_GB, ohne Variable nur Leerlauf)
+residency = ModelResidency(backends, budget_bytes=budget_from_env())
+# Ein Scheduler für alle Clients: begrenzt die Last auf Ollama und verteilt fair
+# Antwort-Cache greift nur bei deterministischen Bots (temperature=0 oder fester seed)
+scheduler = GenerationScheduler(OllamaClient(cache=ResponseCache(), pool=backends),
+                                max_in_flight=MAX_GENERATIONS_PER_MODEL * len(backends),
+                                residency=residency)
+# Embeddings werden pro Modell in einem eigenen Verzeichnis gecacht
+memory = SemanticMemory(
+    lambda texts: scheduler.client.embed(texts, EMBEDDING_MODEL),
+    DEFAULT_MEMORY_DIR / EMBEDDING_MODEL.replace(':', '_'),
+) if MEMORY_TOP_K > 0 else None
+# Hochgeladene Canvas-Dateien: Chunks einmal berechnet, nach Inhalts-Hash gecacht
+documents = DocumentStore()
+# Messwerte aller Generierungen, abrufbar im Prometheus-Format unter /metrics
+metrics = MetricsRegistry()
+metrics.add_gauge("queue_length", "Wartende Generierungen", scheduler.queue_lengths)
+metrics.add_gauge("generations_in_flight", "Laufende Generierungen", scheduler.in_flight)
+metrics.add_gauge("connected_clients", "Clients mit SessionManager im Speicher",
+                  lambda: {"": len(clients)})
+metrics.add_gauge("backend_healthy", "Ollama-Host erreichbar (1/0)",
+                  lambda: {b.name: int(b.healthy) for b in backends.backends}, label_name="host")
+metrics.add_gauge("backend_outstanding", "Laufende Anfragen je Ollama-Host",
+                  lambda: {b.name: b.outstanding for b in backends.backends}, label_name="host")
+metrics.add_gauge("model_idle_seconds", "Sekunden seit der letzten Benutzung eines Modells", residency.status)
+metrics.add_gauge("loaded_model_bytes", "Speicher der geladenen Modelle je Ollama-Host (laut /api/ps)",
+                  lambda: {b.name: sum(b.loaded_sizes.values()) for b in backends.backends}, label_name="host")
+
+
+def storage_secret() -> str:
+    """
+    Geheimnis für die Cookie-Signatur: aus KLUGSCHAISSER_STORAGE_SECRET oder beim
+    ersten Start zufällig erzeugt und (nur für den eigenen User lesbar) gespeichert.
+    """
+    secret = os.environ.get('KLUGSCHAISSER_STORAGE_SECRET')
+    if secret:
+        return secret
+    STORAGE_SECRET_PATH.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        # O_EXCL: starten zwei Prozesse gleichzeitig, schreibt nur einer
+        fd = os.open(STORAGE_SECRET_PATH, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        return STORAGE_SECRET_PATH.read_text(encoding='utf-8').strip()
+    secret = secrets.token_urlsafe(32)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(secret)
+    return secret
+
+
+def create_layout(session_manager: SessionManager, chat_widget: ChatWidget) -> SessionSidebar:
     """Baut das Hauptlayout der Anwendung."""
 
     # Header
@@ -33,7 +121,12 @@ def create_layout():
 
         ui.label('KlugschAIsser Web [Alpha]').classes('text-xl font-bold text-gray-100')
         ui.space()
+        # Zeigt unter neuen Antworten Tokens/s, Zeit bis zum ersten Token usw.
+        ui.switch('Statistik').bind_value(chat_widget, 'show_stats')
         ui.switch('Dark', value=True, on_change=lambda e: ui.dark_mode(e.value))
+        # Canvas mit hochgeladenen Dateien (rechte Leiste)
+        ui.button(icon='attach_file', on_click=lambda: canvas.toggle()) \
+            .props('flat round dense text-color=white')
 
     # Sidebar (Links)
     # ÄNDERUNG: 'breakpoint=600' statt 'behavior="desktop"'
@@ -48,18 +141,13 @@ def create_layout():
             ui.label('Chats').classes('text-gray-400 text-sm font-bold')
             ui.button(icon='add', on_click=lambda: create_new_chat()).props('flat round text-color=blue')
 
-        session_list_container = ui.column().classes('w-full px-2 gap-2')
+        # Volltextsuche über alle Chats
+        SearchPanel(session_manager, on_select=lambda s: load_chat(s)).build()
 
-        def refresh_sidebar():
-            session_list_container.clear()
-            with session_list_container:
-                for session in session_manager.sessions:
-                    btn = ui.button(session.title, on_click=lambda s=session: load_chat(s))
-                    btn.props('flat align=left no-caps').classes('w-full text-gray-300 truncate')
-                    if session == session_manager.active_session:
-                        btn.classes('bg-gray-800 border border-gray-700')
-
-        refresh_sidebar()
+        # Aktualisiert sich selbst über die Ereignisse des SessionManagers
+        sidebar = SessionSidebar(session_manager, on_select=lambda s: load_chat(s),
+                                 on_delete=lambda s: delete_chat(s))
+        sidebar.build()
 
     # Canvas (Rechts)
     # right_drawer behält Standard-Breakpoint (1024), da der Canvas auf kleinen Screens
@@ -68,6 +156,8 @@ def create_layout():
             'bg-slate-900 border-l border-gray-800') as canvas:
         canvas.props('width=500')
         ui.label('Canvas').classes('text-xl font-bold p-4 text-blue-400')
+        # Dateien gelten für alle Chats in diesem Tab
+        CanvasPanel(documents, chat_widget.documents).build()
 
     # Hauptbereich (Chat)
     chat_widget.build()
@@ -77,20 +167,70 @@ def create_layout():
 
     # --- Logik ---
     def load_chat(session):
-        session_manager.active_session = session
+        session_manager.open_session(session)
         chat_widget.set_session(session)
-        refresh_sidebar()
 
     def create_new_chat():
         new_session = session_manager.create_new_session()
         load_chat(new_session)
 
+    def delete_chat(session):
+        # Der SessionManager öffnet danach selbst die nächste (oder eine neue) Session
+        session_manager.delete_session(session)
+        chat_widget.forget_session(session.id)
+        chat_widget.set_session(session_manager.active_session)
+
+    return sidebar
+
 
 @ui.page('/')
 def main_page():
     ui.query('body').style(f"background-color: {THEME_COLORS['BACKGROUND_DARK']}; color: {THEME_COLORS['TEXT']}")
     ui.dark_mode().enable()
-    create_layout()
+
+    # State pro Browser: die ID bleibt über Reloads und mehrere Tabs hinweg gleich
+    client_id = app.storage.browser['id']
+    session_manager = clients.connect(client_id)
+
+    if not session_manager.active_session:
+        if session_manager.sessions:
+            session_manager.open_session(session_manager.sessions[0])
+        else:
+            session_manager.create_new_session()
+
+    chat_widget = ChatWidget(session_manager, scheduler, memory, metrics)
+    sidebar = create_layout(session_manager, chat_widget)
+
+    def on_delete():
+        # Tab zu -> laufende Generierung abbrechen, damit der Ollama-Slot frei wird.
+        # on_delete statt on_disconnect: kurze Verbindungsabbrüche (Reconnect) beenden nichts.
+        chat_widget.cancel_generation()
+        sidebar.detach()
+        clients.disconnect(client_id)
+
+    ui.context.client.on_delete(on_delete)
+
+
+# async: läuft auf dem Event-Loop, dem Scheduler und Clients gehören (kein Threadpool)
+@app.get('/metrics')
+async def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type='text/plain; version=0.0.4')
+
+
+async def evict_idle_clients():
+    """Räumt regelmäßig Clients ab, die länger nicht verbunden waren."""
+    while True:
+        await asyncio.sleep(EVICTION_INTERVAL)
+        clients.evict_idle()
+
+
+app.on_startup(evict_idle_clients)
+app.on_startup(backends.run_health_checks)
+app.on_startup(residency.run)
+app.on_shutdown(residency.release)
+app.on_shutdown(session_store.close)
+if memory:
+    app.on_shutdown(memory.close)
 
 
 if __name__ in {"__main__", "__mp_main__"}:
@@ -99,5 +239,7 @@ if __name__ in {"__main__", "__mp_main__"}:
         port=8080,
         dark=True,
         native=True,
-        reload=False
+        reload=False,
+        # Nötig für app.storage.browser (Client-Zuordnung)
+        storage_secret=storage_secret(),
     )
\ No newline at end of file
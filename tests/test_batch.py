@@ -0,0 +1,128 @@
+import asyncio
+import io
+import json
+from typing import Dict, List, Optional
+
+from klugschAIsser import batch
+from klugschAIsser.batch import BatchRunner, completed_ids, read_items
+from klugschAIsser.core.types import BotProfile
+
+
+class FakeClient:
+    """Antwortet mit dem Prompt in Großbuchstaben; 'failures' legt fest, wie oft ein Prompt vorher scheitert."""
+
+    def __init__(self, failures: Optional[Dict[str, int]] = None, delays: Optional[Dict[str, float]] = None):
+        self.failures = dict(failures or {})
+        self.delays = delays or {}
+        self.calls: List[str] = []
+
+    async def chat(self, messages, model=None, options=None, keep_alive=None, stats=None):
+        prompt = messages[-1]["content"]
+        self.calls.append(prompt)
+        await asyncio.sleep(self.delays.get(prompt, 0))
+        if self.failures.get(prompt):
+            self.failures[prompt] -= 1
+            stats.error = "ResponseError"
+            yield "Error: kaputt"
+            return
+        stats.eval_tokens = 3
+        yield prompt.upper()
+
+
+def _input(*prompts: str) -> List[str]:
+    return [json.dumps({"id": p, "prompt": p}) + "\n" for p in prompts]
+
+
+def _run(runner: BatchRunner, lines: List[str], done=None) -> List[dict]:
+    out = io.StringIO()
+    asyncio.run(runner.run(read_items(lines, runner.bot), out, done))
+    return [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def test_completed_ids_uses_the_last_line_and_ignores_a_torn_one():
+    lines = [
+        json.dumps({"id": "a", "error": None}),
+        json.dumps({"id": "b", "error": None}),
+        json.dumps({"id": "b", "error": "kaputt"}),
+        json.dumps({"id": 1, "error": None}),
+        '{"id": "c", "resp',  # beim Abbruch halb geschrieben
+    ]
+
+    assert completed_ids(lines) == {'"a"', '1'}
+
+
+def test_resume_skips_completed_ids():
+    lines = _input("a", "b", "c", "d")
+    first = _run(BatchRunner(FakeClient(failures={"c": 9}), BotProfile(), max_attempts=1), lines)
+
+    client = FakeClient()
+    runner = BatchRunner(client, BotProfile())
+    second = _run(runner, lines, completed_ids(json.dumps(r) for r in first))
+
+    assert client.calls == ["c"]
+    assert [(r["id"], r["response"], r["error"]) for r in second] == [("c", "C", None)]
+    assert (runner.stats.skipped, runner.stats.completed, runner.stats.eval_tokens) == (3, 1, 3)
+
+
+def test_failed_requests_are_retried():
+    client = FakeClient(failures={"b": 2})
+    runner = BatchRunner(client, BotProfile(), max_attempts=3, backoff_base=0)
+
+    results = {r["id"]: r for r in _run(runner, _input("a", "b"))}
+
+    assert results["b"]["response"] == "B"
+    assert results["b"]["attempts"] == 3
+    assert (runner.stats.retries, runner.stats.failed) == (2, 0)
+
+
+def test_gives_up_after_max_attempts():
+    runner = BatchRunner(FakeClient(failures={"a": 5}), BotProfile(), max_attempts=2, backoff_base=0)
+
+    [result] = _run(runner, _input("a"))
+
+    assert result["response"] is None
+    assert result["error"] == "Error: kaputt"
+    assert runner.stats.failed == 1
+
+
+def test_ordered_output_follows_the_input_despite_skips_and_blank_lines():
+    # Der erste Prompt ist der langsamste, ohne 'ordered' käme er zuletzt
+    client = FakeClient(delays={"a": 0.05})
+    lines = _input("a", "b") + ["\n"] + _input("c", "d")
+    runner = BatchRunner(client, BotProfile(), concurrency=4, ordered=True)
+
+    results = _run(runner, lines, done={'"c"'})
+
+    assert [r["id"] for r in results] == ["a", "b", "d"]
+
+
+def test_resume_after_a_torn_last_line(tmp_path, monkeypatch):
+    prompts = tmp_path / "prompts.jsonl"
+    prompts.write_text("".join(_input("q1", "q2", "q3")), encoding="utf-8")
+    output = tmp_path / "out.jsonl"
+    # Abbruch mitten im Schreiben von q2
+    output.write_text(json.dumps({"id": "q1", "response": "Q1", "error": None}) + '\n{"id": "q2", "resp',
+                      encoding="utf-8")
+    client = FakeClient()
+    monkeypatch.setattr(batch, "OllamaClient", lambda *args, **kwargs: client)
+
+    assert batch.main([str(prompts), "-o", str(output)]) == 0
+
+    results = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    assert sorted(client.calls) == ["q2", "q3"]
+    assert sorted(r["id"] for r in results) == ["q1", "q2", "q3"]
+    with open(output, encoding="utf-8") as f:
+        assert completed_ids(f) == {'"q1"', '"q2"', '"q3"'}
+
+
+def test_truncate_torn_line_keeps_complete_files(tmp_path):
+    path = tmp_path / "out.jsonl"
+    path.write_bytes(b'{"id": 1}\n')
+    batch.truncate_torn_line(str(path))
+    assert path.read_bytes() == b'{"id": 1}\n'
+
+    path.write_bytes(b"x" * 10_000)
+    batch.truncate_torn_line(str(path))
+    assert path.read_bytes() == b""
+
+    batch.truncate_torn_line(str(tmp_path / "fehlt.jsonl"))
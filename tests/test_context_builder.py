@@ -0,0 +1,124 @@
+from klugschAIsser.core.context_builder import ContextBuilder, estimate_tokens
+from klugschAIsser.core.types import BotProfile, ChatMessage, ChatSession
+
+
+def _session(count: int, chars: int = 40) -> ChatSession:
+    session = ChatSession()
+    for i in range(count):
+        role = 'user' if i % 2 == 0 else 'assistant'
+        session.messages.append(ChatMessage(role=role, content=f"{i:03d}" + "x" * (chars - 3)))
+    return session
+
+
+def _tokens(payload):
+    return sum(estimate_tokens(m["content"]) for m in payload)
+
+
+def test_everything_fits_without_trimming():
+    session = _session(4)
+    bot = BotProfile(system_prompt="Sei knapp.", context_token_budget=1000)
+
+    payload = ContextBuilder().build(session, bot)
+
+    assert payload[0] == {"role": "system", "content": "Sei knapp."}
+    assert [m["content"] for m in payload[1:]] == [m.content for m in session.messages]
+
+
+def test_history_stays_within_budget_and_keeps_newest():
+    session = _session(50)
+    bot = BotProfile(system_prompt="Sei knapp.", context_token_budget=200)
+    builder = ContextBuilder()
+
+    payload = builder.build(session, bot)
+
+    assert _tokens(payload) <= bot.context_token_budget
+    assert payload[0]["role"] == "system"
+    assert payload[-1]["content"] == session.messages[-1].content
+    assert builder.window_start(session) == len(session.messages) - (len(payload) - 1)
+
+
+def test_newest_message_is_kept_even_if_it_exceeds_the_budget():
+    session = _session(3)
+    session.messages.append(ChatMessage(content="y" * 10_000))
+
+    payload = ContextBuilder().build(session, BotProfile(context_token_budget=100))
+
+    assert [m["content"] for m in payload] == ["y" * 10_000]
+
+
+def test_trimming_keeps_the_prefix_stable_between_turns():
+    session = _session(30)
+    bot = BotProfile(context_token_budget=300)
+    builder = ContextBuilder()
+    builder.build(session, bot)
+
+    # Nach dem Überlauf wird auf TRIM_RATIO gekürzt, danach nur noch angehängt
+    session.messages.append(ChatMessage(content="z" * 200))
+    trimmed = builder.build(session, bot)
+    session.messages.append(ChatMessage(role='assistant', content="kurz"))
+    following = builder.build(session, bot)
+
+    assert _tokens(following) <= bot.context_token_budget
+    assert following[:len(trimmed)] == trimmed
+
+
+def test_extra_goes_before_the_newest_message_and_counts_against_the_budget():
+    session = _session(50)
+    bot = BotProfile(system_prompt="S", context_token_budget=200)
+    extra = [{"role": "system", "content": "e" * 200}]
+
+    payload = ContextBuilder().build(session, bot, extra)
+
+    assert payload[-2] == extra[0]
+    assert payload[-1]["content"] == session.messages[-1].content
+    assert _tokens(payload) <= bot.context_token_budget
+
+
+def test_alternatives_are_not_sent():
+    session = _session(2)
+    primary = session.messages[-1]
+    session.messages.append(ChatMessage(role='assistant', content="Alternative", alternative_to=primary.id))
+
+    payload = ContextBuilder().build(session, BotProfile())
+
+    assert "Alternative" not in [m["content"] for m in payload]
+
+
+def test_build_many_shares_the_history_with_the_smallest_budget():
+    session = _session(50)
+    small = BotProfile(system_prompt="A", context_token_budget=150)
+    large = BotProfile(system_prompt="B", context_token_budget=2000)
+
+    payloads = ContextBuilder().build_many(session, [small, large])
+
+    assert [p[0]["content"] for p in payloads] == ["A", "B"]
+    assert payloads[0][1:] == payloads[1][1:]
+    assert _tokens(payloads[0]) <= small.context_token_budget
+
+
+def test_window_grows_back_when_the_budget_grows_again():
+    session = _session(100)
+    bot = BotProfile(context_token_budget=1000)
+    builder = ContextBuilder()
+    full = builder.build(session, bot)
+
+    # Ein Zug mit großem Zusatz (z.B. Datei-Ausschnitte) kürzt den Verlauf ...
+    builder.build(session, bot, [{"role": "system", "content": "d" * 2000}])
+    # ... der nächste ohne Zusatz bekommt wieder das volle Budget
+    session.messages.append(ChatMessage(content="weiter"))
+    after = builder.build(session, bot)
+
+    assert len(after) == len(ContextBuilder().build(session, bot))
+    assert len(after) >= len(full)
+    assert _tokens(after) <= bot.context_token_budget
+
+
+def test_build_many_does_not_shrink_the_window_for_later_single_builds():
+    session = _session(100)
+    small = BotProfile(context_token_budget=150)
+    large = BotProfile(context_token_budget=1000)
+    builder = ContextBuilder()
+
+    builder.build_many(session, [small, large])
+
+    assert builder.build(session, large) == ContextBuilder().build(session, large)
@@ -0,0 +1,113 @@
+import mmap
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from klugschAIsser.core.context_builder import ContextBuilder
+from klugschAIsser.core.documents import DOCUMENT_BUDGET_SHARE, DocumentStore, context_messages, split_chunks
+from klugschAIsser.core.types import BotProfile, ChatMessage, ChatSession
+
+
+def _chunks(tmp_path, text: str, chunk_bytes: int):
+    path = tmp_path / "datei.txt"
+    path.write_text(text, encoding='utf-8')
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        return list(split_chunks(data, chunk_bytes))
+
+
+@pytest.mark.parametrize("text", [
+    "ä" * 500,  # 2 Bytes pro Zeichen
+    "€" * 500,  # 3 Bytes
+    "😀" * 500,  # 4 Bytes
+    ("a" + "😀ä€") * 200,  # gemischt, Grenzen an jeder Position
+])
+@pytest.mark.parametrize("chunk_bytes", [7, 64, 101])
+def test_hard_cuts_never_split_utf8_characters(tmp_path, text, chunk_bytes):
+    chunks = _chunks(tmp_path, text, chunk_bytes)
+
+    assert "".join(c.text for c in chunks) == text
+    assert all("�" not in c.text for c in chunks)
+    assert [c.index for c in chunks] == list(range(len(chunks)))
+
+
+def test_cuts_prefer_blank_lines_and_count_lines(tmp_path):
+    paragraphs = [f"Absatz {i}\n" + "Zeile mit Ümlauten\n" * 3 for i in range(20)]
+    text = "\n".join(paragraphs)
+
+    chunks = _chunks(tmp_path, text, 200)
+
+    assert "".join(c.text for c in chunks) == text
+    # Geschnitten wird an der Leerzeile zwischen zwei Absätzen
+    assert all(c.text.endswith("\n") and n.text.startswith("\nAbsatz") for c, n in zip(chunks, chunks[1:]))
+    line = 1
+    for chunk in chunks:
+        assert chunk.first_line == line
+        line += chunk.text.count("\n")
+
+
+def test_store_selects_only_matching_chunks(tmp_path):
+    path = tmp_path / "code.py"
+    path.write_text("".join(f"def funktion_{i}():\n    return {i}\n\n" for i in range(400)), encoding='utf-8')
+    store = DocumentStore(tmp_path / "cache")
+
+    document = store.load(path)
+    [message] = context_messages([document], "funktion_123", max_tokens=500)
+
+    assert len(document.chunks) > 1
+    assert "funktion_123" in message["content"]
+    assert len(message["content"]) < path.stat().st_size
+
+
+def test_binary_files_are_rejected(tmp_path):
+    path = tmp_path / "bild.png"
+    path.write_bytes(b"\x89PNG\r\n\x1a\n\0\0\0")
+
+    with pytest.raises(ValueError):
+        DocumentStore(tmp_path / "cache").load(path)
+
+
+def test_document_turn_does_not_shrink_the_history_for_good(tmp_path):
+    path = tmp_path / "notizen.md"
+    path.write_text("".join(f"## Steuer {i}\n" + "Abzüge und Fristen. " * 40 + "\n\n" for i in range(50)),
+                    encoding='utf-8')
+    document = DocumentStore(tmp_path / "cache").load(path)
+    bot = BotProfile()
+    session = ChatSession()
+    for i in range(120):
+        session.messages.append(ChatMessage(role='user' if i % 2 == 0 else 'assistant', content=f"{i} " + "x" * 200))
+    builder = ContextBuilder()
+    before = builder.build(session, bot)
+
+    # Eine Frage, zu der die Datei passt: Ausschnitte belegen bis zur Hälfte des Budgets
+    extra = context_messages([document], "Steuer Fristen", int(bot.context_token_budget * DOCUMENT_BUDGET_SHARE))
+    assert extra
+    builder.build(session, bot, extra)
+
+    # Datei wieder entfernt: der Verlauf bekommt wieder das ganze Budget
+    session.messages.append(ChatMessage(content="Und sonst?"))
+    after = builder.build(session, bot)
+    assert len(after) >= len(before)
+    assert after == ContextBuilder().build(session, bot)
+
+
+def test_size_is_in_bytes(tmp_path):
+    path = tmp_path / "umlaute.txt"
+    path.write_text("äöü€\n" * 100, encoding='utf-8')
+
+    document = DocumentStore(tmp_path / "cache").load(path)
+
+    assert document.size == path.stat().st_size
+
+
+def test_concurrent_loads_of_the_same_file(tmp_path):
+    path = tmp_path / "gross.txt"
+    path.write_text("".join(f"Zeile {i}\n" for i in range(50_000)), encoding='utf-8')
+    # Je ein Store pro Thread: keiner findet das Dokument im Speicher, alle schreiben den Cache
+    stores = [DocumentStore(tmp_path / "cache") for _ in range(8)]
+
+    with ThreadPoolExecutor(len(stores)) as pool:
+        documents = list(pool.map(lambda store: store.load(path), stores))
+
+    assert len({d.digest for d in documents}) == 1
+    assert not list((tmp_path / "cache").glob("*/*.tmp"))
+    assert DocumentStore(tmp_path / "cache")._cached(documents[0].digest) is not None
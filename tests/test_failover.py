@@ -0,0 +1,155 @@
+import asyncio
+from typing import List
+
+import ollama
+import pytest
+
+from klugschAIsser.core.backend_pool import COLD_LOAD_PENALTY, BackendPool
+from klugschAIsser.core.metrics import GenerationStats
+from klugschAIsser.core.ollama_client import OllamaClient
+
+
+class StubAsyncClient:
+    """
+    Ersetzt ollama.AsyncClient eines Backends.
+    'error' wird beim Verbindungsaufbau geworfen, 'error_after' nach dem ersten Stück Text.
+    """
+
+    def __init__(self, answer: str = "", error: Exception = None, error_after: Exception = None):
+        self.answer = answer
+        self.error = error
+        self.error_after = error_after
+        self.calls = 0
+
+    async def chat(self, model, messages, stream, options, keep_alive):
+        self.calls += 1
+        if self.error:
+            raise self.error
+
+        async def chunks():
+            for word in self.answer.split(" "):
+                yield {"message": {"content": word + " "}, "done": False}
+                if self.error_after:
+                    raise self.error_after
+            yield {"message": {"content": ""}, "done": True, "eval_count": 2}
+
+        return chunks()
+
+    async def embed(self, model, input):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return {"embeddings": [[float(len(text))] for text in input]}
+
+
+def _pool(*stubs: StubAsyncClient) -> BackendPool:
+    pool = BackendPool([f"http://host{i}:11434" for i in range(len(stubs))])
+    for backend, stub in zip(pool.backends, stubs):
+        backend.client = stub
+    return pool
+
+
+def _chat(pool: BackendPool, stats: GenerationStats) -> str:
+    async def main():
+        return "".join([piece async for piece in OllamaClient(model="m", pool=pool).chat(
+            [{"role": "user", "content": "Hallo"}], stats=stats)])
+    return asyncio.run(main())
+
+
+def test_fails_over_to_the_next_host_on_connection_errors():
+    down, up = StubAsyncClient(error=ConnectionError("refused")), StubAsyncClient("Hallo Welt")
+    pool = _pool(down, up)
+    stats = GenerationStats()
+
+    assert _chat(pool, stats) == "Hallo Welt "
+
+    assert (stats.backend, stats.failovers, stats.error) == ("http://host1:11434", 1, None)
+    assert [b.healthy for b in pool.backends] == [False, True]
+    assert pool.backends[0].failures == 1
+    assert "m" in pool.backends[1].loaded_models
+    assert [b.outstanding for b in pool.backends] == [0, 0]
+
+
+def test_client_errors_do_not_mark_the_host_down():
+    missing = StubAsyncClient(error=ollama.ResponseError("model not found", status_code=404))
+    pool = _pool(missing, StubAsyncClient("ok"))
+    stats = GenerationStats()
+
+    assert _chat(pool, stats) == "ok "
+
+    assert stats.failovers == 1
+    assert pool.backends[0].healthy and pool.backends[0].failures == 0
+
+
+def test_server_errors_mark_the_host_down():
+    broken = StubAsyncClient(error=ollama.ResponseError("boom", status_code=500))
+    pool = _pool(broken, StubAsyncClient("ok"))
+
+    assert _chat(pool, GenerationStats()) == "ok "
+
+    assert not pool.backends[0].healthy
+
+
+def test_error_is_reported_when_every_host_fails():
+    pool = _pool(StubAsyncClient(error=ConnectionError("a")), StubAsyncClient(error=ConnectionError("b")))
+    stats = GenerationStats()
+
+    assert _chat(pool, stats) == "Error: b"
+
+    assert stats.error == "ConnectionError"
+    assert stats.failovers == 1
+    assert [b.client.calls for b in pool.backends] == [1, 1]
+
+
+def test_no_failover_once_text_was_streamed():
+    # Sonst stünde die Antwort doppelt (oder gemischt aus zwei Hosts) im Chat
+    flaky, spare = StubAsyncClient("Hallo Welt", error_after=ConnectionError("abgerissen")), StubAsyncClient("x")
+    pool = _pool(flaky, spare)
+    stats = GenerationStats()
+
+    assert _chat(pool, stats) == "Hallo Error: abgerissen"
+
+    assert spare.calls == 0
+    assert stats.failovers == 0 and stats.error == "ConnectionError"
+
+
+def test_pick_prefers_healthy_hosts_with_the_model_loaded():
+    pool = _pool(StubAsyncClient(), StubAsyncClient(), StubAsyncClient())
+    cold, warm, down = pool.backends
+    warm.loaded_models.add("m")
+    down.loaded_models.add("m")
+    down.healthy = False
+
+    assert pool.pick("m") is warm
+    # Bis zum Kaltstart-Aufschlag bleibt der warme Host vorne, danach gewinnt der freie
+    warm.outstanding = COLD_LOAD_PENALTY
+    assert pool.pick("m") is cold
+    assert pool.pick("m", exclude=[cold]) is warm
+    # Host, der das Modell nicht hat, nur als letzte Wahl
+    cold.available_models = {"anderes"}
+    assert pool.pick("m") is warm
+    assert pool.pick("m", exclude=[warm]) is cold
+    assert pool.pick("m", exclude=[cold, warm]) is down
+    assert pool.pick("m", exclude=pool.backends) is None
+
+
+def test_embed_fails_over_and_keeps_client_errors_out_of_health():
+    missing = StubAsyncClient(error=ollama.ResponseError("model not found", status_code=404))
+    pool = _pool(missing, StubAsyncClient())
+
+    vectors = asyncio.run(OllamaClient(pool=pool).embed(["ab", "abc"], model="e"))
+
+    assert vectors == [[2.0], [3.0]]
+    assert pool.backends[0].healthy
+    assert "e" in pool.backends[1].loaded_models
+
+
+def test_embed_raises_when_every_host_fails():
+    errors: List[Exception] = [ConnectionError("a"), ollama.ResponseError("boom", status_code=503)]
+    pool = _pool(*(StubAsyncClient(error=e) for e in errors))
+
+    with pytest.raises(ollama.ResponseError):
+        asyncio.run(OllamaClient(pool=pool).embed(["x"], model="e"))
+
+    assert [b.healthy for b in pool.backends] == [False, False]
+    assert [b.outstanding for b in pool.backends] == [0, 0]
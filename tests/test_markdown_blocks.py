@@ -0,0 +1,68 @@
+import pytest
+
+from klugschAIsser.core.markdown_blocks import MarkdownBlockSplitter
+
+ANSWER = """# Überschrift
+
+Ein Absatz mit **fett** und
+einer zweiten Zeile.
+
+- Punkt eins
+
+- Punkt zwei
+  mit Fortsetzung
+
+    eingerückter Teil des Punkts
+
+1. erster
+2. zweiter
+
+```python
+def f():
+
+    return 1
+```
+
+~~~
+``` kein Ende
+~~~
+
+Letzter Absatz ohne Zeilenumbruch"""
+
+
+def _stream(text: str, step: int):
+    """Füttert die Antwort stückweise wie ein Stream und gibt alle Blöcke zurück."""
+    splitter = MarkdownBlockSplitter()
+    blocks = []
+    for end in range(step, len(text) + step, step):
+        blocks += splitter.feed(text[:end])[0]
+    return blocks + [splitter.finish()]
+
+
+@pytest.mark.parametrize("step", [1, 2, 3, 7, 50, len(ANSWER)])
+def test_blocks_join_back_to_the_whole_answer(step):
+    blocks = _stream(ANSWER, step)
+
+    assert "".join(blocks) == ANSWER
+
+
+@pytest.mark.parametrize("step", [1, 3, 7, 50])
+def test_chunk_size_does_not_change_the_blocks(step):
+    assert _stream(ANSWER, step) == _stream(ANSWER, len(ANSWER))
+
+
+def test_lists_and_code_blocks_are_not_split():
+    blocks = _stream(ANSWER, 5)
+
+    assert any(b.startswith("- Punkt eins") and "eingerückter Teil" in b for b in blocks)
+    assert any(b.startswith("```python") and "return 1\n```" in b for b in blocks)
+    assert any(b.startswith("~~~\n``` kein Ende\n~~~") for b in blocks)
+
+
+def test_open_code_block_is_closed_provisionally():
+    splitter = MarkdownBlockSplitter()
+
+    _, open_block = splitter.feed("Text\n\n```python\nx = 1\n")
+
+    assert splitter.in_code_block
+    assert open_block == "```python\nx = 1\n```"
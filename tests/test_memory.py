@@ -0,0 +1,121 @@
+import asyncio
+from uuid import uuid4
+
+from klugschAIsser.core import memory as memory_module
+from klugschAIsser.core.memory import SemanticMemory, make_hash_embedder
+from klugschAIsser.core.types import ChatMessage
+
+
+class CountingEmbedder:
+    """Hash-Embedding, das mitzählt, wie viele Texte eingebettet wurden (und die Schleife kurz freigibt)."""
+
+    def __init__(self):
+        self.embed = make_hash_embedder()
+        self.texts = []
+
+    async def __call__(self, texts):
+        self.texts.extend(texts)
+        await asyncio.sleep(0)
+        return await self.embed(texts)
+
+
+def _messages(*contents: str):
+    return [ChatMessage(role='user' if i % 2 == 0 else 'assistant', content=c) for i, c in enumerate(contents)]
+
+
+def _memory(tmp_path, embed=None) -> SemanticMemory:
+    return SemanticMemory(embed or make_hash_embedder(), tmp_path)
+
+
+def test_recall_finds_the_closest_message(tmp_path):
+    memory = _memory(tmp_path)
+    messages = _messages("Mein Hund heißt Bello und frisst gern Wurst",
+                         "Die Steuererklärung ist bis Juli fällig",
+                         "Bello der Hund bellt laut")
+    asyncio.run(memory.index_messages("u", uuid4(), messages))
+
+    hits = asyncio.run(memory.recall("u", "Wie heißt mein Hund Bello", k=2))
+
+    assert [h.message_id for h in hits] == [messages[0].id, messages[2].id]
+    assert hits[0].score >= hits[1].score
+    assert hits[0].content == messages[0].content and hits[0].role == 'user'
+
+
+def test_recall_is_scoped_to_the_owner_and_honours_exclude(tmp_path):
+    memory = _memory(tmp_path)
+    mine, theirs = _messages("Urlaub in Italien am Gardasee"), _messages("Urlaub in Italien am Gardasee im Mai")
+    asyncio.run(memory.index_messages("ich", uuid4(), mine))
+    asyncio.run(memory.index_messages("du", uuid4(), theirs))
+
+    assert [h.message_id for h in asyncio.run(memory.recall("ich", "Urlaub Gardasee", k=5))] == [mine[0].id]
+    assert asyncio.run(memory.recall("ich", "Urlaub Gardasee", k=5, exclude={mine[0].id})) == []
+
+
+def test_known_messages_and_contents_are_embedded_once(tmp_path):
+    embed = CountingEmbedder()
+    memory = _memory(tmp_path, embed)
+    messages = _messages("eins zwei drei", "vier fünf sechs", "   ")
+    asyncio.run(memory.index_messages("u", uuid4(), messages))
+    # Gleiche Nachrichten nochmal, dazu eine neue mit bekanntem Inhalt
+    asyncio.run(memory.index_messages("u", uuid4(), messages + _messages("eins zwei drei")))
+
+    assert sorted(embed.texts) == ["eins zwei drei", "vier fünf sechs"]
+    assert memory.count == 2
+    assert len(asyncio.run(memory.recall("u", "eins zwei drei", k=5))) == 1  # gleicher Inhalt nur einmal
+
+
+def test_forget_session_drops_its_messages(tmp_path):
+    memory = _memory(tmp_path)
+    kept, dropped = uuid4(), uuid4()
+    asyncio.run(memory.index_messages("u", kept, _messages("Pizza mit Oliven")))
+    asyncio.run(memory.index_messages("u", dropped, _messages("Pizza mit Salami")))
+
+    memory.forget_session(dropped)
+
+    assert [h.session_id for h in asyncio.run(memory.recall("u", "Pizza", k=5))] == [kept]
+
+
+def test_index_survives_reopening(tmp_path):
+    memory = _memory(tmp_path)
+    messages = _messages("Der Zug nach Bern fährt um acht")
+    asyncio.run(memory.index_messages("u", uuid4(), messages))
+    memory.close()
+
+    embed = CountingEmbedder()
+    reopened = _memory(tmp_path, embed)
+    asyncio.run(reopened.index_messages("u", uuid4(), messages))
+
+    assert embed.texts == []
+    assert [h.message_id for h in asyncio.run(reopened.recall("u", "Zug nach Bern", k=1))] == [messages[0].id]
+
+
+def test_matrix_grows_beyond_the_initial_capacity(tmp_path, monkeypatch):
+    monkeypatch.setattr(memory_module, "INITIAL_CAPACITY", 4)
+    monkeypatch.setattr(memory_module, "EMBED_BATCH_SIZE", 3)
+    memory = _memory(tmp_path)
+    messages = _messages(*(f"Nachricht nummer{i} über thema{i}" for i in range(10)))
+
+    asyncio.run(memory.index_messages("u", uuid4(), messages))
+
+    assert memory.count == 10 and memory._matrix.shape[0] == 16
+    hits = asyncio.run(memory.recall("u", "nummer7 thema7", k=1))
+    assert [h.message_id for h in hits] == [messages[7].id]
+
+
+def test_recall_while_indexing(tmp_path, monkeypatch):
+    monkeypatch.setattr(memory_module, "INITIAL_CAPACITY", 2)
+    monkeypatch.setattr(memory_module, "EMBED_BATCH_SIZE", 1)
+    memory = _memory(tmp_path, CountingEmbedder())
+    first = _messages("Kaffee am Morgen")
+
+    async def main():
+        await memory.index_messages("u", uuid4(), first)
+        more = _messages(*(f"Eintrag wort{i}" for i in range(20)))
+        # Das Anhängen blendet die Matrix mehrmals neu ein; gleichzeitige Suchen sehen trotzdem einen gültigen Stand
+        results = await asyncio.gather(memory.index_messages("u", uuid4(), more),
+                                       *(memory.recall("u", "Kaffee Morgen", k=1) for _ in range(10)))
+        return results[1:]
+
+    for hits in asyncio.run(main()):
+        assert [h.message_id for h in hits] == [first[0].id]
+    assert memory.count == 21
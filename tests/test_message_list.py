@@ -0,0 +1,76 @@
+from datetime import datetime
+from uuid import uuid4
+
+import pytest
+
+from klugschAIsser.core.types import BotProfile, ChatMessage, MessageList
+
+
+def _messages():
+    first = ChatMessage(role='user', content='Grüß dich 👋', timestamp=datetime(2024, 5, 1, 12, 0, 0, 123456))
+    return [
+        first,
+        ChatMessage(role='assistant', sender_id='bot-a', content='Hallo!'),
+        ChatMessage(role='assistant', sender_id='bot-b', content='', alternative_to=first.id),
+    ]
+
+
+def test_round_trip_keeps_all_fields():
+    originals = _messages()
+    messages = MessageList(originals)
+
+    assert len(messages) == 3
+    assert list(messages) == originals
+    assert messages[-1].alternative_to == originals[0].id
+    assert messages[0].timestamp == datetime(2024, 5, 1, 12, 0, 0, 123456)
+    assert messages.content_at(0) == 'Grüß dich 👋'
+    assert messages.content_at(-1) == ''
+
+
+def test_slices_and_negative_indices():
+    originals = _messages()
+    messages = MessageList(originals)
+
+    assert messages[1:] == originals[1:]
+    assert messages[::-1] == originals[::-1]
+    assert messages[-2] == originals[-2]
+
+
+def test_out_of_range_raises_index_error():
+    messages = MessageList(_messages())
+
+    with pytest.raises(IndexError):
+        messages[3]
+    with pytest.raises(IndexError):
+        messages[-4]
+
+
+def test_token_count_is_written_back_to_the_row():
+    messages = MessageList()
+    message = ChatMessage(content='abc')
+    messages.append(message)
+
+    # Das angehängte Objekt ist eine Sicht auf die Zeile
+    message.token_count = 7
+    assert messages[0].token_count == 7
+
+    messages[0].token_count = 9
+    assert message.token_count == 9
+
+
+def test_from_rows_matches_appended_messages():
+    alternative_to = uuid4()
+    message = ChatMessage(role='assistant', sender_id='bot', content='Zeile\nzwei',
+                          timestamp=datetime(2024, 1, 2, 3, 4, 5), alternative_to=alternative_to)
+    rows = [(str(message.id), message.role, message.sender_id, message.content,
+             message.timestamp.isoformat(), str(alternative_to))]
+
+    assert list(MessageList.from_rows(rows)) == [message]
+
+
+def test_bot_ids_are_stable_across_restarts():
+    # Gespeicherte Antworten verweisen per sender_id auf den Bot
+    assert BotProfile(name="A", ollama_model="gemma3:1b").id == BotProfile(name="A", ollama_model="gemma3:1b").id
+    assert BotProfile(name="A", ollama_model="gemma3:1b").id != BotProfile(name="B", ollama_model="gemma3:1b").id
+    explicit = uuid4()
+    assert BotProfile(id=explicit).id == explicit
@@ -0,0 +1,172 @@
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
+import pytest
+
+from klugschAIsser.core import residency as residency_module
+from klugschAIsser.core.residency import ModelResidency
+
+GB = 1024 ** 3
+
+
+class StubClient:
+    def __init__(self):
+        self.calls: List[Tuple[str, object]] = []
+
+    async def generate(self, model: str, prompt: str = '', keep_alive=None):
+        self.calls.append((model, keep_alive))
+
+
+class StubBackend:
+    """Hat nur, was ModelResidency von einem Backend braucht; check() spielt /api/ps nach."""
+
+    def __init__(self, loaded: Optional[Dict[str, int]] = None, sizes: Optional[Dict[str, int]] = None,
+                 name: str = "stub"):
+        self.name = name
+        self.client = StubClient()
+        self.loaded_sizes = dict(loaded or {})
+        self.loaded_models = set(self.loaded_sizes)
+        # Größen, die /api/ps nach dem Laden melden würde
+        self.sizes = {**self.loaded_sizes, **(sizes or {})}
+
+    async def check(self):
+        self.loaded_sizes = {model: self.sizes.get(model, 0) for model in self.loaded_models}
+
+    def mark_success(self, model: str):
+        self.loaded_models.add(model)
+
+    def mark_unloaded(self, model: str):
+        self.loaded_models.discard(model)
+        self.loaded_sizes.pop(model, None)
+
+    def unloaded(self) -> List[str]:
+        return [model for model, keep_alive in self.client.calls if keep_alive == 0]
+
+
+class StubPool:
+    def __init__(self, *backends: StubBackend):
+        self.backends = list(backends)
+
+    def pick(self, model: str, exclude=()):
+        return self.backends[0] if self.backends else None
+
+    async def check_health(self):
+        pass
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(residency_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+def _enforce(residency: ModelResidency, backend=None, keep=None):
+    asyncio.run(residency.enforce(backend, keep))
+
+
+def test_idle_pinned_models_are_unloaded(clock):
+    backend = StubBackend({"alt": GB, "neu": GB})
+    residency = ModelResidency(StubPool(backend), idle_timeout=60)
+    for model in ("alt", "neu"):
+        residency.begin(model)
+        residency.end(model)
+        clock[0] += 50
+
+    _enforce(residency)
+
+    assert backend.unloaded() == ["alt"]
+    assert backend.loaded_models == {"neu"}
+    assert residency.evictions == 1
+
+
+def test_models_not_pinned_by_us_are_left_to_ollama(clock):
+    # Z.B. von einem anderen Programm geladen: hat eigenen keep_alive, läuft selbst ab
+    backend = StubBackend({"fremd": GB})
+    residency = ModelResidency(StubPool(backend), idle_timeout=60)
+    residency.touch("fremd")
+    clock[0] += 3600
+
+    _enforce(residency)
+
+    assert backend.unloaded() == []
+
+
+def test_models_in_use_are_never_unloaded(clock):
+    backend = StubBackend({"a": 4 * GB, "b": 4 * GB})
+    residency = ModelResidency(StubPool(backend), budget_bytes=GB, idle_timeout=60)
+    residency.begin("a")  # läuft noch
+    residency.begin("b")
+    residency.end("b")
+    clock[0] += 3600
+
+    _enforce(residency)
+
+    assert backend.unloaded() == ["b"]
+
+
+def test_budget_evicts_least_recently_used_first(clock):
+    backend = StubBackend({"nie_benutzt": 2 * GB, "a": 2 * GB, "b": 2 * GB, "c": 2 * GB})
+    residency = ModelResidency(StubPool(backend), budget_bytes=5 * GB)
+    for model in ("b", "a", "c"):
+        residency.touch(model)
+        clock[0] += 1
+
+    _enforce(residency)
+
+    # 8 GB geladen, 5 erlaubt: unbekannte zuerst, dann der am längsten unbenutzte
+    assert backend.unloaded() == ["nie_benutzt", "b"]
+    assert sum(backend.loaded_sizes.values()) <= 5 * GB
+
+
+def test_idle_evictions_count_towards_the_budget(clock):
+    backend = StubBackend({"idle": 3 * GB, "a": 2 * GB, "b": 2 * GB})
+    residency = ModelResidency(StubPool(backend), budget_bytes=4 * GB, idle_timeout=60)
+    residency.begin("idle")
+    residency.end("idle")
+    clock[0] += 120
+    residency.touch("a")
+    residency.touch("b")
+
+    _enforce(residency)
+
+    # Ohne "idle" sind es 4 GB: das Budget ist eingehalten, a und b bleiben
+    assert backend.unloaded() == ["idle"]
+
+
+def test_keep_protects_the_model_just_loaded(clock):
+    backend = StubBackend({"alt": 3 * GB, "neu": 3 * GB})
+    residency = ModelResidency(StubPool(backend), budget_bytes=4 * GB)
+    residency.touch("alt")
+    clock[0] += 1
+    residency.touch("neu")
+    clock[0] += 1
+    residency.touch("alt")  # "neu" ist jetzt der am längsten unbenutzte
+
+    _enforce(residency, backend, keep="neu")
+
+    assert backend.unloaded() == ["alt"]
+
+
+def test_preload_pins_and_enforces_the_budget(clock):
+    backend = StubBackend({"alt": 3 * GB}, sizes={"neu": 3 * GB})
+    residency = ModelResidency(StubPool(backend), budget_bytes=4 * GB)
+    residency.touch("alt")
+    clock[0] += 1
+
+    asyncio.run(residency.preload("neu"))
+
+    assert backend.client.calls[0] == ("neu", residency.keep_alive)
+    assert backend.unloaded() == ["alt"]
+    assert residency.preloads == 1
+
+
+def test_release_unpins_only_our_models(clock):
+    backend = StubBackend({"unser": GB, "fremd": GB})
+    residency = ModelResidency(StubPool(backend))
+    residency.begin("unser")
+    residency.end("unser")
+
+    asyncio.run(residency.release())
+
+    assert backend.client.calls == [("unser", residency_module.RELEASE_KEEP_ALIVE)]
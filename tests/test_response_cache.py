@@ -0,0 +1,149 @@
+import asyncio
+
+from klugschAIsser.core.backend_pool import BackendPool
+from klugschAIsser.core.metrics import GenerationStats
+from klugschAIsser.core.ollama_client import REPLAY_CHUNK_CHARS, OllamaClient
+from klugschAIsser.core.response_cache import ResponseCache
+
+GREEDY = {"temperature": 0}
+
+
+class StubAsyncClient:
+    """Ersetzt ollama.AsyncClient: streamt 'answer' in zwei Stücken oder wirft 'error'."""
+
+    def __init__(self, answer: str = "", error: Exception = None):
+        self.answer = answer
+        self.error = error
+        self.calls = 0
+
+    async def chat(self, model, messages, stream, options, keep_alive):
+        self.calls += 1
+        if self.error:
+            raise self.error
+
+        async def chunks():
+            half = len(self.answer) // 2
+            yield {"message": {"content": self.answer[:half]}, "done": False}
+            yield {"message": {"content": self.answer[half:]}, "done": True, "eval_count": 1}
+
+        return chunks()
+
+
+def _client(tmp_path, stub: StubAsyncClient) -> OllamaClient:
+    pool = BackendPool(["http://stub:11434"])
+    pool.backends[0].client = stub
+    return OllamaClient(model="m", cache=ResponseCache(tmp_path), pool=pool)
+
+
+def _ask(client: OllamaClient, options=GREEDY, stats=None):
+    async def main():
+        return [piece async for piece in client.chat([{"role": "user", "content": "Hallo"}],
+                                                     options=options, stats=stats)]
+    return asyncio.run(main())
+
+
+def test_only_deterministic_options_are_cacheable():
+    assert not ResponseCache.is_cacheable(None)
+    assert not ResponseCache.is_cacheable({})
+    assert not ResponseCache.is_cacheable({"temperature": 0.8})
+    assert ResponseCache.is_cacheable({"temperature": 0})
+    assert ResponseCache.is_cacheable({"temperature": 0.8, "seed": 0})
+
+
+def test_key_ignores_surrounding_whitespace_and_option_order():
+    messages = [{"role": "system", "content": "Sei knapp."}, {"role": "user", "content": "Hallo"}]
+    key = ResponseCache.make_key("m", messages, {"temperature": 0, "seed": 1})
+
+    padded = [{"role": "system", "content": "Sei knapp.\n"}, {"role": "user", "content": "  Hallo "}]
+    assert ResponseCache.make_key("m", padded, {"seed": 1, "temperature": 0}) == key
+    other_prompt = [{"role": "system", "content": "Sei ausführlich."}, messages[1]]
+    assert ResponseCache.make_key("m", other_prompt, {"temperature": 0, "seed": 1}) != key
+    assert ResponseCache.make_key("n", messages, {"temperature": 0, "seed": 1}) != key
+
+
+def test_memory_tier_evicts_least_recently_used(tmp_path):
+    cache = ResponseCache(tmp_path, max_memory_entries=2)
+    cache.put("a" * 64, "A")
+    cache.put("b" * 64, "B")
+    cache.get("a" * 64)
+    cache.put("c" * 64, "C")
+
+    assert list(cache._memory) == ["a" * 64, "c" * 64]
+    # Aus dem Speicher verdrängt, aber noch auf der Platte
+    assert cache.get("b" * 64) == "B"
+    assert cache.stats()["hits"] == 2
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    ResponseCache(tmp_path).put("a" * 64, "Antwort")
+
+    cache = ResponseCache(tmp_path)
+
+    assert cache.stats()["disk_entries"] == 1
+    assert cache.get("a" * 64) == "Antwort"
+    assert cache.get("b" * 64) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_disk_tier_evicts_least_recently_used_beyond_the_byte_budget(tmp_path):
+    # Ohne Speicher-Stufe kommt jeder Treffer von der Platte
+    cache = ResponseCache(tmp_path, max_memory_entries=0, max_disk_bytes=12)
+    for key in ("a", "b"):
+        cache.put(key * 64, key * 6)
+    assert cache.get("a" * 64) == "aaaaaa"
+
+    cache.put("c" * 64, "cccccc")
+
+    assert cache.get("b" * 64) is None
+    assert not (tmp_path / "bb" / f"{'b' * 64}.txt").exists()
+    assert cache.stats()["disk_bytes"] == 12
+    assert cache.get("a" * 64) == "aaaaaa"
+
+
+def test_client_replays_cached_answers_without_asking_ollama(tmp_path):
+    stub = StubAsyncClient("x" * (3 * REPLAY_CHUNK_CHARS))
+    client = _client(tmp_path, stub)
+    first = _ask(client)
+
+    stats = GenerationStats()
+    second = _ask(client, stats=stats)
+
+    assert stub.calls == 1
+    assert "".join(second) == "".join(first)
+    assert len(second) == 3  # in Stücken, wie ein echter Stream
+    assert stats.cached and stats.backend is None
+
+
+def test_random_sampling_bypasses_the_cache(tmp_path):
+    stub = StubAsyncClient("Antwort")
+    client = _client(tmp_path, stub)
+
+    _ask(client, options=None)
+    _ask(client, options={"temperature": 0.7})
+
+    assert stub.calls == 2
+    assert client.cache.stats()["bypassed"] == 2
+    assert client.cache.stats()["disk_entries"] == 0
+
+
+def test_errors_are_not_cached(tmp_path):
+    stub = StubAsyncClient(error=ConnectionError("weg"))
+    client = _client(tmp_path, stub)
+
+    assert _ask(client) == ["Error: weg"]
+    stub.error, stub.answer = None, "Antwort"
+    assert "".join(_ask(client)) == "Antwort"
+    assert stub.calls == 2
+
+
+def test_disk_errors_are_logged_not_raised(tmp_path, caplog):
+    cache = ResponseCache(tmp_path)
+    key = "ab" * 32
+    # Statt des Unterverzeichnisses liegt dort eine Datei -> mkdir/Schreiben schlägt fehl
+    (tmp_path / key[:2]).write_text("")
+
+    cache.put(key, "Antwort")
+
+    assert cache.get(key) == "Antwort"  # im Speicher trotzdem da
+    assert cache.stats()["disk_entries"] == 0
+    assert "nicht schreiben" in caplog.text
@@ -0,0 +1,119 @@
+import asyncio
+from typing import Dict, List
+
+from klugschAIsser.core.scheduler import GenerationScheduler, GenerationTicket
+
+
+class FakeClient:
+    """Antwortet mit dem Prompt: nach kurzer Pause oder (auto_release=False) erst, wenn ihr Event gesetzt ist."""
+
+    def __init__(self, auto_release: bool = True):
+        self.auto_release = auto_release
+        self.started: List[str] = []
+        self.closed: List[str] = []
+        self.gates: Dict[str, asyncio.Event] = {}
+
+    async def chat(self, messages, model=None, options=None, keep_alive=None, stats=None):
+        prompt = messages[-1]["content"]
+        self.started.append(prompt)
+        gate = self.gates.setdefault(prompt, asyncio.Event())
+        try:
+            if self.auto_release:
+                await asyncio.sleep(0.01)
+            else:
+                await gate.wait()
+            yield prompt
+        finally:
+            self.closed.append(prompt)
+
+
+async def _ask(scheduler: GenerationScheduler, ticket: GenerationTicket, prompt: str) -> str:
+    return "".join([chunk async for chunk in scheduler.chat(ticket, [{"role": "user", "content": prompt}])])
+
+
+async def _submit(scheduler, *requests):
+    """Startet die Anfragen nacheinander (in dieser Reihenfolge in der Warteschlange)."""
+    tasks = []
+    for ticket, prompt in requests:
+        tasks.append(asyncio.create_task(_ask(scheduler, ticket, prompt)))
+        await asyncio.sleep(0)
+    return tasks
+
+
+def test_sessions_take_turns():
+    async def main():
+        client = FakeClient()
+        scheduler = GenerationScheduler(client, max_in_flight=1)
+        tickets = {name: GenerationTicket(name[0], "m") for name in ("a1", "a2", "a3", "b1")}
+        tasks = await _submit(scheduler, *((tickets[n], n) for n in ("a1", "a2", "a3", "b1")))
+
+        # a1 läuft, danach abwechselnd: a2, b1, a3 (b muss nicht hinter allen a warten)
+        assert [tickets[n].position for n in ("a1", "a2", "b1", "a3")] == [0, 1, 2, 3]
+        assert await asyncio.gather(*tasks) == ["a1", "a2", "a3", "b1"]
+        return client.started
+
+    assert asyncio.run(main()) == ["a1", "a2", "b1", "a3"]
+
+
+def test_limits_are_per_model():
+    async def main():
+        scheduler = GenerationScheduler(FakeClient(), max_in_flight=1, model_limits={"gross": 2})
+        models = ["klein", "klein", "gross", "gross", "gross"]
+        tasks = await _submit(scheduler, *((GenerationTicket(i, m), f"{m}{i}") for i, m in enumerate(models)))
+
+        state = (scheduler.in_flight(), scheduler.queue_lengths())
+        await asyncio.gather(*tasks)
+        return state, scheduler.in_flight()
+
+    (running, waiting), after = asyncio.run(main())
+    assert running == {"klein": 1, "gross": 2}
+    assert waiting == {"klein": 1, "gross": 1}
+    assert after == {"klein": 0, "gross": 0}
+
+
+def test_cancelling_a_waiting_ticket_removes_it_from_the_queue():
+    async def main():
+        client = FakeClient(auto_release=False)
+        scheduler = GenerationScheduler(client, max_in_flight=1)
+        first, waiting, last = (GenerationTicket(key, "m") for key in ("x", "y", "z"))
+        positions = []
+        last.on_position = positions.append
+        tasks = await _submit(scheduler, (first, "x"), (waiting, "y"), (last, "z"))
+
+        waiting.cancel()
+        await asyncio.sleep(0)
+        cancelled_answer = await tasks[1]
+        client.gates["x"].set()
+        await tasks[0]
+        await asyncio.sleep(0)
+        client.gates["z"].set()
+        await tasks[2]
+        return cancelled_answer, positions, client.started
+
+    answer, positions, started = asyncio.run(main())
+    assert answer == ""
+    assert started == ["x", "z"]
+    assert positions == [2, 1, 0]
+
+
+def test_cancelling_a_running_ticket_closes_the_stream_and_frees_the_slot():
+    async def main():
+        client = FakeClient(auto_release=False)
+        scheduler = GenerationScheduler(client, max_in_flight=1)
+        running, waiting = GenerationTicket("a", "m"), GenerationTicket("b", "m")
+        tasks = await _submit(scheduler, (running, "a"), (waiting, "b"))
+        await asyncio.sleep(0)
+
+        running.cancel()
+        answer = await tasks[0]
+        await asyncio.sleep(0)
+        state = (list(client.closed), waiting.position, scheduler.in_flight())
+        client.gates["b"].set()
+        await tasks[1]
+        return answer, state, running.stats.cancelled
+
+    answer, (closed, position, in_flight), cancelled = asyncio.run(main())
+    assert answer == ""
+    assert closed == ["a"]  # HTTP-Stream geschlossen
+    assert position == 0 and in_flight == {"m": 1}  # der Nächste ist dran
+    assert cancelled
@@ -0,0 +1,71 @@
+import pytest
+
+from klugschAIsser.core.session_store import SessionStore
+from klugschAIsser.core.types import ChatMessage, ChatSession
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SessionStore(tmp_path / "sessions.db")
+    if not store.search_index.available:
+        pytest.skip("SQLite ohne FTS5")
+    yield store
+    store.close()
+
+
+def _add(store: SessionStore, content: str, owner_id: str = "", title: str = "Neuer Chat") -> ChatSession:
+    session = ChatSession(title=title)
+    store.save_session(session, owner_id)
+    store.append_message(session.id, ChatMessage(content=content))
+    return session
+
+
+@pytest.mark.parametrize("query", [
+    '"', "'", "NOT", "AND OR", "foo*", "(", ")", "NEAR(a b)", "title:x", "^", "-", "a + b", "{x}", "c++",
+])
+def test_fts_syntax_in_queries_does_not_raise(store, query):
+    _add(store, "Ein ganz normaler Text über Python")
+
+    store.search_index.search(query)
+
+
+def test_punctuation_only_query_returns_nothing(store):
+    _add(store, "Text")
+
+    assert store.search_index.search('"*()') == []
+
+
+def test_quotes_and_operators_are_searched_as_words(store):
+    session = _add(store, 'Er sagte "nicht AND oder" und ging')
+
+    hits = store.search_index.search('"nicht" AND')
+
+    assert [hit.session_id for hit in hits] == [session.id]
+
+
+def test_last_term_is_a_prefix(store):
+    session = _add(store, "Wie berechne ich die Steuer?")
+
+    assert [hit.session_id for hit in store.search_index.search("berechne Steu")] == [session.id]
+    assert store.search_index.search("Steu berechne") == []
+
+
+def test_diacritics_are_ignored(store):
+    session = _add(store, "Grüße aus München")
+
+    assert [hit.session_id for hit in store.search_index.search("munchen")] == [session.id]
+
+
+def test_results_are_limited_to_the_owner(store):
+    _add(store, "geheimes Rezept", owner_id="alice")
+
+    assert store.search_index.search("Rezept", owner_id="bob") == []
+    assert len(store.search_index.search("Rezept", owner_id="alice")) == 1
+
+
+def test_title_hits_have_no_message_id(store):
+    session = _add(store, "Inhalt", title="Urlaubsplanung")
+
+    hits = store.search_index.search("Urlaub")
+
+    assert [(hit.session_id, hit.message_id) for hit in hits] == [(session.id, None)]